@@ -0,0 +1,22 @@
+"""
+API module for the Voices of Independence project.
+Provides the async HTTP API used by the React interface.
+"""
+
+from utils.lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    ".server": [
+        'RequestQueue',
+        'parse_rag_request',
+        'create_app',
+        'run_server'
+    ]
+})
+
+__all__ = [
+    'RequestQueue',
+    'parse_rag_request',
+    'create_app',
+    'run_server'
+]
@@ -0,0 +1,22 @@
+"""
+Command line entry point of the API server.
+
+Usage:
+    python -m api --port 8000 --workers 4
+"""
+
+import argparse
+from utils.config import get_config, configure_logging
+from .server import run_server
+
+if __name__ == "__main__":
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Voices of Independence API server")
+    parser.add_argument("--host", default=config["api_host"])
+    parser.add_argument("--port", type=int, default=config["api_port"])
+    parser.add_argument("--workers", type=int, default=config["api_workers"])
+    parser.add_argument("--static", help="Built React app to serve at /")
+    args = parser.parse_args()
+
+    configure_logging()
+    run_server(args.host, args.port, args.workers, args.static)
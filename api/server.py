@@ -0,0 +1,470 @@
+"""
+Async HTTP API for the React UI and other clients.
+
+Endpoints:
+    POST /api/independence-rag          Answer a question as JSON
+    POST /api/independence-rag/stream   Answer a question as server-sent events
+    GET  /api/health                    Liveness and request queue state
+    GET  /api/metrics                   Request, queue, LLM, cache and connection counters
+    GET  /metrics                       Latency histograms and counters in the Prometheus text format
+
+Each worker process runs one event loop with one async Weaviate client and
+one async LLM client, shared by all of its requests. Requests beyond the
+worker's concurrency wait in a bounded queue; when the queue is full, or a
+request has waited too long, the worker answers 503 with Retry-After so that
+clients back off instead of piling up.
+
+Usage:
+    python -m api --port 8000 --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import shutil
+import signal
+import logging
+import tempfile
+import multiprocessing
+from contextlib import asynccontextmanager
+from aiohttp import web
+from utils.config import get_config, configure_logging
+from utils.opik_tracking import opik
+from database.connection_manager import get_async_connection_manager, shutdown_async_connection_manager
+from rag.filters import normalize_filters, build_filters
+from rag.semantic_cache import get_semantic_cache, cached_independence_rag_async, cached_independence_rag_stream_async
+from rag.single_flight import get_single_flight
+from rag.rate_limiter import get_rate_limiter
+from rag.llm_client import close_shared_async_client
+from rag.metrics import track_request, stage_summary
+from rag.retriever import preload_query_vectorizer
+from utils.metrics import (
+    get_registry,
+    merge_snapshots,
+    read_snapshots,
+    render_prometheus,
+    start_periodic_export,
+    write_snapshot
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_SEARCH_LIMIT = 20
+
+class QueueFull(Exception):
+    """Raised when a request cannot be admitted to the request queue."""
+
+class RequestQueue:
+    """
+    Bounded admission queue of one worker.
+
+    Up to max_concurrency requests run at once; up to max_waiting more wait
+    for at most timeout seconds. Anything beyond that is rejected.
+    """
+
+    def __init__(self, max_concurrency, max_waiting, timeout):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._active = 0
+        self._stats = {
+            "admitted": 0,
+            "rejected_full": 0,
+            "rejected_timeout": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0
+        }
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a request slot for the duration of the block; raises QueueFull if none is available."""
+        start = time.perf_counter()
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending
+            await self._semaphore.acquire()
+        elif self._waiting >= self.max_waiting:
+            self._stats["rejected_full"] += 1
+            raise QueueFull("request queue is full")
+        else:
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self._stats["rejected_timeout"] += 1
+                raise QueueFull(f"no slot within {self.timeout}s")
+            finally:
+                self._waiting -= 1
+
+        waited = time.perf_counter() - start
+        self._stats["admitted"] += 1
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def get_stats(self):
+        """
+        Get queue counters.
+
+        Returns:
+            dict: Admitted and rejected requests, wait times, and current active and waiting requests
+        """
+        stats = dict(self._stats)
+        stats.update({
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_waiting": self.max_waiting
+        })
+        return stats
+
+QUEUE = web.AppKey("queue", RequestQueue)
+STARTED = web.AppKey("started", float)
+REQUEST_STATS = web.AppKey("request_stats", dict)
+METRICS_EXPORT = web.AppKey("metrics_export", object)
+
+def parse_rag_request(payload):
+    """
+    Validate the body of a RAG request.
+
+    Args:
+        payload: Decoded JSON body
+
+    Returns:
+        tuple: (keyword arguments for the RAG pipeline, None) or (None, error message)
+    """
+    config = get_config()
+    if not isinstance(payload, dict):
+        return None, "Request body must be a JSON object"
+
+    query = payload.get("query")
+    if not isinstance(query, str) or not query.strip():
+        return None, "query must be a non-empty string"
+    if len(query) > config["api_max_query_chars"]:
+        return None, f"query must be at most {config['api_max_query_chars']} characters"
+
+    mode = payload.get("mode") or config["default_mode"]
+    if mode not in config["response_modes"]:
+        return None, f"mode must be one of {', '.join(config['response_modes'])}"
+
+    limit = payload.get("limit", config["default_search_limit"])
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_SEARCH_LIMIT:
+        return None, f"limit must be an integer between 1 and {MAX_SEARCH_LIMIT}"
+
+    filters = payload.get("filters") or None
+    if filters is not None and not isinstance(filters, dict):
+        return None, "filters must be a JSON object"
+    try:
+        filters = normalize_filters(filters)
+        build_filters(filters)
+    except (TypeError, ValueError) as e:
+        return None, f"Invalid filter: {str(e)}"
+
+    evaluate = bool(payload.get("evaluate", False))
+    if evaluate and not config["api_allow_evaluate"]:
+        return None, "evaluate is not enabled on this server"
+
+    return {
+        "query": query,
+        "mode": mode,
+        "limit": limit,
+        "filters": filters,
+        "evaluate": evaluate
+    }, None
+
+def _public_result(result):
+    """The parts of a RAG result returned to clients (the full context is left out)."""
+    return {key: value for key, value in result.items() if key != "context"}
+
+def _busy(request, error):
+    logger.warning(f"Rejecting {request.path}: {str(error)}")
+    retry_after = get_config()["api_retry_after"]
+    return web.json_response({"error": "Server is busy, please retry later"}, status=503,
+                             headers={"Retry-After": str(retry_after)})
+
+async def _read_request(request):
+    """Decode and validate a RAG request; returns (arguments, error response)."""
+    try:
+        payload = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, web.json_response({"error": "Request body must be valid JSON"}, status=400)
+
+    arguments, error = parse_rag_request(payload)
+    if error:
+        return None, web.json_response({"error": error}, status=400)
+    return arguments, None
+
+async def handle_rag(request):
+    """POST /api/independence-rag: answer a question."""
+    arguments, error_response = await _read_request(request)
+    if error_response is not None:
+        return error_response
+
+    try:
+        async with request.app[QUEUE].slot():
+            with track_request("api", arguments["mode"], arguments["limit"]) as request_metrics:
+                collection = await get_async_connection_manager().collection()
+                result = await cached_independence_rag_async(collection, **arguments)
+                request_metrics.set_result(result)
+    except QueueFull as e:
+        return _busy(request, e)
+    except ConnectionError as e:
+        logger.error(f"Error connecting to document database: {str(e)}")
+        return web.json_response({"error": "Could not connect to document database"}, status=503)
+    except Exception as e:
+        logger.exception(f"Error processing query: {str(e)}")
+        return web.json_response({"error": "An error occurred while answering the question"}, status=500)
+
+    return web.json_response(_public_result(result), dumps=lambda value: json.dumps(value, default=str))
+
+async def _send_event(response, event_type, data):
+    payload = json.dumps(data, default=str)
+    await response.write(f"event: {event_type}\ndata: {payload}\n\n".encode("utf-8"))
+
+async def handle_rag_stream(request):
+    """
+    POST /api/independence-rag/stream: answer a question as server-sent events.
+
+    Sends a "sources" event, "token" events with pieces of the answer, then a
+    "done" event with the result, or an "error" event.
+    """
+    arguments, error_response = await _read_request(request)
+    if error_response is not None:
+        return error_response
+
+    queue = request.app[QUEUE]
+    try:
+        # The queue slot is held until the stream ends
+        async with queue.slot():
+            response = web.StreamResponse(headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            })
+            await response.prepare(request)
+
+            try:
+                with track_request("api-stream", arguments["mode"], arguments["limit"]) as request_metrics:
+                    collection = await get_async_connection_manager().collection()
+                    async for event in cached_independence_rag_stream_async(collection, **arguments):
+                        if event["type"] == "sources":
+                            await _send_event(response, "sources", {"sources": event["sources"]})
+                        elif event["type"] == "token":
+                            await _send_event(response, "token", {"text": event["text"]})
+                        elif event["type"] == "done":
+                            request_metrics.set_result(event["result"])
+                            await _send_event(response, "done", _public_result(event["result"]))
+            except (ConnectionResetError, asyncio.CancelledError):
+                logger.info("Client disconnected during stream")
+                raise
+            except Exception as e:
+                logger.exception(f"Error streaming answer: {str(e)}")
+                await _send_event(response, "error", {"error": "An error occurred while answering the question"})
+
+            await response.write_eof()
+            return response
+    except QueueFull as e:
+        return _busy(request, e)
+
+async def handle_health(request):
+    """
+    GET /api/health: liveness of this worker.
+
+    With ?deep=1 the vector database is checked as well, and the worker
+    reports 503 if it is unreachable.
+    """
+    health = {
+        "status": "ok",
+        "worker": os.getpid(),
+        "uptime": time.monotonic() - request.app[STARTED],
+        "queue": request.app[QUEUE].get_stats()
+    }
+
+    if request.query.get("deep") in ("1", "true", "yes"):
+        try:
+            client = await get_async_connection_manager().client()
+            health["vector_database"] = "ok" if await client.is_ready() else "not ready"
+        except Exception as e:
+            logger.warning(f"Health check could not reach the vector database: {str(e)}")
+            health["vector_database"] = "unreachable"
+        if health["vector_database"] != "ok":
+            health["status"] = "degraded"
+            return web.json_response(health, status=503)
+
+    return web.json_response(health)
+
+async def handle_metrics(request):
+    """GET /api/metrics: counters of this worker."""
+    cache = get_semantic_cache()
+    single_flight = get_single_flight()
+    metrics = {
+        "worker": os.getpid(),
+        "requests": request.app[REQUEST_STATS],
+        "queue": request.app[QUEUE].get_stats(),
+        "llm": get_rate_limiter().stats(),
+        "single_flight": single_flight.get_stats() if single_flight else None,
+        "semantic_cache": cache.get_stats() if cache else None,
+        "vector_database": get_async_connection_manager().get_stats(),
+        "tracing": opik.get_stats(),
+        "stages": stage_summary()
+    }
+    return web.json_response(metrics)
+
+def _snapshot_path(directory):
+    return os.path.join(directory, f"worker-{os.getpid()}.json")
+
+async def handle_prometheus(request):
+    """
+    GET /metrics: metrics in the Prometheus text format.
+
+    With metrics_dir set, the snapshots written there by the other workers
+    are merged in, so that any worker answers for the whole server.
+    """
+    snapshot = get_registry().snapshot()
+    directory = get_config()["metrics_dir"]
+    if directory:
+        # This worker's live values replace its own, older snapshot file
+        others = await asyncio.to_thread(read_snapshots, directory, os.path.basename(_snapshot_path(directory)))
+        snapshot = merge_snapshots([snapshot] + others)
+    return web.Response(text=render_prometheus(snapshot),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+@web.middleware
+async def count_requests(request, handler):
+    """Count requests and responses by status class, and total handling time."""
+    stats = request.app[REQUEST_STATS]
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        stats["in_flight"] -= 1
+        stats["handling_time_total"] += time.perf_counter() - start
+        key = f"status_{status // 100}xx"
+        stats[key] = stats.get(key, 0) + 1
+
+async def _start_worker(app):
+    config = get_config()
+    app[QUEUE] = RequestQueue(config["api_max_concurrency"], config["api_max_queue"], config["api_queue_timeout"])
+    app[STARTED] = time.monotonic()
+    preload_query_vectorizer()
+    if config["metrics_dir"]:
+        path = _snapshot_path(config["metrics_dir"])
+        app[METRICS_EXPORT] = start_periodic_export(lambda: write_snapshot(path), config["metrics_export_interval"])
+    logger.info(f"API worker {os.getpid()} ready")
+
+async def _stop_worker(app):
+    await shutdown_async_connection_manager()
+    await close_shared_async_client()
+    if app.get(METRICS_EXPORT) is not None:
+        app[METRICS_EXPORT].set()
+        try:
+            os.remove(_snapshot_path(get_config()["metrics_dir"]))
+        except OSError:
+            pass
+
+def create_app(static_dir=None):
+    """
+    Create the API application for one worker.
+
+    Args:
+        static_dir (str, optional): Built React app (index.html and static/) to serve at /
+
+    Returns:
+        aiohttp.web.Application: Application; also usable as a gunicorn
+        aiohttp.GunicornWebWorker app factory
+    """
+    app = web.Application(middlewares=[count_requests], client_max_size=64 * 1024)
+    app[REQUEST_STATS] = {"requests": 0, "in_flight": 0, "handling_time_total": 0.0}
+    app.on_startup.append(_start_worker)
+    app.on_cleanup.append(_stop_worker)
+
+    app.router.add_post("/api/independence-rag", handle_rag)
+    app.router.add_post("/api/independence-rag/stream", handle_rag_stream)
+    app.router.add_get("/api/health", handle_health)
+    app.router.add_get("/api/metrics", handle_metrics)
+    app.router.add_get("/metrics", handle_prometheus)
+
+    static_dir = static_dir or get_config()["api_static_dir"]
+    if static_dir:
+        index = os.path.join(static_dir, "index.html")
+
+        async def handle_index(request):
+            return web.FileResponse(index)
+
+        app.router.add_get("/", handle_index)
+        if os.path.isdir(os.path.join(static_dir, "static")):
+            app.router.add_static("/static", os.path.join(static_dir, "static"))
+
+    return app
+
+def _serve_worker(host, port, static_dir, reuse_port):
+    """Run one worker process until it is stopped."""
+    configure_logging()
+    web.run_app(create_app(static_dir), host=host, port=port, reuse_port=reuse_port, print=None)
+
+def run_server(host=None, port=None, workers=None, static_dir=None):
+    """
+    Serve the API, optionally with several worker processes.
+
+    Workers share the listening port (SO_REUSEPORT) and the kernel spreads
+    connections between them; each has its own clients, queue and caches.
+
+    Args:
+        host (str, optional): Interface to bind; defaults to api_host
+        port (int, optional): Port to bind; defaults to api_port
+        workers (int, optional): Worker processes; defaults to api_workers
+        static_dir (str, optional): Built React app to serve at /
+    """
+    config = get_config()
+    host = host or config["api_host"]
+    port = port or config["api_port"]
+    workers = workers or config["api_workers"]
+
+    logger.info(f"Serving the API on http://{host}:{port} with {workers} worker(s)")
+    if workers == 1:
+        _serve_worker(host, port, static_dir, False)
+        return
+
+    metrics_dir = None
+    if not config["metrics_dir"]:
+        # Workers inherit the environment; each writes its metrics there for /metrics to merge
+        metrics_dir = tempfile.mkdtemp(prefix="api-metrics-")
+        os.environ["METRICS_DIR"] = metrics_dir
+
+    # Spawned rather than forked so no client, lock or thread is inherited
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_serve_worker, args=(host, port, static_dir, True), name=f"api-worker-{i}")
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    # Stopping with SIGTERM (e.g. by a supervisor) also stops the workers and cleans up
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping API workers")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Voices of Independence project.
+Run against local stand-ins so they need no cloud credentials.
+"""
@@ -0,0 +1,193 @@
+"""
+Load test of the HTTP API server.
+
+By default the server runs against local stand-ins: the Common Sense chunks
+are imported into a temporary local vector index, and the LLM is the stub
+server with a fixed latency. The API is started with --workers processes and
+driven by --concurrency clients sending --requests questions to the JSON or
+the streaming endpoint. Reports throughput, latency percentiles (time to the
+first token for streams), status codes and the server's queue counters.
+Pass --url to test an already running server instead.
+
+Usage:
+    python -m benchmarks.api_load --requests 500 --concurrency 64 --workers 2
+    python -m benchmarks.api_load --url http://127.0.0.1:8000 --stream
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+import aiohttp
+from utils.config import reload_config
+from .stub_llm_server import start_stub_server
+
+MODES = ["historian", "founding_father", "time_traveler"]
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _build_index(directory, path):
+    """Import the Common Sense chunks into a local index in directory."""
+    from database.local_index import connect_to_local_index
+    from database.schema import setup_weaviate_schema
+    from database.import_data import import_documents_to_weaviate
+    from data.document_processor import process_document
+    from .chunking import load_common_sense
+    from .context_budget import DOC_INFO
+
+    chunks = list(process_document(DOC_INFO, load_common_sense(path)))
+    collection = setup_weaviate_schema(connect_to_local_index(directory))
+    if not import_documents_to_weaviate(collection, iter(chunks))["success"]:
+        raise RuntimeError("Could not import the benchmark corpus into the local index")
+    return [" ".join(chunk["text"].split()[:8]) for chunk in chunks]
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float("nan")
+
+async def _one_request(session, url, payload, stream):
+    """Send one request; returns (status, seconds to the answer or to its first token)."""
+    start = time.perf_counter()
+    endpoint = f"{url}/api/independence-rag" + ("/stream" if stream else "")
+    async with session.post(endpoint, json=payload) as response:
+        if response.status != 200 or not stream:
+            await response.read()
+            return response.status, time.perf_counter() - start
+
+        first_token = None
+        async for line in response.content:
+            if first_token is None and line.startswith(b"event: token"):
+                first_token = time.perf_counter() - start
+            if line.startswith(b"event: error"):
+                return "error event", time.perf_counter() - start
+        return response.status, first_token if first_token is not None else time.perf_counter() - start
+
+async def _drive(url, queries, requests, concurrency, stream, seed=0):
+    rng = random.Random(seed)
+    payloads = [{"query": rng.choice(queries), "mode": rng.choice(MODES), "limit": 5} for _ in range(requests)]
+    statuses = Counter()
+    latencies = []
+    pending = iter(payloads)
+
+    async def client(session):
+        for payload in pending:
+            try:
+                status, latency = await _one_request(session, url, payload, stream)
+            except aiohttp.ClientError as e:
+                status, latency = type(e).__name__, None
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(latency)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        async with session.get(f"{url}/api/metrics") as response:
+            metrics = await response.json()
+
+    return statuses, latencies, elapsed, metrics
+
+async def _wait_until_ready(url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/api/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"API server at {url} did not become ready")
+
+def run_benchmark(url=None, path=None, requests=500, concurrency=64, workers=2, latency=0.5, stream=False,
+                  queries=200, max_concurrency=None, max_queue=None):
+    """
+    Load-test the API.
+
+    Args:
+        url (str, optional): Running server to test; by default one is started on local stand-ins
+        path (str, optional): Local copy of the Common Sense text
+        requests (int): Requests to send
+        concurrency (int): Concurrent clients
+        workers (int): API worker processes to start
+        latency (float): Stub LLM latency per call in seconds
+        stream (bool): Use the server-sent events endpoint
+        queries (int): Distinct questions to draw requests from
+        max_concurrency (int, optional): API_MAX_CONCURRENCY for the started server
+        max_queue (int, optional): API_MAX_QUEUE for the started server
+    """
+    server = process = directory = None
+    sample = [f"What does Common Sense say about question {i}?" for i in range(queries)]
+
+    try:
+        if url is None:
+            directory = tempfile.TemporaryDirectory()
+            server = start_stub_server(latency=latency)
+            env = dict(os.environ, VECTOR_BACKEND="local", EMBEDDING_MODEL="hashing",
+                       LOCAL_INDEX_DIR=os.path.join(directory.name, "index"), CACHE_DIR=directory.name,
+                       FRIENDLI_BASE_URL=server.base_url, FRIENDLI_TOKEN="stub-token", LOG_LEVEL="WARNING")
+            if max_concurrency:
+                env["API_MAX_CONCURRENCY"] = str(max_concurrency)
+            if max_queue:
+                env["API_MAX_QUEUE"] = str(max_queue)
+            os.environ.update({key: env[key] for key in ("VECTOR_BACKEND", "EMBEDDING_MODEL", "CACHE_DIR")})
+            reload_config()
+
+            openings = _build_index(env["LOCAL_INDEX_DIR"], path)
+            sample = random.Random(0).sample(openings, min(queries, len(openings)))
+
+            port = _free_port()
+            url = f"http://127.0.0.1:{port}"
+            process = subprocess.Popen([sys.executable, "-m", "api", "--port", str(port),
+                                        "--workers", str(workers)], env=env)
+            asyncio.run(_wait_until_ready(url))
+            print(f"API on {url} with {workers} worker(s), stub LLM latency {latency}s")
+
+        statuses, latencies, elapsed, metrics = asyncio.run(_drive(url, sample, requests, concurrency, stream))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if server is not None:
+            server.shutdown()
+        if directory is not None:
+            directory.cleanup()
+
+    label = "time to first token" if stream else "latency"
+    print(f"{requests} {'streaming ' if stream else ''}requests from {concurrency} clients in {elapsed:.2f}s "
+          f"({statuses[200] / elapsed:.1f} answers/s)")
+    print(f"Status codes: {json.dumps({str(status): count for status, count in sorted(statuses.items(), key=str)})}")
+    print(f"{label}: p50 {_percentile(latencies, 0.5):.3f}s  p95 {_percentile(latencies, 0.95):.3f}s  "
+          f"p99 {_percentile(latencies, 0.99):.3f}s")
+    print(f"Queue of worker {metrics['worker']}: {json.dumps(metrics['queue'])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url")
+    parser.add_argument("--file")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-concurrency", type=int)
+    parser.add_argument("--max-queue", type=int)
+    args = parser.parse_args()
+    run_benchmark(args.url, args.file, args.requests, args.concurrency, args.workers, args.latency, args.stream,
+                  args.queries, args.max_concurrency, args.max_queue)
@@ -0,0 +1,109 @@
+"""
+Throughput of independence_rag_batch() versus answering queries one at a time.
+
+Answers queries made of the opening words of sampled Common Sense chunks in
+every response mode, against the local vector index and the stub LLM server
+with a fixed per-call latency, and reports answers per minute and generated
+tokens per second for a serial independence_rag() loop and for the sync and
+async batch APIs.
+
+Usage:
+    python -m benchmarks.batch_throughput --queries 40 --latency 0.5
+"""
+
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from utils.config import get_config, reload_config
+from utils.embeddings import get_embedder
+from utils.tokens import count_tokens
+from database.local_index import LocalCollection, AsyncLocalCollection
+from database.import_data import _chunk_properties
+from data.document_processor import process_document
+from .chunking import load_common_sense
+from .context_budget import DOC_INFO
+from .stub_llm_server import start_stub_server
+
+def _sample_queries(chunks, count, words=8, seed=0):
+    """Opening words of distinct randomly chosen chunks."""
+    picked = random.Random(seed).sample(chunks, min(count, len(chunks)))
+    return [" ".join(chunk["text"].split()[:words]) for chunk in picked]
+
+def _report(label, answers, tokens, elapsed):
+    print(f"{label:<28}{elapsed:9.2f}{answers / elapsed * 60:13.1f}{tokens / elapsed:10.1f}")
+
+def run_benchmark(model="hashing", path=None, queries=40, latency=0.5, max_concurrency=None):
+    """
+    Compare serial and batched answering.
+
+    Args:
+        model (str): Embedder name for get_embedder()
+        path (str, optional): Local copy of the text
+        queries (int): Number of distinct queries
+        latency (float): Stub LLM latency per call in seconds
+        max_concurrency (int, optional): LLM calls in flight for the batch APIs
+    """
+    server = start_stub_server(latency=latency)
+    os.environ["FRIENDLI_BASE_URL"] = server.base_url
+    os.environ.setdefault("FRIENDLI_TOKEN", "stub-token")
+    reload_config()
+
+    # Imported after the environment points at the stub server
+    from rag.independence_rag import independence_rag
+    from rag.batch import independence_rag_batch, independence_rag_batch_async
+    from rag.llm_client import close_shared_clients, close_shared_async_client
+
+    config = get_config()
+    modes = list(config["response_modes"])
+    max_concurrency = max_concurrency or config["batch_max_concurrency"]
+    chunks = list(process_document(DOC_INFO, load_common_sense(path)))
+    sampled = _sample_queries(chunks, queries)
+    answers = len(sampled) * len(modes)
+    print(f"{len(sampled)} queries x {len(modes)} modes, stub latency {latency}s, "
+          f"batch concurrency {max_concurrency}")
+    print(f"{'':<28}{'seconds':>9}{'queries/min':>13}{'tokens/s':>10}")
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            collection = LocalCollection("Batch", directory, get_embedder(model))
+            collection.upsert([(_chunk_properties(chunk), None, None) for chunk in chunks])
+
+            start = time.perf_counter()
+            tokens = 0
+            for query in sampled:
+                for mode in modes:
+                    tokens += count_tokens(independence_rag(collection, query, mode=mode)["response"])
+            _report("serial independence_rag", answers, tokens, time.perf_counter() - start)
+
+            for event in independence_rag_batch(collection, sampled, modes=modes, max_concurrency=max_concurrency):
+                if event["type"] == "summary":
+                    stats = event["stats"]
+            _report("independence_rag_batch", stats["answered"], stats["response_tokens"], stats["elapsed"])
+
+            async def run_async():
+                try:
+                    async for event in independence_rag_batch_async(AsyncLocalCollection(collection), sampled,
+                                                                     modes=modes, max_concurrency=max_concurrency):
+                        if event["type"] == "summary":
+                            return event["stats"]
+                finally:
+                    await close_shared_async_client()
+
+            stats = asyncio.run(run_async())
+            _report("independence_rag_batch_async", stats["answered"], stats["response_tokens"], stats["elapsed"])
+    finally:
+        close_shared_clients()
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="hashing")
+    parser.add_argument("--file")
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--max-concurrency", type=int)
+    args = parser.parse_args()
+    run_benchmark(args.model, args.file, args.queries, args.latency, args.max_concurrency)
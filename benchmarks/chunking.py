@@ -0,0 +1,123 @@
+"""
+Chunking throughput on Thomas Paine's "Common Sense".
+
+Without --file, the benchmarks in this package run on synthetic text of the
+same length, generated deterministically, so they need no network; pass
+--file with a local copy (e.g. of https://www.gutenberg.org/cache/epub/147/pg147.txt)
+to use the real text.
+
+Usage:
+    python -m benchmarks.chunking --repeat 5
+    python -m benchmarks.chunking --file common_sense.txt
+"""
+
+import time
+import random
+import argparse
+import itertools
+import statistics
+from data.document_processor import chunk_text, get_length_function
+
+COMMON_SENSE_CHARACTERS = 120_000
+
+FUNCTION_WORDS = ("the", "of", "and", "to", "a", "in", "that", "is", "it", "for", "be", "as", "by", "not",
+                  "with", "which", "this", "but", "are", "have", "from", "or", "all", "on", "we", "they",
+                  "their", "will", "would", "can", "no", "so", "than", "them", "our", "his", "there")
+
+CONTENT_WORDS = ("america", "england", "britain", "king", "crown", "parliament", "government", "society",
+                 "liberty", "freedom", "independence", "colonies", "continent", "constitution", "monarchy",
+                 "republic", "people", "nation", "power", "right", "law", "trade", "commerce", "war", "peace",
+                 "reconciliation", "tyranny", "subjects", "representation", "assembly", "congress", "charter",
+                 "authority", "property", "security", "union", "navy", "debt", "treaty", "europe", "france",
+                 "spain", "hereditary", "succession", "sovereign", "petition", "interest", "cause", "nature",
+                 "reason", "conscience", "religion", "protection", "defence", "taxation", "blood", "enemy",
+                 "friend", "posterity", "mankind", "history", "ages", "principle", "argument", "common", "sense")
+
+def _synthetic_words(count, rng):
+    """Pronounceable made-up words, a long tail of rare terms like a real vocabulary."""
+    onsets = ("b", "c", "d", "f", "g", "h", "l", "m", "n", "p", "r", "s", "t", "v", "w", "br", "ch", "cr",
+              "pl", "pr", "st", "th", "tr")
+    vowels = ("a", "e", "i", "o", "u", "ea", "ou", "ai")
+    codas = ("", "", "n", "r", "s", "t", "l", "nd", "st", "ck", "ty", "ment", "tion", "ance")
+    words = set()
+    while len(words) < count:
+        syllables = rng.randint(1, 3)
+        words.add("".join(rng.choice(onsets) + rng.choice(vowels) for _ in range(syllables)) + rng.choice(codas))
+    return sorted(words)
+
+def synthetic_text(characters=COMMON_SENSE_CHARACTERS, seed=0):
+    """
+    Generate prose-like text with a Zipfian vocabulary, for benchmarking without the real corpus.
+    
+    Sentences mix function words, a set of political terms and a long tail
+    of rare made-up words, so chunks differ from each other in the terms
+    that BM25 and the embedders key on. The same seed gives the same text.
+    
+    Args:
+        characters (int): Approximate length of the text
+        seed (int): Random seed
+        
+    Returns:
+        str: Paragraphs separated by blank lines
+    """
+    rng = random.Random(seed)
+    vocabulary = list(CONTENT_WORDS) + _synthetic_words(4000, rng)
+    cumulative = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    paragraphs = []
+    length = 0
+    
+    while length < characters:
+        sentences = []
+        for _ in range(rng.randint(2, 7)):
+            words = [rng.choice(FUNCTION_WORDS) if rng.random() < 0.45
+                     else rng.choices(vocabulary, cum_weights=cumulative)[0]
+                     for _ in range(rng.randint(8, 35))]
+            sentences.append(" ".join(words).capitalize() + rng.choice((".", ".", ".", ".", "?", "!")))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    
+    return "\n\n".join(paragraphs)
+
+def load_common_sense(path=None):
+    """Load the Common Sense text from a local copy, or synthetic text of the same length."""
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    return synthetic_text()
+
+def run_benchmark(path=None, repeat=5, chunk_size=1000, chunk_overlap=200):
+    """
+    Chunk the text by characters and by tokens and report throughput.
+
+    Args:
+        path (str, optional): Local copy of the text
+        repeat (int): Timed passes per unit
+        chunk_size (int): Maximum chunk size
+        chunk_overlap (int): Maximum overlap between consecutive chunks
+    """
+    text = load_common_sense(path)
+    megabytes = len(text.encode("utf-8")) / 1e6
+    print(f"{'Common Sense' if path else 'Synthetic text'}: {len(text):,} characters, chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
+
+    for unit in ("chars", "tokens"):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chunks = list(chunk_text(text, chunk_size, chunk_overlap, unit))
+            timings.append(time.perf_counter() - start)
+
+        elapsed = statistics.median(timings)
+        length_function = get_length_function(unit)
+        sizes = [length_function(chunk) for chunk in chunks]
+        print(f"{unit:<7} {len(chunks):5d} chunks   {elapsed * 1000:8.1f} ms   {megabytes / elapsed:6.2f} MB/s   "
+              f"{len(chunks) / elapsed:8.0f} chunks/s   size mean {statistics.mean(sizes):6.0f} max {max(sizes)} {unit}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args()
+    run_benchmark(args.file, args.repeat, args.chunk_size, args.chunk_overlap)
@@ -0,0 +1,86 @@
+"""
+Prompt tokens saved by the token-budgeted context builder.
+
+Retrieves chunks of the Common Sense text for sampled phrase queries from the
+local vector index, then compares the verbatim context (every chunk with its
+overlap) with build_context() under each mode's token budget.
+
+Usage:
+    python -m benchmarks.context_budget --limits 5 10
+"""
+
+import time
+import argparse
+import tempfile
+import statistics
+from utils.config import get_config
+from utils.embeddings import get_embedder
+from database.local_index import LocalCollection
+from database.import_data import _chunk_properties
+from data.document_processor import process_document
+from rag.retriever import format_search_results
+from rag.context_builder import build_context
+from .chunking import load_common_sense
+from .retrieval_recall import build_queries
+
+DOC_INFO = {
+    "title": "Common Sense",
+    "url": "https://www.gutenberg.org/cache/epub/147/pg147.txt",
+    "date": "1776-01-10",
+    "authors": ["Thomas Paine"],
+    "type": "pamphlet"
+}
+
+def run_benchmark(model="hashing", path=None, limits=(5, 10), queries=100):
+    """
+    Report prompt tokens with and without the context builder.
+
+    Args:
+        model (str): Embedder name for get_embedder()
+        path (str, optional): Local copy of the text
+        limits (tuple): Retrieval limits to compare
+        queries (int): Number of phrase queries
+    """
+    config = get_config()
+    embedder = get_embedder(model)
+    chunks = list(process_document(DOC_INFO, load_common_sense(path)))
+    sampled = build_queries([chunk["text"] for chunk in chunks], queries)
+    print(f"{len(chunks)} chunks (size {config['chunk_size']}, overlap {config['chunk_overlap']} "
+          f"{config['chunk_unit']}), {len(sampled)} queries")
+    print(f"{'limit':>5}  {'budget':<22}{'verbatim':>9}{'prompt':>8}{'saved':>7}{'overlap':>9}"
+          f"{'dropped':>9}{'build ms':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        collection = LocalCollection("Context", directory, embedder)
+        collection.upsert([(_chunk_properties(chunk), None, None) for chunk in chunks])
+
+        budgets = [("none", None)] + [(f"{mode} ({budget})", budget)
+                                      for mode, budget in config["context_token_budgets"].items()]
+
+        for limit in limits:
+            retrieved = [format_search_results(collection.query.near_text(phrase, limit=limit).objects)
+                         for phrase, _ in sampled]
+
+            for label, budget in budgets:
+                stats, timings = [], []
+                for docs in retrieved:
+                    start = time.perf_counter()
+                    stats.append(build_context(docs, token_budget=budget)["stats"])
+                    timings.append((time.perf_counter() - start) * 1000)
+
+                def mean(key):
+                    return statistics.mean(s[key] for s in stats)
+
+                # "verbatim" is what the prompt cost before: every chunk with its header and overlap
+                print(f"{limit:>5}  {label:<22}{mean('unmerged_tokens'):9.0f}{mean('prompt_tokens'):8.0f}"
+                      f"{mean('tokens_saved'):7.0f}{mean('overlap_tokens_removed'):9.0f}"
+                      f"{mean('chunks_dropped'):9.2f}{statistics.median(timings):10.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="hashing")
+    parser.add_argument("--file")
+    parser.add_argument("--limits", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(args.model, args.file, tuple(args.limits), args.queries)
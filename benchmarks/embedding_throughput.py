@@ -0,0 +1,66 @@
+"""
+Client-side embedding throughput on the Common Sense chunks.
+
+Measures the embedder alone at several batch sizes, then a cold and a warm
+pass through the on-disk embedding cache, as a re-import would see them.
+
+Usage:
+    python -m benchmarks.embedding_throughput --model hashing
+    python -m benchmarks.embedding_throughput --model sentence-transformers/multi-qa-MiniLM-L6-cos-v1
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from utils.embeddings import get_embedder
+from utils.embedding_cache import EmbeddingCache, embed_texts
+from data.document_processor import chunk_text
+from .chunking import load_common_sense
+
+def _report(label, count, elapsed):
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms   {count / elapsed:10.0f} chunks/s")
+
+def run_benchmark(model="hashing", path=None, batch_sizes=(1, 32, 256)):
+    """
+    Embed the Common Sense chunks and report throughput.
+
+    Args:
+        model (str): Embedder name for get_embedder()
+        path (str, optional): Local copy of the text
+        batch_sizes (tuple): Batch sizes to compare
+    """
+    chunks = list(chunk_text(load_common_sense(path)))
+    embedder = get_embedder(model)
+    print(f"{len(chunks)} chunks, model {embedder.model_id} ({embedder.dim} dimensions)")
+
+    # Warm up lazy initialisation before timing
+    embedder.embed(chunks[:1])
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        embed_texts(chunks, embedder, cache=None, batch_size=batch_size)
+        _report(f"no cache, batch {batch_size}", len(chunks), time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = EmbeddingCache(os.path.join(directory, "embeddings.sqlite3"))
+        batch_size = max(batch_sizes)
+
+        start = time.perf_counter()
+        embed_texts(chunks, embedder, cache=cache, batch_size=batch_size)
+        _report("cold cache", len(chunks), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        embed_texts(chunks, embedder, cache=cache, batch_size=batch_size)
+        _report("warm cache (re-import)", len(chunks), time.perf_counter() - start)
+
+        print(f"Cache: {cache.get_stats()}")
+        cache.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="hashing")
+    parser.add_argument("--file")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256])
+    args = parser.parse_args()
+    run_benchmark(args.model, args.file, tuple(args.batch_sizes))
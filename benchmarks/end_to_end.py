@@ -0,0 +1,281 @@
+"""
+End-to-end latency and throughput of the RAG pipeline against local stand-ins.
+
+The Common Sense chunks are imported into a temporary local vector index,
+which stands in for the Weaviate collection, and the LLM is the stub server
+with a fixed time to first token (--latency), token rate and share of
+injected 500 errors. A workload of queries in random response modes (the
+opening words of sampled chunks, or a --workload file in the batch format)
+is replayed through independence_rag(), or independence_rag_stream() with
+--stream, either by --concurrency closed-loop clients or, with --qps, as
+open-loop arrivals at a fixed rate. Open-loop latencies are timed from each
+request's scheduled start, so that a backlog is not hidden by clients
+waiting for the pipeline. --cached goes through the semantic cache and
+request coalescing as the web interfaces do.
+
+Reports throughput, latency and time-to-first-token percentiles, errors and
+p50/p99 per pipeline stage (estimated from the rag_stage_duration_seconds
+histogram). --json saves the results; --baseline compares against a saved
+file and exits with status 1 if throughput dropped, or p99 latency rose, by
+more than --tolerance.
+
+Usage:
+    python -m benchmarks.end_to_end --requests 200 --concurrency 16 --json e2e.json
+    python -m benchmarks.end_to_end --qps 20 --stream --error-rate 0.05 --baseline e2e.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import get_config, reload_config
+from utils.embeddings import get_embedder
+from utils.metrics import bucket_quantile
+from database.local_index import LocalCollection
+from database.import_data import _chunk_properties
+from data.document_processor import process_document
+from .chunking import load_common_sense
+from .context_budget import DOC_INFO
+from .batch_throughput import _sample_queries
+from .stub_llm_server import start_stub_server
+
+def _percentiles(values):
+    """p50, p95 and p99 (nearest rank) and mean of values, in milliseconds."""
+    if not values:
+        return None
+    values = sorted(values)
+
+    def rank(fraction):
+        return round(values[min(int(len(values) * fraction), len(values) - 1)] * 1000, 2)
+
+    return {"p50": rank(0.5), "p95": rank(0.95), "p99": rank(0.99),
+            "mean": round(sum(values) / len(values) * 1000, 2)}
+
+def _stage_counts():
+    """Per-stage bucket counts recorded so far in rag_stage_duration_seconds."""
+    from rag.metrics import STAGE_SECONDS
+    stages = {key[0] for key, _ in STAGE_SECONDS.samples()}
+    return {stage: STAGE_SECONDS.bucket_counts(stage=stage) for stage in stages}
+
+def _stage_percentiles(before, after):
+    """Estimated p50/p99 milliseconds per stage from the recordings between two _stage_counts()."""
+    from rag.metrics import STAGE_SECONDS
+    stages = {}
+    for stage, counts in sorted(after.items()):
+        delta = [a - b for a, b in zip(counts, before.get(stage, [0] * len(counts)))]
+        if sum(delta):
+            stages[stage] = {
+                "count": sum(delta),
+                "p50": round(bucket_quantile(STAGE_SECONDS.buckets, delta, 0.5) * 1000, 2),
+                "p99": round(bucket_quantile(STAGE_SECONDS.buckets, delta, 0.99) * 1000, 2)
+            }
+    return stages
+
+def _workload(queries, requests, modes, limit, seed=0):
+    rng = random.Random(seed)
+    return [{"query": rng.choice(queries), "mode": rng.choice(modes), "limit": limit} for _ in range(requests)]
+
+def _replay(pipeline, collection, workload, stream, concurrency, qps):
+    """
+    Send the workload through the pipeline.
+
+    Returns:
+        tuple: (latencies, times to first token, errors, elapsed seconds)
+    """
+    latencies = []
+    first_tokens = []
+    errors = []
+    lock = threading.Lock()
+
+    def request(item, scheduled=None):
+        start = scheduled or time.perf_counter()
+        first_token = None
+        try:
+            if stream:
+                for event in pipeline(collection, item["query"], mode=item["mode"], limit=item["limit"]):
+                    if event["type"] == "token" and first_token is None:
+                        first_token = time.perf_counter() - start
+            else:
+                pipeline(collection, item["query"], mode=item["mode"], limit=item["limit"])
+        except Exception as e:
+            with lock:
+                errors.append(type(e).__name__)
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            if first_token is not None:
+                first_tokens.append(first_token)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if qps:
+            # Open loop: arrivals keep their schedule however long earlier requests take
+            for i, item in enumerate(workload):
+                scheduled = start + i / qps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(request, item, scheduled)
+        else:
+            list(executor.map(request, workload))
+    return latencies, first_tokens, errors, time.perf_counter() - start
+
+def _compare(results, baseline, tolerance):
+    """Print the change against a baseline; returns False on a regression beyond tolerance."""
+    if baseline.get("settings") != results["settings"]:
+        print("Note: the baseline was run with different settings")
+    ok = True
+    checks = [
+        ("throughput", results["throughput"], baseline.get("throughput"), -1),
+        ("p99 latency", results["latency_ms"]["p99"], (baseline.get("latency_ms") or {}).get("p99"), 1)
+    ]
+    if results["ttft_ms"] and baseline.get("ttft_ms"):
+        checks.append(("p99 TTFT", results["ttft_ms"]["p99"], baseline["ttft_ms"]["p99"], 1))
+
+    for label, value, before, direction in checks:
+        if not before:
+            continue
+        change = value / before - 1
+        regressed = change * direction > tolerance
+        ok = ok and not regressed
+        print(f"{label:<14}{before:>10.2f} -> {value:<10.2f}{change:+.0%}{'  !' if regressed else ''}")
+    if not ok:
+        print(f"Regressed by more than {tolerance:.0%} against the baseline")
+    return ok
+
+def run_benchmark(requests=200, concurrency=16, qps=None, stream=False, cached=False, workload_path=None,
+                  limit=5, latency=0.2, token_rate=None, error_rate=0.0, model="hashing", path=None, warmup=5,
+                  seed=0, json_path=None, baseline_path=None, tolerance=0.2):
+    """
+    Replay a query workload end to end and report latency and throughput.
+
+    Args:
+        requests (int): Requests in the workload
+        concurrency (int): Closed-loop clients, or the most requests in flight with qps
+        qps (float, optional): Open-loop arrival rate; closed loop when omitted
+        stream (bool): Use the streaming pipeline and measure time to first token
+        cached (bool): Go through the semantic cache and request coalescing
+        workload_path (str, optional): Questions, one per line or JSONL with a "query" field
+        limit (int): Documents retrieved per query
+        latency (float): Stub LLM time to first token in seconds
+        token_rate (float, optional): Stub LLM words per second after the first
+        error_rate (float): Share of stub LLM calls answered 500
+        model (str): Embedder name for get_embedder()
+        path (str, optional): Local copy of the text
+        warmup (int): Requests sent first and left out of the results
+        seed (int): Seed for the workload and the stub's error injection
+        json_path (str, optional): File to save the results to
+        baseline_path (str, optional): Results file to compare against
+        tolerance (float): Allowed regression against the baseline, as a fraction
+
+    Returns:
+        bool: False if the run regressed against the baseline beyond the tolerance
+    """
+    random.seed(seed)
+    server = start_stub_server(latency=latency, token_rate=token_rate, error_rate=error_rate)
+    os.environ["FRIENDLI_BASE_URL"] = server.base_url
+    os.environ.setdefault("FRIENDLI_TOKEN", "stub-token")
+    reload_config()
+
+    # Imported after the environment points at the stub server
+    from rag.independence_rag import independence_rag, independence_rag_stream
+    from rag.semantic_cache import cached_independence_rag, cached_independence_rag_stream
+    from rag.llm_client import close_shared_clients
+
+    if cached:
+        pipeline = cached_independence_rag_stream if stream else cached_independence_rag
+    else:
+        pipeline = independence_rag_stream if stream else independence_rag
+
+    modes = list(get_config()["response_modes"])
+    chunks = list(process_document(DOC_INFO, load_common_sense(path)))
+    if workload_path:
+        from main import load_batch_queries
+        queries = load_batch_queries(workload_path)
+    else:
+        queries = _sample_queries(chunks, 50, seed=seed)
+    workload = _workload(queries, requests, modes, limit, seed)
+
+    load = f"{qps} requests/s open loop" if qps else f"{concurrency} clients"
+    print(f"{requests} requests ({len(set(queries))} distinct queries) by {load}, "
+          f"{'streaming' if stream else 'non-streaming'}{', cached' if cached else ''}; "
+          f"stub LLM {latency}s to first token, {token_rate or 'instant'} words/s, {error_rate:.0%} errors")
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            collection = LocalCollection("EndToEnd", directory, get_embedder(model))
+            collection.upsert([(_chunk_properties(chunk), None, None) for chunk in chunks])
+
+            _replay(pipeline, collection, _workload(queries, warmup, modes, limit, seed + 1), stream, 1, None)
+            stages_before = _stage_counts()
+            llm_before = dict(server.stats)
+            latencies, first_tokens, errors, elapsed = _replay(pipeline, collection, workload, stream,
+                                                               concurrency, qps)
+            stages = _stage_percentiles(stages_before, _stage_counts())
+    finally:
+        close_shared_clients()
+        server.shutdown()
+
+    results = {
+        "settings": {
+            "requests": requests, "concurrency": concurrency, "qps": qps, "stream": stream, "cached": cached,
+            "workload": workload_path, "limit": limit, "latency": latency, "token_rate": token_rate,
+            "error_rate": error_rate, "model": model, "seed": seed
+        },
+        "elapsed": round(elapsed, 3),
+        "completed": len(latencies),
+        "errors": {name: errors.count(name) for name in sorted(set(errors))},
+        "throughput": round(len(latencies) / elapsed, 2),
+        "latency_ms": _percentiles(latencies),
+        "ttft_ms": _percentiles(first_tokens),
+        "stages_ms": stages,
+        "llm_calls": {key: server.stats[key] - llm_before[key] for key in ("requests", "errors", "throttled")}
+    }
+
+    print(f"{results['completed']} answered, {len(errors)} failed in {elapsed:.2f}s: "
+          f"{results['throughput']:.2f} answers/s; LLM calls {results['llm_calls']}")
+    print(f"{'':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, values in (("latency", results["latency_ms"]), ("time to first token", results["ttft_ms"])):
+        if values:
+            print(f"{label:<28}{values['p50']:10.1f}{values['p95']:10.1f}{values['p99']:10.1f}")
+    for stage, values in stages.items():
+        print(f"{'stage ' + stage:<28}{values['p50']:10.1f}{'':>10}{values['p99']:10.1f}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {json_path}")
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            return _compare(results, json.load(f), tolerance)
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--qps", type=float)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--cached", action="store_true")
+    parser.add_argument("--workload")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-rate", type=float)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--model", default="hashing")
+    parser.add_argument("--file")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    ok = run_benchmark(args.requests, args.concurrency, args.qps, args.stream, args.cached, args.workload,
+                       args.limit, args.latency, args.token_rate, args.error_rate, args.model, args.file,
+                       args.warmup, args.seed, args.json, args.baseline, args.tolerance)
+    sys.exit(0 if ok else 1)
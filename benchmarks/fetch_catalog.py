@@ -0,0 +1,166 @@
+"""
+Throughput of a full SOURCES catalog pull against local HTTP stand-ins.
+
+Each archive host in the catalog is replaced by a local server on its own
+loopback address (127.0.0.2, 127.0.0.3, ...), so per-host limits behave as
+they would against the real archives. Pages are synthetic, served with a
+configurable latency and an ETag, so cached re-ingestion can be measured too.
+
+Usage:
+    python -m benchmarks.fetch_catalog --repeat 10 --latency 0.2
+"""
+
+import os
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.config import reload_config
+from data.sources import get_all_sources
+from data.document_fetcher import fetch_documents
+
+PARAGRAPH = (
+    "When in the Course of human events, it becomes necessary for one people to dissolve the "
+    "political bands which have connected them with another, and to assume among the powers of "
+    "the earth, the separate and equal station to which the Laws of Nature entitle them. "
+)
+
+class StubArchiveHandler(BaseHTTPRequestHandler):
+    """Serves a synthetic document for any path."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Silence per-request logging."""
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        etag = '"' + hashlib.sha1(self.path.encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        path = self.path.split("?")[0]
+        if path.endswith(".txt"):
+            content_type = "text/plain; charset=utf-8"
+            body = PARAGRAPH * self.server.paragraphs
+        else:
+            content_type = "text/html; charset=utf-8"
+            paragraphs = "".join(f"<p>{PARAGRAPH}</p>" for _ in range(self.server.paragraphs))
+            body = f"<html><body><div class=\"main-content\">{paragraphs}</div></body></html>"
+
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_archive_stand_ins(hosts, latency=0.0, paragraphs=40):
+    """
+    Start one stub archive server per host.
+
+    Args:
+        hosts (list): Real host names to stand in for
+        latency (float): Seconds each response is delayed
+        paragraphs (int): Paragraphs per synthetic document
+
+    Returns:
+        dict: Host name -> running server
+    """
+    servers = {}
+    for i, host in enumerate(hosts):
+        server = ThreadingHTTPServer((f"127.0.0.{i + 2}", 0), StubArchiveHandler)
+        server.daemon_threads = True
+        server.latency = latency
+        server.paragraphs = paragraphs
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[host] = server
+    return servers
+
+def build_catalog(servers, repeat=1):
+    """Point every catalog entry at its host's stand-in, repeated to enlarge the pull."""
+    doc_infos = []
+    for n in range(repeat):
+        for source in get_all_sources():
+            parsed = urlparse(source["url"])
+            host, port = servers[parsed.netloc].server_address[:2]
+            doc_info = dict(source)
+            doc_info["url"] = f"http://{host}:{port}{parsed.path}?copy={n}"
+            doc_infos.append(doc_info)
+    return doc_infos
+
+def _report(label, stats):
+    print(f"{label:<22} {stats['elapsed']:7.2f} s   {stats['docs_per_second']:8.1f} docs/s   "
+          f"{stats['bytes_per_second'] / 1024:9.1f} KiB/s   cached {stats['cache_hits']:4d}   failed {stats['failed']}")
+
+def run_benchmark(repeat=10, latency=0.2, max_workers=8, per_host_limit=2):
+    """
+    Pull the catalog serially, concurrently and through the fetch cache, and report throughput.
+
+    Args:
+        repeat (int): Copies of the catalog to pull
+        latency (float): Simulated server latency per request in seconds
+        max_workers (int): Global concurrency for the concurrent pull
+        per_host_limit (int): Per-host concurrency for the concurrent pull
+    """
+    hosts = sorted({urlparse(source["url"]).netloc for source in get_all_sources()})
+    servers = start_archive_stand_ins(hosts, latency=latency)
+    # Point the fetch cache at an empty directory before it is first used
+    os.environ["FETCH_CACHE_DIR"] = tempfile.mkdtemp(prefix="fetch-cache-")
+    reload_config()
+
+    try:
+        doc_infos = build_catalog(servers, repeat)
+        print(f"{len(doc_infos)} documents from {len(hosts)} hosts, {latency * 1000:.0f} ms latency")
+
+        os.environ["FETCH_CACHE_ENABLED"] = "false"
+        reload_config()
+        serial = fetch_documents(doc_infos, max_workers=1, per_host_limit=1)["stats"]
+        _report("serial, no cache", serial)
+
+        concurrent = fetch_documents(doc_infos, max_workers=max_workers, per_host_limit=per_host_limit)["stats"]
+        _report("concurrent, no cache", concurrent)
+
+        print(f"Concurrency speedup: {serial['elapsed'] / concurrent['elapsed']:.1f}x "
+              f"(max_workers={max_workers}, per_host_limit={per_host_limit})")
+
+        os.environ["FETCH_CACHE_ENABLED"] = "true"
+        reload_config()
+        _report("cold cache", fetch_documents(doc_infos, max_workers, per_host_limit)["stats"])
+
+        os.environ["FETCH_CACHE_MAX_AGE"] = "0"
+        reload_config()
+        _report("revalidated (304)", fetch_documents(doc_infos, max_workers, per_host_limit)["stats"])
+        del os.environ["FETCH_CACHE_MAX_AGE"]
+        reload_config()
+
+        _report("fresh cache", fetch_documents(doc_infos, max_workers, per_host_limit)["stats"])
+
+        os.environ["FETCH_OFFLINE"] = "true"
+        reload_config()
+        _report("offline", fetch_documents(doc_infos, max_workers, per_host_limit)["stats"])
+        del os.environ["FETCH_OFFLINE"]
+        reload_config()
+    finally:
+        for server in servers.values():
+            server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--per-host-limit", type=int, default=2)
+    args = parser.parse_args()
+    run_benchmark(args.repeat, args.latency, args.max_workers, args.per_host_limit)
@@ -0,0 +1,127 @@
+"""
+Filtered versus post-filtered retrieval as the corpus grows.
+
+Pushdown passes the compiled metadata filter to the search, so the top k are
+taken among matching chunks only. Post-filtering searches unfiltered with an
+over-fetched limit and drops non-matching chunks in Python, which is what the
+retriever would have to do without filter support. For each corpus size the
+benchmark reports latency and how many of the true filtered top k each
+approach returns.
+
+Runs on the local vector index with random vectors, so it needs no Weaviate
+cluster.
+
+Usage:
+    python -m benchmarks.filtered_retrieval --sizes 2000 10000 50000
+"""
+
+import time
+import argparse
+import tempfile
+import statistics
+import numpy as np
+from database.local_index import LocalCollection, matches_filter
+from rag.filters import build_filters
+from .local_index_search import _RandomEmbedder
+
+DOCUMENT_TYPES = ["founding_document", "pamphlet", "speech", "letter", "essay"]
+AUTHORS = ["Thomas Jefferson", "John Adams", "Abigail Adams", "James Madison", "Thomas Paine", "Patrick Henry"]
+YEARS = range(1760, 1816)
+
+def _corpus(rng, size, dim):
+    """Synthetic chunks with metadata spread over the founding era."""
+    vectors = rng.standard_normal((size, dim), dtype=np.float32)
+    batch = []
+    for i in range(size):
+        year = int(rng.choice(YEARS))
+        properties = {
+            "text": f"chunk {i}",
+            "date": f"{year}-{int(rng.integers(1, 13)):02d}-{int(rng.integers(1, 29)):02d}T00:00:00Z",
+            "document_type": DOCUMENT_TYPES[int(rng.integers(len(DOCUMENT_TYPES)))],
+            "authors": [AUTHORS[int(rng.integers(len(AUTHORS)))]],
+            "chunk_id": i
+        }
+        batch.append((properties, None, vectors[i]))
+    return batch
+
+def _sample_filters(rng, count):
+    """Queries like "letters by one author from a given year"."""
+    samples = []
+    for _ in range(count):
+        year = str(int(rng.choice(YEARS)))
+        samples.append({
+            "date_from": year,
+            "date_to": year,
+            "document_types": [DOCUMENT_TYPES[int(rng.integers(len(DOCUMENT_TYPES)))]]
+        })
+    return samples
+
+def _post_filter(collection, vector, where, limit, overfetch):
+    """Search unfiltered with limit * overfetch results and filter them in Python."""
+    results = collection.search(vector, limit=limit * overfetch)
+    matching = [obj for obj in results.objects if matches_filter(where, str(obj.uuid), obj.properties)]
+    return matching[:limit]
+
+def _p50_p95(timings_ms):
+    timings_ms = sorted(timings_ms)
+    return statistics.median(timings_ms), timings_ms[max(int(len(timings_ms) * 0.95) - 1, 0)]
+
+def run_benchmark(sizes=(2000, 10000, 50000), dim=384, limit=5, overfetch=10, queries=100):
+    """
+    Compare pushdown and post-filtering at several corpus sizes.
+
+    Args:
+        sizes (tuple): Corpus sizes
+        dim (int): Vector dimension
+        limit (int): Results per query
+        overfetch (int): Post-filter search limit as a multiple of limit
+        queries (int): Queries per corpus size
+    """
+    rng = np.random.default_rng(0)
+    embedder = _RandomEmbedder(dim)
+    print(f"limit {limit}, post-filter over-fetch {overfetch}x, {queries} queries per size")
+    print(f"{'objects':>8}  {'mode':<12}{'p50 ms':>9}{'p95 ms':>9}{'returned':>10}{'recall':>8}")
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            collection = LocalCollection("Filtered", directory, embedder)
+            collection.upsert(_corpus(rng, size, dim))
+
+            vectors = rng.standard_normal((queries, dim), dtype=np.float32)
+            filters = [build_filters(sample) for sample in _sample_filters(rng, queries)]
+
+            pushdown_ms, post_ms = [], []
+            pushdown_returned = post_returned = post_found = 0
+
+            for vector, where in zip(vectors, filters):
+                start = time.perf_counter()
+                exact = collection.query.near_vector(vector, limit=limit, filters=where).objects
+                pushdown_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                approximate = _post_filter(collection, vector, where, limit, overfetch)
+                post_ms.append((time.perf_counter() - start) * 1000)
+
+                # Pushdown is exact, so its results are the ground truth
+                truth = {obj.uuid for obj in exact}
+                pushdown_returned += len(exact)
+                post_returned += len(approximate)
+                post_found += len(truth.intersection(obj.uuid for obj in approximate))
+
+            for mode, timings, returned, found in (
+                ("pushdown", pushdown_ms, pushdown_returned, pushdown_returned),
+                ("post-filter", post_ms, post_returned, post_found)
+            ):
+                p50, p95 = _p50_p95(timings)
+                recall = found / pushdown_returned if pushdown_returned else 1.0
+                print(f"{size:>8}  {mode:<12}{p50:9.3f}{p95:9.3f}{returned / queries:10.2f}{recall:8.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--overfetch", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(tuple(args.sizes), args.dim, args.limit, args.overfetch, args.queries)
@@ -0,0 +1,138 @@
+"""
+Cold-start import time of the entry points, from python -X importtime.
+
+Each target module is imported --repeat times in a fresh interpreter (after
+one discarded run that writes bytecode caches). Reports the median
+cumulative import time, the heaviest direct imports of the median run and
+which heavy dependencies the import pulled in. --json saves the results;
+--baseline compares against a saved file and exits with status 1 if any
+target got slower by more than --tolerance.
+
+Usage:
+    python -m benchmarks.import_time --json import_times.json
+    python -m benchmarks.import_time --baseline import_times.json --tolerance 0.2
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+TARGETS = ["main", "rag", "rag.independence_rag", "api.server", "ui.gradio_app"]
+
+# Dependencies that should only be imported by the code paths that use them
+HEAVY_MODULES = ["matplotlib", "pandas", "gradio", "weaviate", "opik", "openai", "aiohttp", "numpy"]
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+def _import_once(target):
+    """Import target in a fresh interpreter; returns [(module, depth, self us, cumulative us)]."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                             cwd=root, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{process.stderr[-2000:]}")
+
+    modules = []
+    for line in process.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            modules.append((module, len(indent) // 2, int(own), int(cumulative)))
+    return modules
+
+def measure(target, repeat=5):
+    """
+    Measure the cold-start import of one module.
+
+    Args:
+        target (str): Module to import
+        repeat (int): Fresh interpreters to time
+
+    Returns:
+        dict: Median and per-run cumulative milliseconds, the heaviest direct
+        imports and the heavy dependencies loaded
+    """
+    _import_once(target)
+    runs = []
+    for _ in range(repeat):
+        modules = _import_once(target)
+        total = next(cumulative for module, depth, own, cumulative in reversed(modules)
+                     if module == target and depth == 0)
+        runs.append((total / 1000, modules))
+
+    median = statistics.median(total for total, _ in runs)
+    _, modules = min(runs, key=lambda run: abs(run[0] - median))
+    loaded = {module.split(".")[0] for module, _, _, _ in modules}
+    # Depth 0 is the target itself plus modules imported before it; depth 1 are its direct imports
+    direct = sorted(((cumulative / 1000, module) for module, depth, _, cumulative in modules if depth == 1),
+                    reverse=True)
+    return {
+        "median_ms": round(median, 1),
+        "runs_ms": [round(total, 1) for total, _ in runs],
+        "heaviest": [[module, round(ms, 1)] for ms, module in direct[:5]],
+        "heavy_modules": [module for module in HEAVY_MODULES if module in loaded]
+    }
+
+def run_benchmark(targets=None, repeat=5, json_path=None, baseline_path=None, tolerance=0.2):
+    """
+    Measure and report import times, optionally against a baseline.
+
+    Args:
+        targets (list, optional): Modules to import; defaults to TARGETS
+        repeat (int): Fresh interpreters per target
+        json_path (str, optional): File to save the results to
+        baseline_path (str, optional): Results file to compare against
+        tolerance (float): Allowed slowdown against the baseline, as a fraction
+
+    Returns:
+        bool: False if a target regressed beyond the tolerance
+    """
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    ok = True
+    print(f"{'target':<24}{'median ms':>10}{'baseline':>10}{'change':>9}  heavy dependencies")
+    for target in targets or TARGETS:
+        try:
+            result = measure(target, repeat)
+        except RuntimeError as e:
+            print(f"{target:<24}  skipped: {str(e).splitlines()[-1]}")
+            continue
+        results[target] = result
+
+        before = baseline.get(target, {}).get("median_ms")
+        change = ""
+        if before:
+            ratio = result["median_ms"] / before - 1
+            change = f"{ratio:+.0%}"
+            if ratio > tolerance:
+                ok = False
+                change += " !"
+        print(f"{target:<24}{result['median_ms']:10.1f}{before or '-':>10}{change:>9}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+        print(f"{'':<24}heaviest: " + ", ".join(f"{module} {ms:.0f}" for module, ms in result["heaviest"]))
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {json_path}")
+    if baseline and not ok:
+        print(f"Import time regressed by more than {tolerance:.0%}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("targets", nargs="*")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    sys.exit(0 if run_benchmark(args.targets, args.repeat, args.json, args.baseline, args.tolerance) else 1)
@@ -0,0 +1,69 @@
+"""
+Per-call overhead of a fresh OpenAI client versus the shared keep-alive client.
+
+Usage:
+    python -m benchmarks.llm_client_overhead --calls 200
+"""
+
+import os
+import time
+import argparse
+import statistics
+from openai import OpenAI
+from utils.config import reload_config
+from .stub_llm_server import start_stub_server
+
+MESSAGES = [
+    {"role": "system", "content": "You are an expert historian."},
+    {"role": "user", "content": "What were the main grievances against King George III?"}
+]
+
+def _time_calls(make_client, calls):
+    """Time each chat completion, including any client construction."""
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client = make_client()
+        client.chat.completions.create(model="stub", messages=MESSAGES)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def _report(label, timings):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+    print(f"{label:<24} mean {statistics.mean(timings_ms):7.3f} ms   "
+          f"p50 {statistics.median(timings_ms):7.3f} ms   p95 {p95:7.3f} ms")
+
+def run_benchmark(calls=200):
+    """
+    Compare per-call latency of a new client per call against the shared client.
+
+    Args:
+        calls (int): Number of calls per variant
+    """
+    server = start_stub_server()
+    os.environ["FRIENDLI_BASE_URL"] = server.base_url
+    os.environ.setdefault("FRIENDLI_TOKEN", "stub-token")
+    reload_config()
+
+    # Imported after the environment points at the stub server
+    from rag.llm_client import get_shared_client, close_shared_clients
+
+    try:
+        fresh = _time_calls(lambda: OpenAI(base_url=server.base_url, api_key="stub-token"), calls)
+        shared = _time_calls(get_shared_client, calls)
+    finally:
+        close_shared_clients()
+        server.shutdown()
+
+    print(f"{calls} calls against {server.base_url}")
+    _report("new client per call", fresh)
+    _report("shared keep-alive client", shared)
+    print(f"Saved per call: {(statistics.mean(fresh) - statistics.mean(shared)) * 1000:.3f} ms "
+          "(plain HTTP; a TLS endpoint adds a handshake to every new-client call)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    run_benchmark(args.calls)
@@ -0,0 +1,135 @@
+"""
+Burst of LLM calls against a rate-limited endpoint, with and without the limiter.
+
+The stub LLM server answers 429 whenever more than --server-concurrency
+requests are in flight (and for a random --throttle-rate share of requests).
+A burst of calls is sent from many threads, and from asyncio tasks,
+(1) straight to a client without retries, (2) to a client using the OpenAI
+SDK's default retries, which is how call_llm() behaved before the limiter,
+and (3) through call_llm() and call_llm_async() with the shared rate limiter.
+
+Usage:
+    python -m benchmarks.llm_rate_limit --calls 200 --threads 32 --server-concurrency 4
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI
+from utils.config import reload_config
+from .stub_llm_server import start_stub_server
+from .llm_client_overhead import MESSAGES
+
+def _run(call, calls, threads):
+    """Make calls from a thread pool; returns (latencies of successes, failures, elapsed)."""
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        outcomes = list(executor.map(timed, range(calls)))
+    return [t for t in outcomes if t is not None], outcomes.count(None), time.perf_counter() - start
+
+def _run_async(call, calls):
+    """Make calls as concurrent asyncio tasks."""
+    async def timed():
+        start = time.perf_counter()
+        try:
+            await call()
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    async def burst():
+        from rag.llm_client import close_shared_async_client
+
+        try:
+            return await asyncio.gather(*(timed() for _ in range(calls)))
+        finally:
+            await close_shared_async_client()
+
+    start = time.perf_counter()
+    outcomes = asyncio.run(burst())
+    return [t for t in outcomes if t is not None], outcomes.count(None), time.perf_counter() - start
+
+def _report(label, server, throttled_before, latencies, failures, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)] if latencies else float("nan")
+    p50 = statistics.median(latencies) if latencies else float("nan")
+    print(f"{label:<26}{len(latencies):>5}{failures:>7}{server.stats['throttled'] - throttled_before:>7}"
+          f"{elapsed:9.2f}{p50:9.2f}{p95:9.2f}")
+
+def run_benchmark(calls=200, threads=32, latency=0.2, server_concurrency=4, throttle_rate=0.0, retry_after=None):
+    """
+    Compare failures and latency of a call burst with and without the rate limiter.
+
+    Args:
+        calls (int): Calls per variant
+        threads (int): Threads making the calls
+        latency (float): Stub LLM latency per call in seconds
+        server_concurrency (int): Requests the stub serves at once before answering 429
+        throttle_rate (float): Share of requests the stub answers 429 at random
+        retry_after (float, optional): Retry-After seconds the stub sends with 429s
+    """
+    server = start_stub_server(latency=latency, max_concurrency=server_concurrency,
+                               throttle_rate=throttle_rate, retry_after=retry_after)
+    os.environ["FRIENDLI_BASE_URL"] = server.base_url
+    os.environ.setdefault("FRIENDLI_TOKEN", "stub-token")
+    reload_config()
+
+    # Imported after the environment points at the stub server
+    from rag.generator import call_llm, call_llm_async
+    from rag.llm_client import get_shared_client, get_shared_async_client, close_shared_clients
+    from rag.rate_limiter import get_rate_limiter, reset_rate_limiter
+
+    print(f"{calls} calls from {threads} threads; stub serves {server_concurrency} at once, "
+          f"{latency}s each, throttle rate {throttle_rate}, Retry-After {retry_after}")
+    print(f"{'':<26}{'ok':>5}{'failed':>7}{'429s':>7}{'seconds':>9}{'p50 s':>9}{'p95 s':>9}")
+
+    try:
+        no_retries = OpenAI(base_url=server.base_url, api_key="stub-token", max_retries=0)
+        sdk_retries = OpenAI(base_url=server.base_url, api_key="stub-token")
+        variants = [
+            ("no retries", lambda: no_retries.chat.completions.create(model="stub", messages=MESSAGES)),
+            ("SDK default retries", lambda: sdk_retries.chat.completions.create(model="stub", messages=MESSAGES)),
+            ("rate limiter", lambda: call_llm(get_shared_client(), MESSAGES, model="stub"))
+        ]
+        for label, call in variants:
+            reset_rate_limiter()
+            throttled = server.stats["throttled"]
+            _report(label, server, throttled, *_run(call, calls, threads))
+
+        limiter_stats = get_rate_limiter().stats()
+
+        reset_rate_limiter()
+        throttled = server.stats["throttled"]
+        _report("rate limiter (asyncio)", server, throttled,
+                *_run_async(lambda: call_llm_async(get_shared_async_client(), MESSAGES, model="stub"), calls))
+    finally:
+        close_shared_clients()
+        server.shutdown()
+
+    print(f"Limiter after the threaded burst: concurrency limit {limiter_stats['concurrency_limit']}, "
+          f"{limiter_stats['retries']} retries, {limiter_stats['limit_decreases']} limit decreases, "
+          f"max wait {limiter_stats['wait_time_max']:.2f}s")
+    print(f"Most requests the stub served at once: {server.stats['max_in_flight']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--server-concurrency", type=int, default=4)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float)
+    args = parser.parse_args()
+    run_benchmark(args.calls, args.threads, args.latency, args.server_concurrency, args.throttle_rate,
+                  args.retry_after)
@@ -0,0 +1,93 @@
+"""
+Search latency of the in-process local vector index.
+
+Builds a collection of synthetic chunks with random unit vectors, then times
+near_vector, filtered near_vector and a cold load of the memory-mapped files.
+
+Usage:
+    python -m benchmarks.local_index_search --objects 20000 --dim 384
+"""
+
+import time
+import argparse
+import tempfile
+import statistics
+import numpy as np
+from weaviate.classes.query import Filter
+from database.local_index import LocalCollection
+
+DOCUMENT_TYPES = ["founding_document", "pamphlet", "speech", "letter"]
+
+class _RandomEmbedder:
+    """Embedder stand-in: vectors are supplied directly, so only dim and model_id matter."""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.model_id = f"random-{dim}"
+
+    def embed(self, texts):
+        raise NotImplementedError("benchmark objects carry their own vectors")
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def _report(label, timings_ms):
+    timings_ms = sorted(timings_ms)
+    p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+    print(f"{label:<24} p50 {statistics.median(timings_ms):8.3f} ms   p95 {p95:8.3f} ms")
+
+def run_benchmark(objects=20000, dim=384, limit=5, repeat=200):
+    """
+    Build a local collection and report query latency.
+
+    Args:
+        objects (int): Number of objects to index
+        dim (int): Vector dimension
+        limit (int): Results per query
+        repeat (int): Queries per measurement
+    """
+    rng = np.random.default_rng(0)
+    embedder = _RandomEmbedder(dim)
+
+    with tempfile.TemporaryDirectory() as directory:
+        collection = LocalCollection("Benchmark", directory, embedder)
+        vectors = rng.standard_normal((objects, dim), dtype=np.float32)
+        batch = [
+            ({"text": f"chunk {i}", "chunk_id": i % 50, "document_type": DOCUMENT_TYPES[i % len(DOCUMENT_TYPES)]},
+             None, vectors[i])
+            for i in range(objects)
+        ]
+
+        start = time.perf_counter()
+        collection.upsert(batch)
+        print(f"Indexed {objects} x {dim} vectors in {time.perf_counter() - start:.2f}s")
+
+        queries = rng.standard_normal((repeat, dim), dtype=np.float32)
+        query_iter = iter(np.tile(queries, (3, 1)))
+
+        _report("near_vector", _time(lambda: collection.query.near_vector(next(query_iter), limit=limit), repeat))
+
+        letters = Filter.by_property("document_type").equal("letter")
+        _report("near_vector + filter", _time(
+            lambda: collection.query.near_vector(next(query_iter), limit=limit, filters=letters), repeat
+        ))
+
+        start = time.perf_counter()
+        reloaded = LocalCollection("Benchmark", directory, embedder)
+        load_ms = (time.perf_counter() - start) * 1000
+        first_ms = _time(lambda: reloaded.query.near_vector(next(query_iter), limit=limit), 1)[0]
+        print(f"{'cold load (mmap)':<24} {load_ms:8.1f} ms, first query {first_ms:.3f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run_benchmark(args.objects, args.dim, args.limit, args.repeat)
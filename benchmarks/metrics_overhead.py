@@ -0,0 +1,108 @@
+"""
+Per-call cost of recording metrics, and of rendering them.
+
+Times --calls recordings of a counter, a gauge and a histogram with the
+labels the RAG pipeline uses, from one thread and from --threads threads at
+once (recordings of one metric share its lock), then one request's worth of
+pipeline recordings: the stage timings, an LLM call and the entry point's
+request metrics. Finally times rendering a registry with --series label
+combinations per histogram in the Prometheus text format, as a scrape of
+/metrics does.
+
+Usage:
+    python -m benchmarks.metrics_overhead --calls 200000 --threads 8
+"""
+
+import time
+import argparse
+import threading
+from utils.metrics import MetricsRegistry, render_prometheus
+
+LABELS = {"stage": "search", "mode": "historian", "limit": 5}
+
+def _per_call(fn, calls):
+    """Mean seconds per call of fn()."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+def _per_call_threaded(fn, calls, threads):
+    """Mean wall-clock seconds per call of fn() with calls spread over threads."""
+    per_thread = calls // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def run():
+        barrier.wait()
+        for _ in range(per_thread):
+            fn()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (per_thread * threads)
+
+def _request_recordings():
+    """One request's recordings, through rag.metrics as the pipeline makes them."""
+    from rag.metrics import observe_stages, observe_llm_call, track_request
+
+    timings = {"search": 0.004, "format": 0.0001, "context": 0.001, "generation": 1.2, "total": 1.21}
+
+    def record():
+        with track_request("api", "historian", 5) as request_metrics:
+            observe_stages(timings, "historian", 5)
+            observe_llm_call("meta-llama-3.3-70b-instruct", False, 1.2)
+            request_metrics.set_result({})
+    return record
+
+def run_benchmark(calls=200000, threads=8, series=100):
+    """
+    Report recording and rendering costs.
+
+    Args:
+        calls (int): Recordings per measurement
+        threads (int): Threads recording concurrently
+        series (int): Label combinations per histogram when rendering
+    """
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "Benchmark counter", tuple(LABELS))
+    gauge = registry.gauge("bench_in_flight", "Benchmark gauge", ("entry",))
+    histogram = registry.histogram("bench_seconds", "Benchmark histogram", tuple(LABELS))
+
+    recordings = [
+        ("counter.inc", lambda: counter.inc(**LABELS)),
+        ("gauge.inc", lambda: gauge.inc(entry="api")),
+        ("histogram.observe", lambda: histogram.observe(0.01, **LABELS))
+    ]
+    print(f"{calls} calls. Cost per call in ns:")
+    print(f"{'recording':<20}{'1 thread':>12}{f'{threads} threads':>12}")
+    for label, fn in recordings:
+        single = _per_call(fn, calls)
+        threaded = _per_call_threaded(fn, calls, threads)
+        print(f"{label:<20}{single * 1e9:12.0f}{threaded * 1e9:12.0f}")
+
+    request = _request_recordings()
+    print(f"{'one RAG request':<20}{_per_call(request, calls // 10) * 1e9:12.0f}")
+
+    # Rendering: several histograms with many label combinations each
+    render_registry = MetricsRegistry()
+    for name in ("stage", "request", "llm"):
+        metric = render_registry.histogram(f"bench_{name}_seconds", "Benchmark histogram", tuple(LABELS))
+        for i in range(series):
+            metric.observe(0.01 * i, stage=f"stage-{i % 10}", mode=f"mode-{i // 10}", limit=5)
+    start = time.perf_counter()
+    text = render_prometheus(render_registry.snapshot())
+    elapsed = time.perf_counter() - start
+    print(f"Rendering {3 * series} histogram series ({len(text) // 1024} KiB): {elapsed * 1e3:.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--series", type=int, default=100)
+    args = parser.parse_args()
+    run_benchmark(args.calls, args.threads, args.series)
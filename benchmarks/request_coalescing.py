@@ -0,0 +1,97 @@
+"""
+LLM calls and latency of a burst of identical questions, with and without single-flight coalescing.
+
+Simulates a classroom asking the same question at once: --clients threads
+send the same query (with varying case and spacing) to the streaming and the
+non-streaming pipeline, against the local vector index and the stub LLM
+server. The semantic cache is disabled so that only coalescing is measured.
+
+Usage:
+    python -m benchmarks.request_coalescing --clients 30 --latency 1.0
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import reload_config
+from utils.embeddings import get_embedder
+from database.local_index import LocalCollection
+from database.import_data import _chunk_properties
+from data.document_processor import process_document
+from .chunking import load_common_sense
+from .context_budget import DOC_INFO
+from .stub_llm_server import start_stub_server
+
+QUERY = "What did Thomas Paine say about the cause of America?"
+
+def _variants(count):
+    """The same question as different users type it."""
+    spellings = [QUERY, QUERY.lower(), QUERY.upper(), "  " + QUERY.replace(" ", "  ")]
+    return [spellings[i % len(spellings)] for i in range(count)]
+
+def run_benchmark(model="hashing", path=None, clients=30, latency=1.0):
+    """
+    Compare LLM calls and latency with coalescing on and off.
+
+    Args:
+        model (str): Embedder name for get_embedder()
+        path (str, optional): Local copy of the text
+        clients (int): Concurrent identical requests
+        latency (float): Stub LLM latency per call in seconds
+    """
+    server = start_stub_server(latency=latency)
+    os.environ["FRIENDLI_BASE_URL"] = server.base_url
+    os.environ.setdefault("FRIENDLI_TOKEN", "stub-token")
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    reload_config()
+
+    # Imported after the environment points at the stub server
+    from rag.semantic_cache import cached_independence_rag, cached_independence_rag_stream
+    from rag.llm_client import close_shared_clients
+
+    def answer(collection, query):
+        start = time.perf_counter()
+        cached_independence_rag(collection, query)
+        return time.perf_counter() - start
+
+    def stream(collection, query):
+        start = time.perf_counter()
+        first_token = None
+        for event in cached_independence_rag_stream(collection, query):
+            if event["type"] == "token" and first_token is None:
+                first_token = time.perf_counter() - start
+        return first_token
+
+    print(f"{clients} concurrent identical requests, stub latency {latency}s")
+    print(f"{'':<12}{'coalescing':<12}{'LLM calls':>10}{'p50 s':>8}{'max s':>8}")
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            collection = LocalCollection("Coalescing", directory, get_embedder(model))
+            chunks = process_document(DOC_INFO, load_common_sense(path))
+            collection.upsert([(_chunk_properties(chunk), None, None) for chunk in chunks])
+
+            for label, request in (("answer", answer), ("stream TTFT", stream)):
+                for enabled in (False, True):
+                    os.environ["SINGLE_FLIGHT_ENABLED"] = str(enabled)
+                    reload_config()
+                    before = server.stats["requests"]
+                    with ThreadPoolExecutor(max_workers=clients) as executor:
+                        timings = list(executor.map(lambda query: request(collection, query), _variants(clients)))
+                    print(f"{label:<12}{'on' if enabled else 'off':<12}{server.stats['requests'] - before:>10}"
+                          f"{statistics.median(timings):8.2f}{max(timings):8.2f}")
+    finally:
+        close_shared_clients()
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="hashing")
+    parser.add_argument("--file")
+    parser.add_argument("--clients", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=1.0)
+    args = parser.parse_args()
+    run_benchmark(args.model, args.file, args.clients, args.latency)
@@ -0,0 +1,108 @@
+"""
+Recall@k of vector, BM25 and hybrid retrieval on the Common Sense chunks.
+
+Queries are distinctive phrases sampled from the text; a query's relevant
+chunks are the ones containing the phrase. Runs on the local vector index, so
+it needs no Weaviate cluster.
+
+Usage:
+    python -m benchmarks.retrieval_recall --queries 200
+    python -m benchmarks.retrieval_recall --model sentence-transformers/multi-qa-MiniLM-L6-cos-v1
+"""
+
+import random
+import argparse
+import tempfile
+from weaviate.classes.query import HybridFusion
+from utils.embeddings import get_embedder
+from database.local_index import LocalCollection, tokenize, STOPWORDS
+from data.document_processor import chunk_text
+from .chunking import load_common_sense
+
+K_VALUES = (1, 3, 5, 10)
+
+def build_queries(chunks, count, phrase_words=3, max_matches=2, seed=0):
+    """
+    Sample phrases that occur in at most max_matches chunks.
+
+    Returns:
+        list: (phrase, set of relevant chunk indexes) pairs
+    """
+    rng = random.Random(seed)
+    tokenized = [tokenize(chunk) for chunk in chunks]
+    joined = [" " + " ".join(tokens) + " " for tokens in tokenized]
+    queries = []
+
+    for _ in range(count * 20):
+        if len(queries) == count:
+            break
+        tokens = tokenized[rng.randrange(len(chunks))]
+        if len(tokens) <= phrase_words:
+            continue
+        start = rng.randrange(len(tokens) - phrase_words)
+        words = tokens[start:start + phrase_words]
+        if sum(word not in STOPWORDS for word in words) < 2:
+            continue
+        phrase = " ".join(words)
+        relevant = {i for i, text in enumerate(joined) if f" {phrase} " in text}
+        if len(relevant) <= max_matches:
+            queries.append((phrase, relevant))
+
+    return queries
+
+def recall_at_k(collection, queries, search):
+    """Average fraction of relevant chunks found in the top k, for each k."""
+    recalls = {k: 0.0 for k in K_VALUES}
+    for phrase, relevant in queries:
+        ranked = [obj.properties["chunk_id"] for obj in search(collection, phrase, max(K_VALUES)).objects]
+        for k in K_VALUES:
+            recalls[k] += len(relevant.intersection(ranked[:k])) / len(relevant)
+    return {k: total / len(queries) for k, total in recalls.items()}
+
+def run_benchmark(model="hashing", path=None, queries=200, alpha=0.5):
+    """
+    Index the Common Sense chunks and compare recall@k across search modes.
+
+    Args:
+        model (str): Embedder name for get_embedder()
+        path (str, optional): Local copy of the text
+        queries (int): Number of phrase queries
+        alpha (float): Hybrid alpha
+    """
+    chunks = list(chunk_text(load_common_sense(path)))
+    embedder = get_embedder(model)
+    sampled = build_queries(chunks, queries)
+    print(f"{len(chunks)} chunks, {len(sampled)} phrase queries, model {embedder.model_id}, alpha {alpha}")
+
+    modes = {
+        "vector": lambda c, q, k: c.query.near_text(q, limit=k),
+        "bm25": lambda c, q, k: c.query.bm25(q, limit=k),
+        "hybrid (relative)": lambda c, q, k: c.query.hybrid(q, alpha=alpha, limit=k,
+                                                            fusion_type=HybridFusion.RELATIVE_SCORE),
+        "hybrid (ranked)": lambda c, q, k: c.query.hybrid(q, alpha=alpha, limit=k,
+                                                          fusion_type=HybridFusion.RANKED)
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        collection = LocalCollection("Recall", directory, embedder)
+        collection.upsert([({"text": chunk, "chunk_id": i}, None, None) for i, chunk in enumerate(chunks)])
+
+        print(f"{'mode':<20}" + "".join(f"{f'R@{k}':>8}" for k in K_VALUES))
+        results = {}
+        for name, search in modes.items():
+            results[name] = recall_at_k(collection, sampled, search)
+            print(f"{name:<20}" + "".join(f"{results[name][k]:8.3f}" for k in K_VALUES))
+
+    target = results["vector"][max(K_VALUES)]
+    smallest = next((k for k in K_VALUES if results["hybrid (relative)"][k] >= target), None)
+    if smallest is not None:
+        print(f"Hybrid matches vector recall@{max(K_VALUES)} ({target:.3f}) at limit {smallest}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="hashing")
+    parser.add_argument("--file")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    args = parser.parse_args()
+    run_benchmark(args.model, args.file, args.queries, args.alpha)
@@ -0,0 +1,225 @@
+"""
+Local OpenAI-compatible stub server for benchmarks.
+
+Serves POST /v1/chat/completions with a canned answer over HTTP/1.1 keep-alive,
+either as one JSON response or, with "stream": true, as server-sent chunks, so
+client-side overhead can be measured without calling FriendliAI. The first
+token arrives after a fixed latency and the rest at a fixed token rate. It
+can also answer 429 Too Many Requests, to the first requests, above a number
+of requests in flight or for a random share of requests, to exercise the
+client's rate limiter, and 500 for a random share of requests to inject
+server errors.
+"""
+
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = (
+    "The colonists objected to taxation without representation, the quartering of troops "
+    "and the dissolution of colonial legislatures, as the Declaration of Independence records."
+)
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Request handler that answers chat completion calls with a canned response."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Silence per-request logging."""
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        """Write one HTTP/1.1 chunk so streamed responses keep the connection alive."""
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_answer(self, request, answer, settings):
+        """Send the answer word by word as server-sent chat completion chunks."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            if i and settings["token_rate"]:
+                time.sleep(1.0 / settings["token_rate"])
+            chunk = {
+                "id": "chatcmpl-stub-stream",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": None
+                }]
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        settings = self.server.settings
+        stats = self.server.stats
+        with self.server.stats_lock:
+            stats["requests"] += 1
+            overloaded = settings["max_concurrency"] and stats["in_flight"] >= settings["max_concurrency"]
+            overloaded = overloaded or stats["requests"] <= settings["throttle_first"]
+            if overloaded or random.random() < settings["throttle_rate"]:
+                stats["throttled"] += 1
+                status = 429
+            elif random.random() < settings["error_rate"]:
+                stats["errors"] += 1
+                status = 500
+            else:
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                status = 200
+
+        if status == 429:
+            headers = {}
+            if settings["retry_after"] is not None:
+                headers["Retry-After"] = str(settings["retry_after"])
+            if settings["retry_after_ms"] is not None:
+                headers["Retry-After-Ms"] = str(settings["retry_after_ms"])
+            self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}}, headers)
+            return
+        if status == 500:
+            self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            return
+
+        try:
+            self._answer(request, settings)
+        finally:
+            with self.server.stats_lock:
+                stats["in_flight"] -= 1
+
+    def _answer(self, request, settings):
+        """Send the canned answer after the configured latency, at the configured token rate."""
+        if settings["latency"]:
+            time.sleep(settings["latency"])
+
+        answer = settings["answer"]
+        if request.get("stream"):
+            self._stream_answer(request, answer, settings)
+            return
+
+        completion_tokens = len(answer.split())
+        if settings["token_rate"]:
+            time.sleep((completion_tokens - 1) / settings["token_rate"])
+        self._send_json(200, {
+            "id": f"chatcmpl-stub-{self.server.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": completion_tokens,
+                "total_tokens": completion_tokens
+            }
+        })
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server holding the stub settings and request counters.
+
+    Args:
+        address (tuple): Host and port to bind
+        latency (float): Seconds to wait before answering (the time to first token)
+        answer (str): Canned answer
+        token_rate (float, optional): Words per second after the first; None sends them at once
+        max_concurrency (int, optional): Answer 429 while this many requests are in flight
+        throttle_rate (float): Share of requests answered 429 at random
+        throttle_first (int): Number of first requests answered 429
+        retry_after (float or str, optional): Retry-After header value sent with 429s,
+            seconds or an HTTP date
+        retry_after_ms (float, optional): Retry-After-Ms header value sent with 429s
+        error_rate (float): Share of requests answered 500 at random
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, answer=DEFAULT_ANSWER, token_rate=None, max_concurrency=None,
+                 throttle_rate=0.0, throttle_first=0, retry_after=None, retry_after_ms=None, error_rate=0.0):
+        super().__init__(address, StubLLMHandler)
+        self.settings = {"latency": latency, "answer": answer, "token_rate": token_rate,
+                         "max_concurrency": max_concurrency, "throttle_rate": throttle_rate,
+                         "throttle_first": throttle_first, "retry_after": retry_after,
+                         "retry_after_ms": retry_after_ms, "error_rate": error_rate}
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        """OpenAI-compatible base URL for this server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+def start_stub_server(host="127.0.0.1", port=0, **settings):
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind, 0 picks a free port
+        **settings: Stub settings (latency, answer, token_rate, max_concurrency, throttle_rate,
+            throttle_first, retry_after, retry_after_ms, error_rate)
+
+    Returns:
+        StubLLMServer: Running server; call shutdown() to stop it
+    """
+    server = StubLLMServer((host, port), **settings)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--token-rate", type=float, help="Words per second after the first")
+    parser.add_argument("--max-concurrency", type=int, help="Answer 429 above this many requests in flight")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500")
+    args = parser.parse_args()
+
+    server = StubLLMServer((args.host, args.port), latency=args.latency, token_rate=args.token_rate,
+                           max_concurrency=args.max_concurrency, throttle_rate=args.throttle_rate,
+                           retry_after=args.retry_after, error_rate=args.error_rate)
+    print(f"Stub LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,88 @@
+"""
+Per-call cost of the tracing decorator in each tracing mode.
+
+Times a trivial function called --calls times without a decorator and
+through Tracer.track() with tracing disabled, with 0%, 10% and 100% of
+traces sampled. For each mode it reports the cost of an entry point call
+(which makes the sampling decision), of a span nested in a trace, of a
+helper tracked with trivial=True and of a call nested beyond the depth
+limit. Spans are exported on the tracer's background thread to a function
+that discards them, so the numbers are the request thread's cost only.
+With --sdk the Opik SDK's own @opik.track is timed too; it needs Opik to be
+configured and sends its spans there.
+
+Usage:
+    python -m benchmarks.tracing_overhead --calls 200000
+"""
+
+import time
+import argparse
+from utils.opik_tracking import Tracer
+
+def _discard(spans):
+    pass
+
+def _per_call(fn, calls):
+    """Mean seconds per call of fn(i)."""
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls
+
+def _nested_per_call(tracer, fn, calls, depth):
+    """Mean seconds per call of fn(i) made depth spans below a sampled entry point."""
+    def run(level):
+        if level == depth:
+            return _per_call(fn, calls)
+        return tracer.track(name=f"level-{level}")(run)(level + 1)
+    return run(0)
+
+def _modes():
+    return [
+        ("disabled", Tracer(enabled=False, export=_discard)),
+        ("0% sampled", Tracer(sample_rate=0.0, export=_discard)),
+        ("10% sampled", Tracer(sample_rate=0.1, export=_discard)),
+        ("100% sampled", Tracer(sample_rate=1.0, export=_discard, buffer_size=10 ** 7))
+    ]
+
+def run_benchmark(calls=200000, sdk=False):
+    """
+    Report per-call decorator overhead in each tracing mode.
+
+    Args:
+        calls (int): Calls per measurement
+        sdk (bool): Also time the Opik SDK's @opik.track
+    """
+    def work(i):
+        return i
+
+    baseline = _per_call(work, calls)
+    print(f"{calls} calls; undecorated call {baseline * 1e9:.0f} ns. Overhead per call in ns:")
+    print(f"{'mode':<14}{'entry point':>13}{'nested span':>13}{'trivial':>13}{'past depth':>13}")
+
+    for label, tracer in _modes():
+        entry = tracer.track(name="entry")(work)
+        nested = tracer.track(name="nested")(work)
+        trivial = tracer.track(trivial=True)(work)
+        rows = [
+            _per_call(entry, calls),
+            _nested_per_call(tracer, nested, calls, 1),
+            _nested_per_call(tracer, trivial, calls, 1),
+            _nested_per_call(tracer, nested, calls, tracer.max_depth)
+        ]
+        tracer.flush(timeout=60)
+        print(f"{label:<14}" + "".join(f"{(seconds - baseline) * 1e9:13.0f}" for seconds in rows))
+
+    if sdk:
+        import opik
+        sdk_calls = min(calls, 2000)
+        seconds = _per_call(opik.track(name="entry")(work), sdk_calls)
+        print(f"{'Opik SDK':<14}{(seconds - baseline) * 1e9:13.0f}  ({sdk_calls} calls)")
+        opik.flush_tracker()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--sdk", action="store_true")
+    args = parser.parse_args()
+    run_benchmark(args.calls, args.sdk)
@@ -3,16 +3,38 @@ Data module for the Voices of Independence project.
 Provides functionality for collecting and processing historical documents.
 """
 
-from .sources import SOURCES, get_all_sources, get_sources_by_type
-from .document_fetcher import fetch_document
-from .document_processor import chunk_text, process_document, collect_all_documents
+from utils.lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    ".sources": [
+        'SOURCES',
+        'get_all_sources',
+        'get_sources_by_type'
+    ],
+    ".document_fetcher": [
+        'fetch_document',
+        'fetch_documents'
+    ],
+    ".fetch_cache": [
+        'FetchCache',
+        'get_fetch_cache'
+    ],
+    ".document_processor": [
+        'chunk_text',
+        'process_document',
+        'collect_all_documents'
+    ]
+})
 
 __all__ = [
     'SOURCES',
     'get_all_sources',
     'get_sources_by_type',
     'fetch_document',
+    'fetch_documents',
+    'FetchCache',
+    'get_fetch_cache',
     'chunk_text',
     'process_document',
     'collect_all_documents'
-]
\ No newline at end of file
+]
@@ -2,40 +2,295 @@
 Functions for fetching documents from various sources.
 """
 
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import re
-import logging
 from utils.opik_tracking import opik
+from utils.config import get_config
+from .fetch_cache import get_fetch_cache
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Bump when _process_content changes so cached texts are re-extracted
+EXTRACTOR_VERSION = 1
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(host, pool_size=None):
+    """
+    Get the pooled HTTP session for a host.
+    
+    Args:
+        host (str): Host name
+        pool_size (int, optional): Connections to keep alive for the host,
+            used when the session is first created
+        
+    Returns:
+        requests.Session: Session that keeps connections to the host alive
+    """
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            pool_size = pool_size or get_config()["fetch_per_host_limit"]
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session = requests.Session()
+            session.headers["User-Agent"] = "voices-of-independence/1.0"
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+def _retry_delay(attempt, backoff, response=None):
+    """Seconds to wait before the next attempt, honoring Retry-After when given."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    # Exponential backoff with full jitter
+    return random.uniform(0, backoff * (2 ** attempt))
+
+def _download(url, headers=None, timeout=None, retries=None, backoff=None, pool_size=None):
+    """
+    Download a URL on its host's pooled session, retrying transient failures.
+    
+    Returns:
+        dict: "body", "encoding", "etag", "last_modified", "not_modified",
+        "status", "bytes", "attempts", "elapsed" and "error"
+    """
+    config = get_config()
+    timeout = timeout if timeout is not None else config["fetch_timeout"]
+    retries = retries if retries is not None else config["fetch_retries"]
+    backoff = backoff if backoff is not None else config["fetch_backoff"]
+    
+    session = get_session(urlparse(url).netloc, pool_size)
+    start = time.perf_counter()
+    outcome = {
+        "body": None,
+        "encoding": None,
+        "etag": None,
+        "last_modified": None,
+        "not_modified": False,
+        "status": None,
+        "bytes": 0,
+        "attempts": 0,
+        "error": None
+    }
+    
+    for attempt in range(retries + 1):
+        outcome["attempts"] = attempt + 1
+        response = None
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+            outcome["status"] = response.status_code
+            if response.status_code == 304:
+                outcome["not_modified"] = True
+                outcome["error"] = None
+                break
+            if response.ok:
+                outcome["body"] = response.content
+                outcome["encoding"] = response.encoding or response.apparent_encoding
+                outcome["etag"] = response.headers.get("ETag")
+                outcome["last_modified"] = response.headers.get("Last-Modified")
+                outcome["bytes"] = len(response.content)
+                outcome["error"] = None
+                break
+            outcome["error"] = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUS_CODES:
+                break
+        except (requests.ConnectionError, requests.Timeout) as e:
+            outcome["error"] = str(e)
+        except requests.RequestException as e:
+            outcome["error"] = str(e)
+            break
+        
+        if attempt < retries:
+            delay = _retry_delay(attempt, backoff, response)
+            logger.warning(f"Retrying {url} in {delay:.2f}s ({outcome['error']})")
+            time.sleep(delay)
+    
+    outcome["elapsed"] = time.perf_counter() - start
+    return outcome
+
+def _cached_text(cache, entry, url):
+    """Extracted text for a cache entry, re-extracting from the cached body if the extractor changed."""
+    if entry.get("extractor_version") == EXTRACTOR_VERSION:
+        text = cache.read_text(entry)
+        if text is not None:
+            return text
+    
+    content = cache.read_body(entry)
+    if content is None:
+        return None
+    
+    text = _process_content(content, url)
+    cache.store_text(url, entry, text, EXTRACTOR_VERSION)
+    return text
+
+def _fetch(doc_info, slot=None, pool_size=None):
+    """
+    Fetch and extract one document, going through the fetch cache.
+    
+    Fresh cache entries are served without network access; older ones are
+    revalidated with a conditional GET. In offline mode only the cache is used.
+    
+    Args:
+        doc_info (dict): Document information including URL and title
+        slot: Context manager held around network access (per-host limit)
+        pool_size (int, optional): Keep-alive connections for the host session
+        
+    Returns:
+        dict: doc_info, text, status, bytes, attempts, elapsed, error and
+        cache ("fresh", "revalidated", "offline" or None for a download)
+    """
+    url = doc_info["url"]
+    config = get_config()
+    cache = get_fetch_cache()
+    entry = cache.get(url) if cache else None
+    offline = config["fetch_offline"]
+    start = time.perf_counter()
+    result = {
+        "doc_info": doc_info,
+        "text": None,
+        "status": None,
+        "bytes": 0,
+        "attempts": 0,
+        "elapsed": 0.0,
+        "error": None,
+        "cache": None
+    }
+    
+    if entry is not None and (offline or time.time() - entry["validated_at"] < config["fetch_cache_max_age"]):
+        result["text"] = _cached_text(cache, entry, url)
+        if result["text"] is not None:
+            result["cache"] = "offline" if offline else "fresh"
+            result["elapsed"] = time.perf_counter() - start
+            return result
+    
+    if offline:
+        result["error"] = "Not in fetch cache (offline mode)"
+        logger.error(f"Cannot fetch {url}: {result['error']}")
+        result["elapsed"] = time.perf_counter() - start
+        return result
+    
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    
+    with slot or nullcontext():
+        outcome = _download(url, headers=headers, pool_size=pool_size)
+    
+    for key in ("status", "bytes", "attempts", "error"):
+        result[key] = outcome[key]
+    
+    if outcome["not_modified"] and entry is not None:
+        entry = cache.update(url, entry, validated_at=time.time())
+        result["text"] = _cached_text(cache, entry, url)
+        result["cache"] = "revalidated"
+    elif outcome["body"] is not None:
+        content = outcome["body"].decode(outcome["encoding"] or "utf-8", errors="replace")
+        
+        # Process different content types
+        result["text"] = _process_content(content, url)
+        
+        if cache is not None:
+            cache.put(url, outcome["body"], outcome["encoding"], outcome["etag"],
+                      outcome["last_modified"], result["text"], EXTRACTOR_VERSION)
+    else:
+        result["error"] = result["error"] or "Empty response"
+        logger.error(f"Failed to fetch {url}: {result['error']}")
+    
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
 @opik.track
 def fetch_document(doc_info):
     """Fetch and extract text from a URL.
     
+    Responses are cached on disk and revalidated with conditional requests;
+    set FETCH_OFFLINE=true to serve from the cache only.
+    
     Args:
         doc_info (dict): Document information including URL and title
         
     Returns:
         str: The extracted text content
     """
-    url = doc_info["url"]
-    logger.info(f"Fetching {doc_info['title']} from {url}")
+    logger.info(f"Fetching {doc_info['title']} from {doc_info['url']}")
+    return _fetch(doc_info)["text"]
+
+@opik.track
+def fetch_documents(doc_infos, max_workers=None, per_host_limit=None):
+    """Fetch and extract many documents concurrently.
+    
+    Requests share pooled sessions per host. Concurrency is bounded both
+    globally (max_workers) and per host (per_host_limit), so no single archive
+    is hit with more than a few parallel requests. Documents go through the
+    same on-disk cache as fetch_document().
     
-    try:
-        response = requests.get(url, timeout=30)
-        if not response.ok:
-            logger.error(f"Failed to fetch {url}: {response.status_code}")
-            return None
+    Args:
+        doc_infos (list): Document information dicts including URL and title
+        max_workers (int, optional): Maximum requests in flight overall
+        per_host_limit (int, optional): Maximum requests in flight per host
         
-        content = response.text
-    except requests.RequestException as e:
-        logger.error(f"Error fetching {url}: {str(e)}")
-        return None
+    Returns:
+        dict: "results" (one dict per document, in input order, with doc_info,
+        text, status, bytes, attempts, elapsed, error and cache) and "stats"
+        (documents, succeeded, failed, cache_hits, elapsed, docs_per_second,
+        bytes_per_second)
+    """
+    config = get_config()
+    max_workers = max_workers or config["fetch_max_workers"]
+    per_host_limit = per_host_limit or config["fetch_per_host_limit"]
+    
+    host_slots = {}
+    for doc_info in doc_infos:
+        host = urlparse(doc_info["url"]).netloc
+        host_slots.setdefault(host, threading.BoundedSemaphore(per_host_limit))
+    
+    def fetch_one(doc_info):
+        slot = host_slots[urlparse(doc_info["url"]).netloc]
+        result = _fetch(doc_info, slot=slot, pool_size=per_host_limit)
+        logger.info(f"Fetched {doc_info['title']} in {result['elapsed'] * 1000:.0f} ms "
+                    f"({result['cache'] or str(result['bytes']) + ' bytes'}, {result['attempts']} request(s))")
+        return result
+    
+    logger.info(f"Fetching {len(doc_infos)} documents from {len(host_slots)} hosts")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(fetch_one, doc_infos))
+    elapsed = time.perf_counter() - start
+    
+    succeeded = [r for r in results if r["text"] is not None]
+    total_bytes = sum(r["bytes"] for r in results)
+    stats = {
+        "documents": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "cache_hits": sum(1 for r in results if r["cache"]),
+        "elapsed": elapsed,
+        "total_bytes": total_bytes,
+        "docs_per_second": len(succeeded) / elapsed if elapsed else 0.0,
+        "bytes_per_second": total_bytes / elapsed if elapsed else 0.0
+    }
+    logger.info(f"Fetched {stats['succeeded']}/{stats['documents']} documents in {elapsed:.2f}s "
+                f"({stats['cache_hits']} from cache, {stats['docs_per_second']:.1f} docs/s, "
+                f"{stats['bytes_per_second'] / 1024:.0f} KiB/s)")
     
-    # Process different content types
-    return _process_content(content, url)
+    return {"results": results, "stats": stats}
 
 def _process_content(content, url):
     """Process different content types based on the URL."""
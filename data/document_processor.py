@@ -0,0 +1,239 @@
+"""
+Chunking of fetched documents for import into Weaviate.
+
+Everything here is a generator: texts are split paragraph by paragraph and
+sentence by sentence, and chunks are yielded as soon as they are complete,
+so a whole corpus never has to be held in memory as chunks.
+"""
+
+import re
+import logging
+from collections import deque
+from utils.config import get_config
+from utils.tokens import count_tokens
+from .sources import get_all_sources
+
+logger = logging.getLogger(__name__)
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+# Closing quotes and brackets stay with their sentence (lookbehinds must be fixed-width)
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"'”’)\]])|(?<=[.!?][\"'”’)\]]{2}))\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+PARAGRAPH_SEPARATOR = "\n\n"
+SENTENCE_SEPARATOR = " "
+
+def get_length_function(unit="chars"):
+    """
+    Get the function used to measure chunk sizes.
+
+    Args:
+        unit (str): "chars" or "tokens"
+
+    Returns:
+        callable: Function mapping a text to its size
+    """
+    if unit == "chars":
+        return len
+    if unit == "tokens":
+        return count_tokens
+    raise ValueError(f"Unknown chunk unit: {unit}")
+
+def _paragraphs(text):
+    """Yield the non-empty paragraphs of a text with internal whitespace collapsed."""
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        paragraph = _WHITESPACE.sub(" ", text[start:match.start()]).strip()
+        if paragraph:
+            yield paragraph
+        start = match.end()
+
+    paragraph = _WHITESPACE.sub(" ", text[start:]).strip()
+    if paragraph:
+        yield paragraph
+
+def _split_word(word, chunk_size, length_function):
+    """Split a word longer than a chunk (e.g. a long URL) into pieces that fit."""
+    while length_function(word) > chunk_size:
+        # Longest prefix that fits, but at least one character so the loop ends
+        low, high = 1, len(word) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if length_function(word[:middle]) <= chunk_size:
+                low = middle
+            else:
+                high = middle - 1
+        yield word[:low]
+        word = word[low:]
+    yield word
+
+def _split_oversized(sentence, chunk_size, length_function):
+    """Split a sentence longer than a chunk at word boundaries, and words longer than a chunk anywhere."""
+    if length_function(sentence) <= chunk_size:
+        yield sentence
+        return
+
+    words = []
+    size = 0
+    for word in sentence.split(" "):
+        length = length_function(word)
+        if length > chunk_size:
+            *pieces, word = _split_word(word, chunk_size, length_function)
+            if words:
+                yield " ".join(words)
+                words = []
+                size = 0
+            yield from pieces
+            length = length_function(word)
+
+        if words and size + 1 + length > chunk_size:
+            yield " ".join(words)
+            words = []
+            size = 0
+        size += length + (1 if words else 0)
+        words.append(word)
+
+    if words:
+        yield " ".join(words)
+
+def _pieces(text, chunk_size, length_function):
+    """Yield (piece, separator) pairs, where the separator joins a piece to the one before it."""
+    for paragraph in _paragraphs(text):
+        separator = PARAGRAPH_SEPARATOR
+        for sentence in _SENTENCE_END.split(paragraph):
+            for piece in _split_oversized(sentence, chunk_size, length_function):
+                yield piece, separator
+                separator = SENTENCE_SEPARATOR
+
+def chunk_text(text, chunk_size=None, chunk_overlap=None, unit=None):
+    """
+    Split text into overlapping chunks along sentence and paragraph boundaries.
+
+    Sentences are packed into a chunk until the next one would exceed
+    chunk_size; the following chunk starts with as many trailing sentences of
+    the previous one as fit in chunk_overlap. Only sentences longer than a
+    whole chunk are split, at word boundaries, and only words longer than a
+    whole chunk are split within the word.
+
+    Args:
+        text (str): Text to split
+        chunk_size (int, optional): Maximum chunk size
+        chunk_overlap (int, optional): Maximum overlap between consecutive chunks
+        unit (str, optional): Unit of the sizes, "chars" or "tokens"
+
+    Yields:
+        str: Chunk text
+    """
+    config = get_config()
+    chunk_size = chunk_size or config["chunk_size"]
+    chunk_overlap = config["chunk_overlap"] if chunk_overlap is None else chunk_overlap
+    length_function = get_length_function(unit or config["chunk_unit"])
+
+    if chunk_overlap >= chunk_size:
+        raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+
+    separator_lengths = {
+        PARAGRAPH_SEPARATOR: length_function(PARAGRAPH_SEPARATOR),
+        SENTENCE_SEPARATOR: length_function(SENTENCE_SEPARATOR)
+    }
+
+    window = deque()  # (piece, separator, length)
+    size = 0  # size of the window's pieces joined by their separators
+    pending = False  # whether the window holds pieces not yet emitted
+
+    def drop_first():
+        nonlocal size
+        _, _, length = window.popleft()
+        size -= length
+        if window:
+            size -= separator_lengths[window[0][1]]
+
+    for piece, separator in _pieces(text, chunk_size, length_function):
+        length = length_function(piece)
+        added = length + separator_lengths[separator]
+
+        if window and size + added > chunk_size:
+            if pending:
+                yield _join(window)
+                pending = False
+            while window and (size > chunk_overlap or size + added > chunk_size):
+                drop_first()
+
+        size += added if window else length
+        window.append((piece, separator, length))
+        pending = True
+
+    if pending:
+        yield _join(window)
+
+def _join(window):
+    pieces = iter(window)
+    text = next(pieces)[0]
+    return text + "".join(separator + piece for piece, separator, _ in pieces)
+
+def process_document(doc_info, text, chunk_size=None, chunk_overlap=None, unit=None):
+    """
+    Chunk a fetched document and attach its metadata.
+
+    A document's chunks are buffered so total_chunks is known; documents are
+    still yielded one at a time.
+
+    Args:
+        doc_info (dict): Source information (title, url, date, authors, type, recipient)
+        text (str): Extracted document text
+        chunk_size (int, optional): Maximum chunk size
+        chunk_overlap (int, optional): Maximum overlap between consecutive chunks
+        unit (str, optional): Unit of the sizes, "chars" or "tokens"
+
+    Yields:
+        dict: Chunk with "text" and "metadata" (title, date, authors,
+        document_type, source_url, chunk_id, total_chunks and, for letters,
+        recipient)
+    """
+    chunks = list(chunk_text(text, chunk_size, chunk_overlap, unit))
+    logger.info(f"Split {doc_info['title']} into {len(chunks)} chunks")
+
+    for chunk_id, chunk in enumerate(chunks):
+        metadata = {
+            "title": doc_info["title"],
+            "date": doc_info["date"],
+            "authors": doc_info["authors"],
+            "document_type": doc_info["type"],
+            "source_url": doc_info["url"],
+            "chunk_id": chunk_id,
+            "total_chunks": len(chunks)
+        }
+        if "recipient" in doc_info:
+            metadata["recipient"] = doc_info["recipient"]
+
+        yield {"text": chunk, "metadata": metadata}
+
+def collect_all_documents(doc_infos=None, max_workers=None, per_host_limit=None, **chunk_options):
+    """
+    Fetch every source document and yield its chunks.
+
+    Documents are fetched concurrently through fetch_documents(); documents
+    that could not be fetched are logged and skipped.
+
+    Args:
+        doc_infos (list, optional): Sources to collect; defaults to every source
+        max_workers (int, optional): Maximum requests in flight overall
+        per_host_limit (int, optional): Maximum requests in flight per host
+        **chunk_options: chunk_size, chunk_overlap and unit for process_document()
+
+    Yields:
+        dict: Chunks ready for import_documents_to_weaviate()
+    """
+    # The HTTP stack is only needed for ingestion, not by the chunking helpers used at query time
+    from .document_fetcher import fetch_documents
+
+    if doc_infos is None:
+        doc_infos = get_all_sources()
+
+    fetched = fetch_documents(doc_infos, max_workers=max_workers, per_host_limit=per_host_limit)
+
+    for result in fetched["results"]:
+        if result["text"] is None:
+            logger.warning(f"Skipping {result['doc_info']['title']}: {result['error']}")
+            continue
+        yield from process_document(result["doc_info"], result["text"], **chunk_options)
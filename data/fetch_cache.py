@@ -0,0 +1,171 @@
+"""
+On-disk cache for fetched source documents.
+
+Raw bodies and extracted texts are stored content-addressed (by SHA-256) under
+``objects/``, and a per-URL index entry under ``urls/`` records the validators
+(ETag, Last-Modified) needed for conditional revalidation.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from utils.config import get_config
+from utils.cache import stable_hash, JSONDiskCache
+
+logger = logging.getLogger(__name__)
+
+class FetchCache:
+    """
+    Content-addressed store of fetched bodies and extracted texts, indexed by URL.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = JSONDiskCache(os.path.join(directory, "urls"))
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _write_object(self, data):
+        """Store bytes under their SHA-256 digest and return the digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
+
+    def read_object(self, digest):
+        """
+        Read a stored object.
+
+        Args:
+            digest (str): SHA-256 hex digest
+
+        Returns:
+            bytes: Object contents, or None if missing
+        """
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get(self, url):
+        """
+        Look up the index entry for a URL.
+
+        Args:
+            url (str): Document URL
+
+        Returns:
+            dict: Entry with etag, last_modified, body_hash, text_hash,
+            encoding, extractor_version, fetched_at and validated_at, or None
+        """
+        return self._index.get(stable_hash(url))
+
+    def read_body(self, entry):
+        """Decode the cached raw body of an entry."""
+        body = self.read_object(entry["body_hash"])
+        if body is None:
+            return None
+        return body.decode(entry.get("encoding") or "utf-8", errors="replace")
+
+    def read_text(self, entry):
+        """Read the cached extracted text of an entry."""
+        if not entry.get("text_hash"):
+            return None
+        text = self.read_object(entry["text_hash"])
+        return text.decode("utf-8") if text is not None else None
+
+    def put(self, url, body, encoding, etag, last_modified, text, extractor_version):
+        """
+        Store a freshly downloaded document.
+
+        Args:
+            url (str): Document URL
+            body (bytes): Raw response body
+            encoding (str): Encoding used to decode the body
+            etag (str): ETag response header, if any
+            last_modified (str): Last-Modified response header, if any
+            text (str): Extracted text, if extraction succeeded
+            extractor_version (int): Version of the text extraction code
+
+        Returns:
+            dict: The new index entry
+        """
+        now = time.time()
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+            "body_hash": self._write_object(body),
+            "text_hash": self._write_object(text.encode("utf-8")) if text is not None else None,
+            "extractor_version": extractor_version,
+            "fetched_at": now,
+            "validated_at": now
+        }
+        self._index.set(stable_hash(url), entry)
+        return entry
+
+    def update(self, url, entry, **fields):
+        """
+        Update fields of an existing entry (e.g. after a 304 revalidation).
+
+        Args:
+            url (str): Document URL
+            entry (dict): Current index entry
+            **fields: Fields to change
+
+        Returns:
+            dict: The updated entry
+        """
+        entry = dict(entry, **fields)
+        self._index.set(stable_hash(url), entry)
+        return entry
+
+    def store_text(self, url, entry, text, extractor_version):
+        """Replace the extracted text of an entry, e.g. after the extractor changed."""
+        return self.update(
+            url,
+            entry,
+            text_hash=self._write_object(text.encode("utf-8")) if text is not None else None,
+            extractor_version=extractor_version
+        )
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_fetch_cache():
+    """
+    Get the process-wide fetch cache.
+
+    Returns:
+        FetchCache: Shared cache, or None if disabled in the configuration
+    """
+    global _cache
+
+    config = get_config()
+    if not config["fetch_cache_enabled"]:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            directory = config["fetch_cache_dir"] or os.path.join(config["cache_dir"], "fetch")
+            _cache = FetchCache(directory)
+            logger.info(f"Using fetch cache at {directory}")
+        return _cache
@@ -2,15 +2,66 @@
 Database module for Weaviate vector database operations.
 """
 
-from .weaviate_client import connect_to_weaviate
-from .schema import setup_weaviate_schema, get_collection, COLLECTION_NAME
-from .import_data import import_documents_to_weaviate, check_import_status
+from utils.lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    ".weaviate_client": [
+        'connect_to_weaviate',
+        'connect_to_weaviate_async'
+    ],
+    ".schema": [
+        'setup_weaviate_schema',
+        'get_collection',
+        'COLLECTION_NAME'
+    ],
+    ".import_data": [
+        'import_documents_to_weaviate',
+        'check_import_status',
+        'chunk_uuid'
+    ],
+    ".generation": [
+        'get_import_generation',
+        'bump_import_generation'
+    ],
+    ".local_index": [
+        'LocalClient',
+        'LocalCollection',
+        'AsyncLocalClient',
+        'AsyncLocalCollection',
+        'connect_to_local_index',
+        'connect_to_local_index_async'
+    ],
+    ".connection_manager": [
+        'WeaviateConnectionManager',
+        'AsyncWeaviateConnectionManager',
+        'get_connection_manager',
+        'get_async_connection_manager',
+        'shutdown_connection_manager',
+        'shutdown_async_connection_manager'
+    ]
+})
 
 __all__ = [
     'connect_to_weaviate',
+    'connect_to_weaviate_async',
     'setup_weaviate_schema',
     'get_collection', 
     'COLLECTION_NAME',
     'import_documents_to_weaviate',
-    'check_import_status'
+    'check_import_status',
+    'chunk_uuid',
+    'get_import_generation',
+    'bump_import_generation',
+    'LocalClient',
+    'LocalCollection',
+    'AsyncLocalClient',
+    'AsyncLocalCollection',
+    'connect_to_local_index',
+    'connect_to_local_index_async',
+    'WeaviateConnectionManager',
+    'AsyncWeaviateConnectionManager',
+    'get_connection_manager',
+    'get_async_connection_manager',
+    'shutdown_connection_manager',
+    'shutdown_async_connection_manager'
 ]
@@ -0,0 +1,370 @@
+"""
+Process-wide Weaviate connection management.
+
+Holds a small pool of connected Weaviate clients that the Gradio app, the CLI
+and any API server share, instead of opening a new cloud connection per query.
+Asyncio code gets one multiplexed async client per event loop. With
+VECTOR_BACKEND=local the same managers hand out the in-process local index.
+"""
+
+import atexit
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from utils.config import get_config
+from .weaviate_client import connect_to_weaviate, connect_to_weaviate_async
+from .local_index import connect_to_local_index, connect_to_local_index_async
+from .schema import get_collection
+
+logger = logging.getLogger(__name__)
+
+class WeaviateConnectionManager:
+    """
+    Lazily connected, health-checked pool of Weaviate clients.
+
+    Clients are created on first use, up to ``pool_size`` of them. Callers check
+    a collection out with ``manager.collection()`` and the client goes back to
+    the pool when the ``with`` block exits.
+    """
+
+    def __init__(self, pool_size=4, pool_timeout=30.0, health_check_interval=30.0,
+                 connect_fn=connect_to_weaviate):
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.health_check_interval = health_check_interval
+        self._connect_fn = connect_fn
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._idle = []  # list of (client, last_checked) tuples
+        self._all_clients = set()
+        self._closed = False
+        self._stats = {
+            "connects": 0,
+            "reconnects": 0,
+            "connect_time_total": 0.0,
+            "connect_time_last": 0.0,
+            "checkouts": 0,
+            "pool_wait_time_total": 0.0,
+            "pool_wait_time_max": 0.0,
+            "pool_timeouts": 0,
+            "in_use": 0
+        }
+
+    def _connect(self):
+        """Open a new client and record how long the handshake took."""
+        start = time.perf_counter()
+        client = self._connect_fn()
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._all_clients.add(client)
+            self._stats["connects"] += 1
+            self._stats["connect_time_total"] += elapsed
+            self._stats["connect_time_last"] = elapsed
+
+        logger.info(f"Opened Weaviate connection in {elapsed * 1000:.1f} ms")
+        return client
+
+    def _discard(self, client):
+        """Close a client and forget about it."""
+        with self._lock:
+            self._all_clients.discard(client)
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"Error closing Weaviate client: {str(e)}")
+
+    def _is_healthy(self, client):
+        """Check whether a pooled client can still talk to the cluster."""
+        try:
+            return client.is_connected() and client.is_ready()
+        except Exception as e:
+            logger.warning(f"Weaviate health check failed: {str(e)}")
+            return False
+
+    def _acquire_client(self):
+        """Take a client from the pool, connecting or reconnecting as needed."""
+        with self._lock:
+            idle = self._idle.pop() if self._idle else None
+
+        if idle is None:
+            return self._connect(), time.monotonic()
+
+        client, last_checked = idle
+        if time.monotonic() - last_checked < self.health_check_interval:
+            return client, last_checked
+
+        if self._is_healthy(client):
+            return client, time.monotonic()
+
+        logger.info("Pooled Weaviate client is unhealthy, reconnecting")
+        self._discard(client)
+        with self._lock:
+            self._stats["reconnects"] += 1
+        return self._connect(), time.monotonic()
+
+    @contextmanager
+    def client(self):
+        """
+        Check a connected Weaviate client out of the pool.
+
+        Yields:
+            weaviate.Client: Connected Weaviate client
+        """
+        if self._closed:
+            raise RuntimeError("Weaviate connection manager has been shut down")
+
+        wait_start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            with self._lock:
+                self._stats["pool_timeouts"] += 1
+            raise TimeoutError(f"Timed out after {self.pool_timeout}s waiting for a Weaviate connection")
+        waited = time.perf_counter() - wait_start
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["pool_wait_time_total"] += waited
+            self._stats["pool_wait_time_max"] = max(self._stats["pool_wait_time_max"], waited)
+            self._stats["in_use"] += 1
+
+        client = None
+        healthy = True
+        try:
+            client, last_checked = self._acquire_client()
+            yield client
+        except Exception:
+            # Force a health check before this client is handed out again
+            healthy = False
+            raise
+        finally:
+            if client is not None:
+                with self._lock:
+                    if self._closed:
+                        client_to_close = client
+                    else:
+                        client_to_close = None
+                        self._idle.append((client, last_checked if healthy else 0.0))
+                if client_to_close is not None:
+                    self._discard(client_to_close)
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def collection(self):
+        """
+        Check out the HistoricalDocuments collection on a pooled client.
+
+        Yields:
+            collection: The Weaviate collection object
+        """
+        with self.client() as client:
+            collection = get_collection(client)
+            if collection is None:
+                raise ConnectionError("Could not get the document collection from Weaviate")
+            yield collection
+
+    def get_stats(self):
+        """
+        Get connection and pool metrics.
+
+        Returns:
+            dict: Connect time, pool wait time and pool occupancy counters
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_connections"] = len(self._all_clients)
+            stats["idle_connections"] = len(self._idle)
+
+        stats["pool_size"] = self.pool_size
+        stats["connect_time_avg"] = (
+            stats["connect_time_total"] / stats["connects"] if stats["connects"] else 0.0
+        )
+        stats["pool_wait_time_avg"] = (
+            stats["pool_wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """Close every pooled connection. Checked-out clients close on release."""
+        with self._lock:
+            self._closed = True
+            idle = [client for client, _ in self._idle]
+            self._idle = []
+
+        for client in idle:
+            self._discard(client)
+
+        if idle:
+            logger.info(f"Closed {len(idle)} Weaviate connection(s)")
+
+class AsyncWeaviateConnectionManager:
+    """
+    Lazily connected, health-checked async Weaviate client for one event loop.
+
+    The async client multiplexes concurrent queries over its own connections,
+    so a single client serves every coroutine on the loop.
+    """
+
+    def __init__(self, health_check_interval=30.0, connect_fn=connect_to_weaviate_async):
+        self.health_check_interval = health_check_interval
+        self._connect_fn = connect_fn
+        self._client = None
+        self._last_checked = 0.0
+        self._lock = asyncio.Lock()
+        self._stats = {
+            "connects": 0,
+            "reconnects": 0,
+            "connect_time_total": 0.0,
+            "connect_time_last": 0.0
+        }
+
+    async def _connect(self):
+        start = time.perf_counter()
+        client = await self._connect_fn()
+        elapsed = time.perf_counter() - start
+
+        self._stats["connects"] += 1
+        self._stats["connect_time_total"] += elapsed
+        self._stats["connect_time_last"] = elapsed
+        logger.info(f"Opened async Weaviate connection in {elapsed * 1000:.1f} ms")
+        return client
+
+    async def client(self):
+        """
+        Get the connected async client, reconnecting if it became unhealthy.
+
+        Returns:
+            weaviate.WeaviateAsyncClient: Connected async Weaviate client
+        """
+        if self._client is not None and time.monotonic() - self._last_checked < self.health_check_interval:
+            return self._client
+
+        async with self._lock:
+            if self._client is None:
+                self._client = await self._connect()
+            elif time.monotonic() - self._last_checked >= self.health_check_interval:
+                try:
+                    healthy = self._client.is_connected() and await self._client.is_ready()
+                except Exception as e:
+                    logger.warning(f"Async Weaviate health check failed: {str(e)}")
+                    healthy = False
+
+                if not healthy:
+                    logger.info("Async Weaviate client is unhealthy, reconnecting")
+                    await self._close_client()
+                    self._stats["reconnects"] += 1
+                    self._client = await self._connect()
+
+            self._last_checked = time.monotonic()
+            return self._client
+
+    async def collection(self):
+        """
+        Get the HistoricalDocuments collection on the async client.
+
+        Returns:
+            collection: The async Weaviate collection object
+        """
+        collection = get_collection(await self.client())
+        if collection is None:
+            raise ConnectionError("Could not get the document collection from Weaviate")
+        return collection
+
+    def get_stats(self):
+        """
+        Get connection metrics.
+
+        Returns:
+            dict: Connect time counters
+        """
+        stats = dict(self._stats)
+        stats["connected"] = self._client is not None
+        return stats
+
+    async def _close_client(self):
+        try:
+            await self._client.close()
+        except Exception as e:
+            logger.warning(f"Error closing async Weaviate client: {str(e)}")
+        self._client = None
+
+    async def close(self):
+        """Close the async client."""
+        if self._client is not None:
+            await self._close_client()
+            logger.info("Closed async Weaviate connection")
+
+_manager = None
+_manager_lock = threading.Lock()
+_async_managers = {}
+
+def get_connection_manager():
+    """
+    Get the process-wide Weaviate connection manager, creating it on first use.
+
+    Returns:
+        WeaviateConnectionManager: Shared connection manager
+    """
+    global _manager
+
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                config = get_config()
+                local = config["vector_backend"] == "local"
+                _manager = WeaviateConnectionManager(
+                    pool_size=config["weaviate_pool_size"],
+                    pool_timeout=config["weaviate_pool_timeout"],
+                    health_check_interval=config["weaviate_health_check_interval"],
+                    connect_fn=connect_to_local_index if local else connect_to_weaviate
+                )
+                atexit.register(_manager.close)
+
+    return _manager
+
+def shutdown_connection_manager():
+    """Close the shared connection manager, if one was created."""
+    global _manager
+
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
+
+def get_async_connection_manager():
+    """
+    Get the async Weaviate connection manager for the running event loop.
+
+    Returns:
+        AsyncWeaviateConnectionManager: Connection manager bound to this loop
+    """
+    loop = asyncio.get_running_loop()
+
+    with _manager_lock:
+        for stale_loop in [l for l in _async_managers if l.is_closed()]:
+            del _async_managers[stale_loop]
+
+        manager = _async_managers.get(loop)
+        if manager is None:
+            config = get_config()
+            local = config["vector_backend"] == "local"
+            manager = AsyncWeaviateConnectionManager(
+                health_check_interval=config["weaviate_health_check_interval"],
+                connect_fn=connect_to_local_index_async if local else connect_to_weaviate_async
+            )
+            _async_managers[loop] = manager
+
+    return manager
+
+async def shutdown_async_connection_manager():
+    """Close the async connection manager for the running event loop, if any."""
+    loop = asyncio.get_running_loop()
+
+    with _manager_lock:
+        manager = _async_managers.pop(loop, None)
+
+    if manager is not None:
+        await manager.close()
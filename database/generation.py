@@ -0,0 +1,63 @@
+"""
+Corpus import generation tracking.
+
+Every import or schema recreation bumps a generation token stored under the
+cache directory, so caches of answers derived from the corpus can tell when
+they have gone stale.
+"""
+
+import os
+import uuid
+import logging
+import threading
+from utils.config import get_config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_cached = {"mtime_ns": None, "generation": None}
+
+def _generation_path():
+    return os.path.join(get_config()["cache_dir"], "import_generation")
+
+def get_import_generation():
+    """
+    Get the current corpus import generation.
+
+    The file is only re-read when its modification time changes, so this is
+    cheap enough to call on every request.
+
+    Returns:
+        str: Generation token, or "initial" if no import has been recorded
+    """
+    path = _generation_path()
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return "initial"
+
+    with _lock:
+        if _cached["mtime_ns"] != mtime_ns:
+            with open(path, "r", encoding="utf-8") as f:
+                _cached["generation"] = f.read().strip()
+            _cached["mtime_ns"] = mtime_ns
+        return _cached["generation"]
+
+def bump_import_generation():
+    """
+    Record that the corpus changed.
+
+    Returns:
+        str: The new generation token
+    """
+    path = _generation_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    generation = uuid.uuid4().hex
+    tmp_path = f"{path}.{generation}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(generation)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Corpus import generation is now {generation}")
+    return generation
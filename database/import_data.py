@@ -2,59 +2,202 @@
 Functions for importing data into Weaviate.
 """
 
+import uuid
 import logging
 from utils.opik_tracking import opik
+from utils.config import get_config
+from utils.cache import stable_hash
+from utils.tokens import count_tokens
+from utils.embeddings import get_client_embedder
+from utils.embedding_cache import get_embedding_cache, embed_texts
+from .generation import bump_import_generation
 
 logger = logging.getLogger(__name__)
 
+EXISTING_PAGE_SIZE = 1000
+
+def chunk_uuid(source_url, chunk_id):
+    """
+    Get the deterministic object UUID of a document chunk.
+    
+    Args:
+        source_url (str): URL the document was fetched from
+        chunk_id (int): Position of the chunk within the document
+        
+    Returns:
+        str: UUID string
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source_url}#chunk-{chunk_id}"))
+
+def _rfc3339_date(value):
+    """Weaviate date properties need RFC 3339; source dates are YYYY-MM-DD."""
+    value = str(value)
+    return f"{value}T00:00:00Z" if len(value) == 10 else value
+
+def _chunk_properties(doc, embedder=None):
+    """Build the Weaviate properties of a chunk, including its content hash."""
+    properties = {
+        "text": doc["text"],
+        "title": doc["metadata"]["title"],
+        "date": _rfc3339_date(doc["metadata"]["date"]),
+        "authors": doc["metadata"]["authors"],
+        "document_type": doc["metadata"]["document_type"],
+        "source_url": doc["metadata"]["source_url"],
+        "chunk_id": doc["metadata"]["chunk_id"],
+        "total_chunks": doc["metadata"]["total_chunks"],
+        # Lets the context builder budget prompts without re-tokenizing every retrieved chunk
+        "token_count": count_tokens(doc["text"])
+    }
+    
+    # Add recipient if it exists
+    if "recipient" in doc["metadata"]:
+        properties["recipient"] = doc["metadata"]["recipient"]
+    
+    # Client-side vectors depend on the model too, so switching models re-imports every chunk
+    if embedder is None:
+        properties["content_hash"] = stable_hash(properties)
+    else:
+        properties["content_hash"] = stable_hash(properties, embedder.model_id)
+    return properties
+
+def _existing_chunks(collection, source_url):
+    """
+    Get the objects already stored for a document.
+    
+    Returns:
+        dict: Object UUID -> content hash (None for objects imported without one)
+    """
+    from weaviate.classes.query import Filter
+
+    existing = {}
+    offset = 0
+    while True:
+        response = collection.query.fetch_objects(
+            filters=Filter.by_property("source_url").equal(source_url),
+            return_properties=["source_url", "content_hash"],
+            limit=EXISTING_PAGE_SIZE,
+            offset=offset
+        )
+        for obj in response.objects:
+            # Older collections tokenize source_url by word, so check the match exactly
+            if obj.properties.get("source_url") == source_url:
+                existing[str(obj.uuid)] = obj.properties.get("content_hash")
+        
+        if len(response.objects) < EXISTING_PAGE_SIZE:
+            return existing
+        offset += EXISTING_PAGE_SIZE
+
 @opik.track
 def import_documents_to_weaviate(collection, documents, batch_size=10):
     """
-    Import documents into Weaviate.
+    Import documents into Weaviate incrementally.
+    
+    Each chunk gets a UUID derived from its source URL and chunk_id, and a
+    content hash of its properties. Chunks whose stored hash matches are
+    skipped, changed chunks are overwritten in place, and chunks left over
+    from a longer previous version of a document are deleted, so re-running
+    an import only touches documents that changed. Documents missing from
+    this import are left untouched.
+    
+    Documents are consumed lazily, so a generator such as
+    collect_all_documents() can be passed without materializing the corpus.
+    
+    With EMBEDDING_MODE=client, chunk texts are embedded locally in batches
+    of embedding_batch_size, reusing vectors from the on-disk embedding
+    cache, and imported with their vectors.
     
     Args:
         collection: Weaviate collection object
-        documents (list): List of document dictionaries
-        batch_size (int): Size of batches for import
+        documents (iterable): Document chunk dictionaries
+        batch_size (int): Number of documents between progress messages
         
     Returns:
-        bool: True if import was successful
+        dict: success, and the number of chunks inserted, updated, skipped,
+        deleted and failed; check stats["success"], as the dict itself is
+        always truthy
     """
-    logger.info(f"Importing {len(documents)} documents into Weaviate...")
+    from weaviate.classes.query import Filter
+
+    logger.info("Importing documents into Weaviate...")
+    
+    stats = {"success": False, "inserted": 0, "updated": 0, "skipped": 0, "deleted": 0, "failed": 0}
+    existing = {}  # source_url -> {uuid: content hash} before this import
+    seen = {}  # source_url -> uuids produced by this import
     
+    embedder = get_client_embedder()
+    embedding_cache = get_embedding_cache() if embedder is not None else None
+    embedding_batch_size = get_config()["embedding_batch_size"]
+    pending = []  # (properties, uuid) waiting for their vectors
+    
+    count = 0
     try:
-        # Import documents in batches
         with collection.batch.dynamic() as batch:
-            for i, doc in enumerate(documents):
-                properties = {
-                    "text": doc["text"],
-                    "title": doc["metadata"]["title"],
-                    "date": doc["metadata"]["date"],
-                    "authors": doc["metadata"]["authors"],
-                    "document_type": doc["metadata"]["document_type"],
-                    "source_url": doc["metadata"]["source_url"],
-                    "chunk_id": doc["metadata"]["chunk_id"],
-                    "total_chunks": doc["metadata"]["total_chunks"]
-                }
+            def flush():
+                vectors = embed_texts([properties["text"] for properties, _ in pending], embedder,
+                                      cache=embedding_cache, batch_size=embedding_batch_size)
+                for (properties, object_id), vector in zip(pending, vectors):
+                    batch.add_object(properties=properties, uuid=object_id, vector=vector.tolist())
+                pending.clear()
+            
+            for doc in documents:
+                properties = _chunk_properties(doc, embedder)
+                source_url = properties["source_url"]
+                object_id = chunk_uuid(source_url, properties["chunk_id"])
+                
+                if source_url not in existing:
+                    existing[source_url] = _existing_chunks(collection, source_url)
+                    seen[source_url] = set()
+                seen[source_url].add(object_id)
+                stored = existing[source_url]
                 
-                # Add recipient if it exists
-                if "recipient" in doc["metadata"]:
-                    properties["recipient"] = doc["metadata"]["recipient"]
+                if object_id not in stored:
+                    stats["inserted"] += 1
+                elif stored[object_id] != properties["content_hash"]:
+                    stats["updated"] += 1
+                else:
+                    stats["skipped"] += 1
+                    continue
                 
-                batch.add_object(
-                    properties=properties,
-                    uuid=None  # Let Weaviate generate a UUID
-                )
+                # Batch imports replace an existing object with the same UUID
+                if embedder is None:
+                    batch.add_object(properties=properties, uuid=object_id)
+                else:
+                    pending.append((properties, object_id))
+                    if len(pending) >= embedding_batch_size:
+                        flush()
                 
-                if (i + 1) % batch_size == 0 or i == len(documents) - 1:
-                    logger.info(f"  Imported {i + 1}/{len(documents)} documents")
+                count += 1
+                if count % batch_size == 0:
+                    logger.info(f"  Imported {count} documents")
+            
+            if pending:
+                flush()
         
-        logger.info("Import complete!")
-        return True
+        failed = collection.batch.failed_objects
+        if failed:
+            stats["failed"] = len(failed)
+            logger.error(f"{len(failed)} of {count} documents failed to import: {failed[0].message}")
+            return stats
+        
+        for source_url, object_ids in seen.items():
+            stale = [object_id for object_id in existing[source_url] if object_id not in object_ids]
+            if stale:
+                collection.data.delete_many(where=Filter.by_id().contains_any(stale))
+                stats["deleted"] += len(stale)
+        
+        logger.info(f"Import complete! {stats['inserted']} inserted, {stats['updated']} updated, "
+                    f"{stats['skipped']} unchanged, {stats['deleted']} deleted")
+        stats["success"] = True
+        return stats
         
     except Exception as e:
         logger.error(f"Error importing documents to Weaviate: {str(e)}")
-        return False
+        return stats
+    
+    finally:
+        # A failed import may still have written some chunks, which cached answers do not reflect
+        if count or stats["deleted"]:
+            bump_import_generation()
 
 @opik.track
 def check_import_status(collection):
@@ -69,18 +212,18 @@ def check_import_status(collection):
     """
     try:
         # Get the object count in the collection
-        object_count = collection.query.aggregate().with_meta_count().do()
+        object_count = collection.aggregate.over_all(total_count=True)
         
         # Get a sample of documents to verify content
-        sample = collection.query.get(
-            properties=["title", "text"],
+        sample = collection.query.fetch_objects(
+            return_properties=["title", "text"],
             limit=5
         )
         
         return {
-            "object_count": object_count.total,
+            "object_count": object_count.total_count,
             "sample_docs": len(sample.objects),
-            "status": "success" if object_count.total > 0 else "empty"
+            "status": "success" if object_count.total_count > 0 else "empty"
         }
         
     except Exception as e:
@@ -0,0 +1,1051 @@
+"""
+In-process vector index that stands in for a Weaviate collection.
+
+Implements the subset of the Weaviate v4 client and collection API this
+project uses (near_text, near_vector, fetch_objects, batch imports,
+delete_many, aggregate counts and filters), backed by one contiguous float32
+matrix searched with a vectorized top-k. Collections are persisted under a
+directory and memory-mapped on load.
+
+Select it with VECTOR_BACKEND=local. Chunk texts are embedded locally with
+EMBEDDING_MODEL (through the on-disk embedding cache), so no Weaviate cluster
+or vectorizer module is needed.
+"""
+
+import os
+import re
+import json
+import uuid
+import fnmatch
+import asyncio
+import logging
+import tempfile
+import threading
+from datetime import datetime, timezone
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from utils.config import get_config
+from utils.embeddings import get_embedder
+from utils.embedding_cache import get_embedding_cache, embed_texts
+
+logger = logging.getLogger(__name__)
+
+LocalObject = namedtuple("LocalObject", ["uuid", "properties", "metadata", "vector"])
+LocalMetadata = namedtuple("LocalMetadata", ["distance", "certainty", "score"])
+LocalQueryReturn = namedtuple("LocalQueryReturn", ["objects"])
+LocalAggregateReturn = namedtuple("LocalAggregateReturn", ["total_count", "properties"])
+LocalDeleteManyReturn = namedtuple("LocalDeleteManyReturn", ["failed", "matches", "objects", "successful"])
+LocalProperty = namedtuple("LocalProperty", ["name", "description", "tokenization"])
+LocalCollectionConfig = namedtuple("LocalCollectionConfig", ["name", "description", "properties"])
+LocalErrorObject = namedtuple("LocalErrorObject", ["message", "object_"])
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Weaviate's "en" stopword preset; stopwords are ignored in BM25 queries
+STOPWORDS = frozenset((
+    "a an and are as at be but by for if in into is it no not of on or such that the their then there "
+    "these they this to was will with"
+).split())
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RANKED_FUSION_K = 60
+HYBRID_CANDIDATES = 100
+
+def _to_datetime(value):
+    """Parse ISO dates and timestamps so they compare with datetime filter values."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+# Comparisons _compute_mask evaluates over a whole property column at once
+_VECTORIZED_OPERATORS = frozenset((
+    "Equal", "NotEqual", "LessThan", "LessThanEqual", "GreaterThan", "GreaterThanEqual", "ContainsAny"
+))
+
+def _datetime64(value):
+    """Convert a date to a naive UTC datetime64, or NaT if it cannot be parsed."""
+    if value is None:
+        return np.datetime64("NaT")
+    try:
+        parsed = _to_datetime(value).astimezone(timezone.utc).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return np.datetime64("NaT")
+    return np.datetime64(parsed, "us")
+
+def _compare(operator, actual, expected):
+    """Apply a scalar comparison operator."""
+    if isinstance(expected, datetime) or isinstance(actual, datetime):
+        try:
+            actual, expected = _to_datetime(actual), _to_datetime(expected)
+        except (TypeError, ValueError):
+            return False
+
+    if operator == "Equal":
+        return actual == expected
+    if operator == "NotEqual":
+        return actual != expected
+    if operator == "LessThan":
+        return actual < expected
+    if operator == "LessThanEqual":
+        return actual <= expected
+    if operator == "GreaterThan":
+        return actual > expected
+    if operator == "GreaterThanEqual":
+        return actual >= expected
+    if operator == "Like":
+        return fnmatch.fnmatchcase(str(actual).lower(), str(expected).lower())
+    raise ValueError(f"Unsupported filter operator for the local index: {operator}")
+
+def matches_filter(filters, object_id, properties):
+    """
+    Evaluate a Weaviate filter against one object.
+
+    Args:
+        filters: Filter built with weaviate.classes.query.Filter, or None
+        object_id (str): Object UUID
+        properties (dict): Object properties
+
+    Returns:
+        bool: Whether the object matches
+    """
+    if filters is None:
+        return True
+
+    operator = filters.operator.value
+    if operator == "And":
+        return all(matches_filter(f, object_id, properties) for f in filters.filters)
+    if operator == "Or":
+        return any(matches_filter(f, object_id, properties) for f in filters.filters)
+    if operator == "Not":
+        return not matches_filter(filters.filters[0], object_id, properties)
+
+    target = filters.target
+    if not isinstance(target, str):
+        raise ValueError("Reference filters are not supported by the local index")
+
+    actual = object_id if target == "_id" else properties.get(target)
+    expected = filters.value
+
+    if operator == "IsNull":
+        return (actual is None) == bool(expected)
+    if actual is None:
+        return False
+
+    values = actual if isinstance(actual, list) else [actual]
+    if operator == "ContainsAny":
+        return any(_compare("Equal", value, item) for value in values for item in expected)
+    if operator == "ContainsAll":
+        return all(any(_compare("Equal", value, item) for value in values) for item in expected)
+    if operator == "ContainsNone":
+        return not any(_compare("Equal", value, item) for value in values for item in expected)
+    if operator == "NotEqual":
+        return all(_compare(operator, value, expected) for value in values)
+
+    # Like Weaviate, a scalar operator on an array property matches if any element does
+    return any(_compare(operator, value, expected) for value in values)
+
+def _tokenization_name(prop):
+    """Tokenization of a Property as a plain string (e.g. "word"), or None."""
+    tokenization = getattr(prop, "tokenization", None)
+    return getattr(tokenization, "value", tokenization)
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric words, like Weaviate's word tokenization."""
+    return _WORD_PATTERN.findall(str(text).lower())
+
+def _new_uuid():
+    return str(uuid.uuid4())
+
+def _write_atomic(path, write):
+    """Write a file through a temporary file and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class LocalCollection:
+    """
+    A persisted collection of objects with one normalized vector each.
+
+    Rows live in a contiguous float32 matrix that grows by doubling; deletes
+    move the last row into the freed slot so the matrix stays dense.
+    """
+
+    MAX_CACHED_FILTERS = 128
+
+    def __init__(self, name, directory, embedder, embedding_cache=None, description=None, properties=None):
+        self.name = name
+        self.directory = directory
+        self.embedder = embedder
+        self.embedding_cache = embedding_cache
+        self.description = description
+        self._schema = {prop.name: _tokenization_name(prop) for prop in properties or []}
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, embedder.dim), dtype=np.float32)
+        self._count = 0
+        self._uuids = []
+        self._properties = []
+        self._rows = {}  # uuid -> row
+        self._filter_masks = OrderedDict()  # repr(filter) -> row mask, cleared on every write
+        self._bm25_indexes = {}  # property -> BM25 postings, cleared on every write
+        self._columns = {}  # (property, kind) -> column array for vectorized filters, cleared on every write
+        self._deferred = 0  # depth of deferred_writes() blocks
+        self._dirty = False  # whether there are writes not yet on disk
+
+        self.query = _LocalQuery(self)
+        self.batch = _LocalBatchNamespace(self)
+        self.data = _LocalData(self)
+        self.aggregate = _LocalAggregate(self)
+        self.config = _LocalConfig(self)
+
+        self._load()
+
+    def __len__(self):
+        return self._count
+
+    def iterator(self, include_vector=False, return_properties=None, **kwargs):
+        """Iterate over every object, like Collection.iterator()."""
+        return self.iterate(include_vector, return_properties)
+
+    # Persistence
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _load(self):
+        """Load a persisted collection, memory-mapping its vectors."""
+        if not os.path.exists(self._path("meta.json")):
+            return
+
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(self._path("objects.json"), "r", encoding="utf-8") as f:
+            objects = json.load(f)
+
+        if meta["model_id"] != self.embedder.model_id:
+            logger.warning(f"Local collection {self.name} was embedded with {meta['model_id']}, "
+                           f"not {self.embedder.model_id}; re-import it before searching")
+
+        self.description = meta.get("description")
+        self._schema = {prop["name"]: prop.get("tokenization") for prop in meta.get("properties", [])}
+        self._uuids = [object_id for object_id, _ in objects]
+        self._properties = [properties for _, properties in objects]
+        self._rows = {object_id: row for row, object_id in enumerate(self._uuids)}
+        self._count = len(objects)
+        if self._count:
+            self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r")
+        logger.info(f"Loaded local collection {self.name} with {self._count} objects")
+
+    def _persist(self):
+        """Write the collection to disk. Caller holds the lock."""
+        self._dirty = False
+        os.makedirs(self.directory, exist_ok=True)
+        vectors = np.ascontiguousarray(self._vectors[:self._count])
+        _write_atomic(self._path("vectors.npy"), lambda f: np.save(f, vectors))
+
+        objects = [[object_id, properties] for object_id, properties in zip(self._uuids, self._properties)]
+        _write_atomic(self._path("objects.json"), lambda f: f.write(json.dumps(objects, default=str).encode("utf-8")))
+
+        meta = {
+            "name": self.name,
+            "description": self.description,
+            "properties": [{"name": name, "tokenization": tokenization}
+                           for name, tokenization in self._schema.items()],
+            "model_id": self.embedder.model_id,
+            "dim": self.embedder.dim,
+            "count": self._count
+        }
+        _write_atomic(self._path("meta.json"), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    def _changed(self, schema=False):
+        """
+        Drop the derived indexes after a write and persist it, unless deferred. Caller holds the lock.
+
+        Schema changes are persisted at once, as exists() and list_all() look for them on disk.
+        """
+        self._filter_masks.clear()
+        self._bm25_indexes.clear()
+        self._columns.clear()
+        self._dirty = True
+        if schema or not self._deferred:
+            self._persist()
+
+    def flush(self):
+        """Write changes made inside deferred_writes() blocks to disk."""
+        with self._lock:
+            if self._dirty:
+                self._persist()
+
+    @contextmanager
+    def deferred_writes(self):
+        """
+        Persist the writes made while the block runs once, when it exits.
+
+        Each upsert() or delete_where() otherwise rewrites the whole collection
+        on disk, so writing objects one by one would take quadratic time.
+        Writes are visible to searches immediately either way. Blocks nest,
+        and writes from other threads while one is open are deferred too.
+        """
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                if not self._deferred:
+                    self.flush()
+
+    def drop(self):
+        """Remove every object and the persisted files."""
+        with self._lock:
+            self._vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+            self._count = 0
+            self._uuids, self._properties, self._rows = [], [], {}
+            self._dirty = False
+            self._filter_masks.clear()
+            self._bm25_indexes.clear()
+            self._columns.clear()
+            for filename in ("vectors.npy", "objects.json", "meta.json"):
+                if os.path.exists(self._path(filename)):
+                    os.remove(self._path(filename))
+
+    # Writes
+
+    def _reserve(self, rows):
+        """Make room for more rows, copying a memory-mapped matrix into memory. Caller holds the lock."""
+        needed = self._count + rows
+        if needed <= self._vectors.shape[0] and self._vectors.flags.writeable:
+            return
+
+        capacity = max(needed, 2 * self._vectors.shape[0], 64)
+        vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        self._vectors = vectors
+
+    def upsert(self, objects):
+        """
+        Insert or replace objects.
+
+        Objects without a vector are embedded from their "text" property.
+
+        Args:
+            objects (list): (properties, uuid or None, vector or None) tuples
+
+        Returns:
+            int: Number of objects written
+        """
+        if not objects:
+            return 0
+
+        missing = [i for i, (_, _, vector) in enumerate(objects) if vector is None]
+        vectors = [vector for _, _, vector in objects]
+        if missing:
+            embedded = embed_texts(
+                [objects[i][0].get("text", "") for i in missing],
+                self.embedder,
+                cache=self.embedding_cache,
+                batch_size=get_config()["embedding_batch_size"]
+            )
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        with self._lock:
+            self._reserve(len(objects))
+            for (properties, object_id, _), vector in zip(objects, matrix):
+                object_id = str(object_id or _new_uuid())
+                row = self._rows.get(object_id)
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._rows[object_id] = row
+                    self._uuids.append(object_id)
+                    self._properties.append(dict(properties))
+                else:
+                    self._properties[row] = dict(properties)
+                self._vectors[row] = vector
+            self._changed()
+
+        return len(objects)
+
+    def delete_where(self, filters, dry_run=False):
+        """
+        Delete every object matching a filter.
+
+        Returns:
+            int: Number of objects matched
+        """
+        with self._lock:
+            matched = [object_id for object_id, properties in zip(self._uuids, self._properties)
+                       if matches_filter(filters, object_id, properties)]
+            if dry_run or not matched:
+                return len(matched)
+
+            self._reserve(0)
+            for object_id in matched:
+                row = self._rows.pop(object_id)
+                last = self._count - 1
+                if row != last:
+                    # Move the last row into the hole to keep the matrix dense
+                    self._vectors[row] = self._vectors[last]
+                    self._uuids[row] = self._uuids[last]
+                    self._properties[row] = self._properties[last]
+                    self._rows[self._uuids[row]] = row
+                self._uuids.pop()
+                self._properties.pop()
+                self._count -= 1
+            self._changed()
+            return len(matched)
+
+    # Reads
+
+    def _select(self, row, return_properties):
+        properties = self._properties[row]
+        if return_properties is None or return_properties is True:
+            return dict(properties)
+        return {name: properties[name] for name in return_properties if name in properties}
+
+    def _object(self, row, return_properties, include_vector, metadata):
+        return LocalObject(
+            uuid=self._uuids[row],
+            properties=self._select(row, return_properties),
+            metadata=metadata,
+            vector={"default": self._vectors[row].tolist()} if include_vector else {}
+        )
+
+    def _top(self, scores, limit):
+        """Rows with the highest finite scores, best first."""
+        k = min(limit or len(scores), len(scores))
+        if k == 0:
+            return np.zeros(0, dtype=np.intp)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top[np.isfinite(scores[top])]
+
+    def _column(self, name, kind):
+        """
+        One property of every row as an array, or None if some row holds a list. Caller holds the lock.
+
+        Date columns are datetime64 with NaT for missing or unparseable values;
+        other columns are object arrays compared element-wise.
+        """
+        key = (name, kind)
+        if key not in self._columns:
+            values = [properties.get(name) for properties in self._properties[:self._count]]
+            if any(isinstance(value, list) for value in values):
+                column = None
+            elif kind == "date":
+                column = np.array([_datetime64(value) for value in values], dtype="datetime64[us]")
+            else:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+            self._columns[key] = column
+        return self._columns[key]
+
+    def _leaf_mask(self, filters):
+        """Vectorized mask for a comparison on a scalar property, or None to evaluate row by row."""
+        operator = filters.operator.value
+        target, expected = filters.target, filters.value
+        if not isinstance(target, str) or target == "_id" or operator not in _VECTORIZED_OPERATORS:
+            return None
+
+        if isinstance(expected, datetime):
+            column = self._column(target, "date")
+            expected = _datetime64(expected)
+            present = ~np.isnat(column) if column is not None else None
+        elif operator == "ContainsAny" or not isinstance(expected, (list, tuple)):
+            column = self._column(target, "value")
+            present = column != None if column is not None else None  # noqa: E711 (element-wise)
+        else:
+            return None
+        if column is None:
+            return None
+
+        if operator == "ContainsAny":
+            return np.logical_or.reduce([column == item for item in expected] or [np.zeros(len(column), dtype=bool)])
+        if operator == "Equal":
+            return column == expected
+        if operator == "NotEqual":
+            return present & (column != expected)
+        try:
+            comparison = {"LessThan": np.less, "LessThanEqual": np.less_equal,
+                          "GreaterThan": np.greater, "GreaterThanEqual": np.greater_equal}[operator]
+            return present & comparison(column, expected)
+        except TypeError:
+            # Mixed types in an object column; compare row by row like matches_filter
+            return None
+
+    def _compute_mask(self, filters):
+        """Evaluate a filter over every row, vectorizing what it can. Caller holds the lock."""
+        operator = filters.operator.value
+        if operator in ("And", "Or"):
+            masks = [self._compute_mask(f) for f in filters.filters]
+            combine = np.logical_and if operator == "And" else np.logical_or
+            return combine.reduce(masks) if masks else np.full(self._count, operator == "And")
+        if operator == "Not":
+            return ~self._compute_mask(filters.filters[0])
+
+        mask = self._leaf_mask(filters)
+        if mask is not None:
+            return np.asarray(mask, dtype=bool)
+        return np.fromiter(
+            (matches_filter(filters, object_id, properties)
+             for object_id, properties in zip(self._uuids, self._properties)),
+            dtype=bool,
+            count=self._count
+        )
+
+    def _filter_mask(self, filters):
+        """Boolean mask of the rows matching a filter, cached until the next write. Caller holds the lock."""
+        key = repr(filters)
+        mask = self._filter_masks.get(key)
+        if mask is not None:
+            self._filter_masks.move_to_end(key)
+            return mask
+
+        mask = self._compute_mask(filters)
+        self._filter_masks[key] = mask
+        if len(self._filter_masks) > self.MAX_CACHED_FILTERS:
+            self._filter_masks.popitem(last=False)
+        return mask
+
+    def search(self, vector, limit=10, filters=None, return_properties=None, include_vector=False,
+               distance=None, certainty=None):
+        """
+        Find the objects nearest to a vector by cosine similarity.
+
+        Args:
+            vector: Query vector
+            limit (int): Maximum number of results
+            filters: Optional Weaviate filter
+            return_properties (list, optional): Properties to return; all by default
+            include_vector (bool): Whether to return the stored vectors
+            distance (float, optional): Maximum cosine distance
+            certainty (float, optional): Minimum certainty
+
+        Returns:
+            LocalQueryReturn: Objects ordered from nearest to farthest
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            if not self._count:
+                return LocalQueryReturn(objects=[])
+
+            scores = self._vectors[:self._count] @ query
+            if filters is not None:
+                scores = np.where(self._filter_mask(filters), scores, -np.inf)
+
+            top = self._top(scores, limit)
+
+            objects = []
+            for row in top:
+                similarity = float(scores[row])
+                if similarity == -np.inf:
+                    break
+                cosine_distance = 1.0 - similarity
+                if distance is not None and cosine_distance > distance:
+                    break
+                if certainty is not None and (1.0 + similarity) / 2 < certainty:
+                    break
+                metadata = LocalMetadata(distance=cosine_distance, certainty=(1.0 + similarity) / 2, score=None)
+                objects.append(self._object(row, return_properties, include_vector, metadata))
+
+        return LocalQueryReturn(objects=objects)
+
+    def _bm25_index(self, prop):
+        """Build (or reuse) the BM25 postings of one text property. Caller holds the lock."""
+        index = self._bm25_indexes.get(prop)
+        if index is not None:
+            return index
+
+        postings = {}  # term -> ([rows], [term frequencies])
+        lengths = np.zeros(self._count, dtype=np.float32)
+        for row, properties in enumerate(self._properties):
+            value = properties.get(prop)
+            if value is None:
+                continue
+            tokens = tokenize(" ".join(value) if isinstance(value, list) else value)
+            lengths[row] = len(tokens)
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, frequency in frequencies.items():
+                rows, tfs = postings.setdefault(token, ([], []))
+                rows.append(row)
+                tfs.append(frequency)
+
+        index = {
+            "postings": {term: (np.array(rows, dtype=np.intp), np.array(tfs, dtype=np.float32))
+                         for term, (rows, tfs) in postings.items()},
+            "lengths": lengths,
+            "average_length": float(lengths.mean()) if self._count and lengths.any() else 1.0
+        }
+        self._bm25_indexes[prop] = index
+        return index
+
+    def bm25_scores(self, query, query_properties=None):
+        """
+        Score every row against a keyword query with BM25 (k1=1.2, b=0.75).
+
+        Args:
+            query (str): Keyword query; stopwords are ignored
+            query_properties (list, optional): Text properties to search; "text" by default
+
+        Returns:
+            numpy.ndarray: One score per row, 0 where no query term occurs
+        """
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term not in STOPWORDS]
+
+        with self._lock:
+            scores = np.zeros(self._count, dtype=np.float32)
+            for prop in query_properties or ["text"]:
+                index = self._bm25_index(prop)
+                norms = BM25_K1 * (1 - BM25_B + BM25_B * index["lengths"] / index["average_length"])
+                for term in terms:
+                    posting = index["postings"].get(term)
+                    if posting is None:
+                        continue
+                    rows, tfs = posting
+                    idf = np.log(1 + (self._count - len(rows) + 0.5) / (len(rows) + 0.5))
+                    scores[rows] += idf * tfs * (BM25_K1 + 1) / (tfs + norms[rows])
+        return scores
+
+    def keyword_search(self, query, limit=10, filters=None, query_properties=None, return_properties=None,
+                       include_vector=False):
+        """
+        Rank objects by BM25 score.
+
+        Returns:
+            LocalQueryReturn: Objects with a non-zero score, best first
+        """
+        scores = self.bm25_scores(query, query_properties)
+        with self._lock:
+            scores = np.where(scores > 0, scores, -np.inf)
+            if filters is not None:
+                scores = np.where(self._filter_mask(filters), scores, -np.inf)
+            objects = [
+                self._object(row, return_properties, include_vector,
+                             LocalMetadata(distance=None, certainty=None, score=float(scores[row])))
+                for row in self._top(scores, limit)
+            ]
+        return LocalQueryReturn(objects=objects)
+
+    def hybrid_search(self, query, vector, alpha=0.7, fusion="relative_score", limit=10, filters=None,
+                      query_properties=None, return_properties=None, include_vector=False):
+        """
+        Fuse vector and BM25 rankings, as Weaviate's hybrid search does.
+
+        The top candidates of each search are fused with either relative score
+        fusion (min-max normalized scores) or ranked fusion (1 / (60 + rank)),
+        weighted alpha for the vector side and 1 - alpha for keywords.
+
+        Args:
+            query (str): Keyword query
+            vector: Query vector
+            alpha (float): 1 is pure vector search, 0 pure keyword search
+            fusion (str): "relative_score" or "ranked"
+
+        Returns:
+            LocalQueryReturn: Objects ordered by fused score
+        """
+        query_vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm:
+            query_vector = query_vector / norm
+        keyword_scores = self.bm25_scores(query, query_properties)
+
+        with self._lock:
+            if not self._count:
+                return LocalQueryReturn(objects=[])
+
+            vector_scores = self._vectors[:self._count] @ query_vector
+            keyword_scores = np.where(keyword_scores > 0, keyword_scores, -np.inf)
+            if filters is not None:
+                mask = self._filter_mask(filters)
+                vector_scores = np.where(mask, vector_scores, -np.inf)
+                keyword_scores = np.where(mask, keyword_scores, -np.inf)
+
+            candidates = max(limit or 0, HYBRID_CANDIDATES)
+            fused = np.full(self._count, -np.inf, dtype=np.float32)
+            for weight, scores in ((alpha, vector_scores), (1 - alpha, keyword_scores)):
+                top = self._top(scores, candidates)
+                if not len(top):
+                    continue
+                if fusion == "ranked":
+                    contribution = weight / (RANKED_FUSION_K + np.arange(len(top), dtype=np.float32))
+                else:
+                    low, high = scores[top[-1]], scores[top[0]]
+                    contribution = weight * ((scores[top] - low) / (high - low) if high > low else np.ones(len(top)))
+                fused[top] = np.where(np.isfinite(fused[top]), fused[top], 0.0) + contribution
+
+            objects = [
+                self._object(row, return_properties, include_vector,
+                             LocalMetadata(distance=None, certainty=None, score=float(fused[row])))
+                for row in self._top(fused, limit)
+            ]
+        return LocalQueryReturn(objects=objects)
+
+    def iterate(self, include_vector=False, return_properties=None):
+        """Yield every object, for migrations and exports."""
+        with self._lock:
+            rows = list(range(self._count))
+        for row in rows:
+            with self._lock:
+                if row >= self._count:
+                    return
+                obj = self._object(row, return_properties, include_vector,
+                                   LocalMetadata(distance=None, certainty=None, score=None))
+            yield obj
+
+    def fetch(self, limit=None, offset=None, filters=None, return_properties=None, include_vector=False):
+        """
+        List objects in storage order.
+
+        Returns:
+            LocalQueryReturn: Matching objects
+        """
+        with self._lock:
+            rows = range(self._count)
+            if filters is not None:
+                rows = np.flatnonzero(self._filter_mask(filters))
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+
+            metadata = LocalMetadata(distance=None, certainty=None, score=None)
+            objects = [self._object(row, return_properties, include_vector, metadata) for row in rows]
+
+        return LocalQueryReturn(objects=objects)
+
+    def count(self, filters=None):
+        """Count the objects matching an optional filter."""
+        with self._lock:
+            if filters is None:
+                return self._count
+            return int(self._filter_mask(filters).sum())
+
+class _LocalQuery:
+    """collection.query for a local collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def near_text(self, query, limit=10, filters=None, return_properties=None, include_vector=False,
+                  distance=None, certainty=None, **kwargs):
+        vector = self._collection.embedder.embed([query])[0]
+        return self._collection.search(vector, limit, filters, return_properties, include_vector, distance, certainty)
+
+    def near_vector(self, near_vector, limit=10, filters=None, return_properties=None, include_vector=False,
+                    distance=None, certainty=None, **kwargs):
+        return self._collection.search(near_vector, limit, filters, return_properties, include_vector,
+                                       distance, certainty)
+
+    def fetch_objects(self, limit=None, offset=None, filters=None, return_properties=None,
+                      include_vector=False, **kwargs):
+        return self._collection.fetch(limit, offset, filters, return_properties, include_vector)
+
+    def bm25(self, query, limit=10, filters=None, query_properties=None, return_properties=None,
+             include_vector=False, **kwargs):
+        return self._collection.keyword_search(query, limit, filters, query_properties, return_properties,
+                                               include_vector)
+
+    def hybrid(self, query, alpha=0.7, vector=None, query_properties=None, fusion_type=None, limit=10,
+               filters=None, return_properties=None, include_vector=False, **kwargs):
+        if vector is None:
+            vector = self._collection.embedder.embed([query])[0]
+        fusion = "ranked" if getattr(fusion_type, "name", None) == "RANKED" else "relative_score"
+        return self._collection.hybrid_search(query, vector, alpha, fusion, limit, filters, query_properties,
+                                              return_properties, include_vector)
+
+class _LocalBatch:
+    """Collects objects and writes them when the batch context exits."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._objects = []
+
+    def add_object(self, properties=None, uuid=None, vector=None, **kwargs):
+        self._objects.append((properties or {}, uuid, vector))
+        return uuid
+
+    @property
+    def number_errors(self):
+        return len(self._collection.batch.failed_objects)
+
+    def flush(self):
+        """Write the collected objects."""
+        objects, self._objects = self._objects, []
+        try:
+            self._collection.upsert(objects)
+        except Exception as e:
+            logger.error(f"Local batch import failed: {str(e)}")
+            self._collection.batch.failed_objects.extend(
+                LocalErrorObject(message=str(e), object_=obj) for obj in objects
+            )
+
+class _LocalBatchNamespace:
+    """collection.batch for a local collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.failed_objects = []
+
+    @contextmanager
+    def dynamic(self):
+        self.failed_objects = []
+        batch = _LocalBatch(self._collection)
+        # Other writes made inside the batch block are persisted with it
+        with self._collection.deferred_writes():
+            yield batch
+            batch.flush()
+
+    def fixed_size(self, batch_size=100, **kwargs):
+        return self.dynamic()
+
+class _LocalData:
+    """collection.data for a local collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def insert(self, properties, uuid=None, vector=None, **kwargs):
+        object_id = str(uuid) if uuid else _new_uuid()
+        self._collection.upsert([(properties, object_id, vector)])
+        return object_id
+
+    def delete_many(self, where, verbose=False, dry_run=False):
+        matched = self._collection.delete_where(where, dry_run=dry_run)
+        return LocalDeleteManyReturn(failed=0, matches=matched, objects=None,
+                                     successful=0 if dry_run else matched)
+
+class _LocalAggregate:
+    """collection.aggregate for a local collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def over_all(self, total_count=True, filters=None, **kwargs):
+        return LocalAggregateReturn(total_count=self._collection.count(filters), properties={})
+
+class _LocalConfig:
+    """collection.config for a local collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def get(self, simple=False):
+        collection = self._collection
+        return LocalCollectionConfig(
+            name=collection.name,
+            description=collection.description,
+            properties=[LocalProperty(name=name, description=None, tokenization=tokenization)
+                        for name, tokenization in collection._schema.items()]
+        )
+
+    def add_property(self, prop):
+        collection = self._collection
+        with collection._lock:
+            if prop.name not in collection._schema:
+                collection._schema[prop.name] = _tokenization_name(prop)
+                collection._changed(schema=True)
+
+class _LocalCollections:
+    """client.collections for a local client."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def exists(self, name):
+        return self._client._collection(name, create=False) is not None
+
+    def get(self, name):
+        return self._client._collection(name)
+
+    def create(self, name, description=None, properties=None, **kwargs):
+        collection = self._client._collection(name)
+        with collection._lock:
+            collection.description = description
+            collection._schema = {prop.name: _tokenization_name(prop) for prop in properties or []}
+            collection._changed(schema=True)
+        return collection
+
+    def delete(self, name):
+        self._client._drop(name)
+
+    def list_all(self, simple=True):
+        return {name: collection.config.get() for name, collection in self._client._collections.items()
+                if os.path.exists(collection._path("meta.json"))}
+
+class LocalClient:
+    """
+    Stand-in for a connected Weaviate client backed by local collections.
+
+    Every "connection" to the same directory shares one set of collections.
+    """
+
+    def __init__(self, directory, embedder, embedding_cache=None):
+        self.directory = directory
+        self.embedder = embedder
+        self.embedding_cache = embedding_cache
+        self._collections = {}
+        self._lock = threading.Lock()
+        self.collections = _LocalCollections(self)
+
+    def _collection(self, name, create=True):
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                directory = os.path.join(self.directory, name)
+                if not create and not os.path.exists(os.path.join(directory, "meta.json")):
+                    return None
+                collection = LocalCollection(name, directory, self.embedder, self.embedding_cache)
+                self._collections[name] = collection
+            elif not create and not os.path.exists(collection._path("meta.json")):
+                return None
+            return collection
+
+    def _drop(self, name):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+        if collection is None:
+            collection = LocalCollection(name, os.path.join(self.directory, name), self.embedder)
+        collection.drop()
+
+    def is_connected(self):
+        return True
+
+    def is_ready(self):
+        return True
+
+    def close(self):
+        """Write pending changes of every collection."""
+        with self._lock:
+            collections = list(self._collections.values())
+        for collection in collections:
+            collection.flush()
+
+class _AsyncLocalQuery:
+    """Async collection.query for a local collection."""
+
+    def __init__(self, query):
+        self._query = query
+
+    async def near_text(self, query, **kwargs):
+        # Embedding the query would block the event loop
+        return await asyncio.to_thread(self._query.near_text, query, **kwargs)
+
+    async def near_vector(self, near_vector, **kwargs):
+        return self._query.near_vector(near_vector, **kwargs)
+
+    async def fetch_objects(self, **kwargs):
+        return self._query.fetch_objects(**kwargs)
+
+    async def bm25(self, query, **kwargs):
+        return self._query.bm25(query, **kwargs)
+
+    async def hybrid(self, query, **kwargs):
+        # Embeds the query unless a vector is given
+        return await asyncio.to_thread(self._query.hybrid, query, **kwargs)
+
+class _AsyncLocalAggregate:
+    def __init__(self, aggregate):
+        self._aggregate = aggregate
+
+    async def over_all(self, **kwargs):
+        return self._aggregate.over_all(**kwargs)
+
+class _AsyncLocalData:
+    def __init__(self, data):
+        self._data = data
+
+    async def insert(self, properties, **kwargs):
+        return await asyncio.to_thread(self._data.insert, properties, **kwargs)
+
+    async def delete_many(self, where, **kwargs):
+        return await asyncio.to_thread(self._data.delete_many, where, **kwargs)
+
+class AsyncLocalCollection:
+    """Async view of a LocalCollection, matching the async Weaviate collection API."""
+
+    def __init__(self, collection):
+        self.name = collection.name
+        self.sync = collection
+        self.query = _AsyncLocalQuery(collection.query)
+        self.aggregate = _AsyncLocalAggregate(collection.aggregate)
+        self.data = _AsyncLocalData(collection.data)
+
+class _AsyncLocalCollections:
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, name):
+        return AsyncLocalCollection(self._client.collections.get(name))
+
+    async def exists(self, name):
+        return self._client.collections.exists(name)
+
+class AsyncLocalClient:
+    """Async stand-in for a connected Weaviate client, sharing a LocalClient's collections."""
+
+    def __init__(self, client):
+        self.sync = client
+        self.collections = _AsyncLocalCollections(client)
+
+    def is_connected(self):
+        return True
+
+    async def is_ready(self):
+        return True
+
+    async def close(self):
+        """Nothing to release."""
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def connect_to_local_index(directory=None):
+    """
+    Open the local index, sharing collections with every other connection to it.
+
+    Args:
+        directory (str, optional): Index directory; defaults to LOCAL_INDEX_DIR
+
+    Returns:
+        LocalClient: Client exposing the local collections
+    """
+    config = get_config()
+    directory = directory or config["local_index_dir"] or os.path.join(config["cache_dir"], "local_index")
+
+    with _clients_lock:
+        client = _clients.get(directory)
+        if client is None:
+            client = LocalClient(directory, get_embedder(config["embedding_model"]), get_embedding_cache())
+            _clients[directory] = client
+            logger.info(f"Using local vector index at {directory}")
+        return client
+
+async def connect_to_local_index_async(directory=None):
+    """
+    Async variant of connect_to_local_index().
+
+    Returns:
+        AsyncLocalClient: Async client exposing the local collections
+    """
+    client = await asyncio.to_thread(connect_to_local_index, directory)
+    return AsyncLocalClient(client)
@@ -2,83 +2,236 @@
 Weaviate schema definition for historical documents.
 """
 
+import os
+import json
+import time
 import logging
-import weaviate
 from utils.opik_tracking import opik
+from utils.config import get_config
+from .generation import bump_import_generation
 
 logger = logging.getLogger(__name__)
 
 COLLECTION_NAME = "HistoricalDocuments"
+# Only filtered on, by whole value
+FIELD_TOKENIZED_PROPERTIES = ("authors", "document_type", "recipient")
+
+def _content_hash_property():
+    import weaviate
+
+    return weaviate.classes.config.Property(
+        name="content_hash",
+        data_type=weaviate.classes.config.DataType.TEXT,
+        description="Hash of the chunk's properties, used to skip unchanged chunks on re-import",
+        skip_vectorization=True,
+        tokenization=weaviate.classes.config.Tokenization.FIELD
+    )
+
+def _token_count_property():
+    import weaviate
+
+    return weaviate.classes.config.Property(
+        name="token_count",
+        data_type=weaviate.classes.config.DataType.INT,
+        description="Number of tokens in the chunk text, used to budget the LLM context",
+        skip_vectorization=True
+    )
+
+def _tokenization(prop):
+    tokenization = getattr(prop, "tokenization", None)
+    return getattr(tokenization, "value", tokenization)
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+def _rebuild_collection(client, collection):
+    """
+    Recreate the collection with the current schema, keeping every object and vector.
+    
+    Needed for changes Weaviate cannot apply in place, such as a property's
+    tokenization. Objects are first written to a JSONL backup under
+    <cache_dir>/migrations, then re-imported with their stored vectors, so
+    nothing is re-embedded. Once the collection has been deleted, any failure
+    (including objects that could not be restored) raises a RuntimeError
+    naming the backup, rather than letting an import continue into a
+    missing or incomplete collection.
+    """
+    backup_dir = os.path.join(get_config()["cache_dir"], "migrations")
+    os.makedirs(backup_dir, exist_ok=True)
+    backup_path = os.path.join(backup_dir, f"{COLLECTION_NAME}-{int(time.time() * 1000)}.jsonl")
+    
+    count = 0
+    with open(backup_path, "w", encoding="utf-8") as f:
+        for obj in collection.iterator(include_vector=True):
+            vector = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+            record = {"uuid": str(obj.uuid), "properties": obj.properties, "vector": vector}
+            f.write(json.dumps(record, default=_json_default) + "\n")
+            count += 1
+    logger.info(f"Backed up {count} objects to {backup_path}")
+    
+    client.collections.delete(COLLECTION_NAME)
+    bump_import_generation()
+    try:
+        collection = _create_collection(client)
+        with collection.batch.dynamic() as batch:
+            with open(backup_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    batch.add_object(properties=record["properties"], uuid=record["uuid"], vector=record["vector"])
+        failed = collection.batch.failed_objects
+    except Exception as e:
+        raise RuntimeError(f"Rebuilding {COLLECTION_NAME} failed after it was deleted; "
+                           f"restore it from {backup_path}: {str(e)}") from e
+    
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {count} objects failed to restore into {COLLECTION_NAME} "
+                           f"(first error: {failed[0].message}); restore them from {backup_path}")
+    logger.info(f"Rebuilt {COLLECTION_NAME} with {count} objects")
+    return collection
+
+def _migrate_schema(client, collection, rebuild=False):
+    """
+    Bring an existing collection up to the current schema.
+    
+    Properties are added in place. Changes that need the collection to be
+    rebuilt are only applied with rebuild; otherwise they are logged.
+    
+    Args:
+        client: Weaviate client
+        collection: Existing collection
+        rebuild (bool): Whether to rebuild the collection if needed
+    
+    Returns:
+        collection: The migrated collection (a new handle if it was rebuilt)
+    """
+    try:
+        properties = {prop.name: prop for prop in collection.config.get().properties}
+        if "content_hash" not in properties:
+            logger.info(f"Adding content_hash property to {COLLECTION_NAME}")
+            collection.config.add_property(_content_hash_property())
+        if "token_count" not in properties:
+            # Filled in for existing chunks by the next import, since the content hash covers it
+            logger.info(f"Adding token_count property to {COLLECTION_NAME}")
+            collection.config.add_property(_token_count_property())
+    except Exception as e:
+        logger.error(f"Error migrating {COLLECTION_NAME} schema: {str(e)}")
+        return collection
+    
+    reasons = []
+    text = properties.get("text")
+    if text is not None and _tokenization(text) != "word":
+        reasons.append("the text property is keyword searchable")
+    # Index settings cannot be changed in place. The local index has no
+    # such setting (every filter is a vectorized scan), so it is skipped.
+    date = properties.get("date")
+    if date is not None and not getattr(date, "index_range_filters", True):
+        reasons.append("date-range filters use a range index")
+    
+    # Whole-value matching for filters, as in the local index
+    word_tokenized = [name for name in FIELD_TOKENIZED_PROPERTIES
+                      if name in properties and _tokenization(properties[name]) != "field"]
+    if word_tokenized:
+        reasons.append(f"filters on {', '.join(word_tokenized)} match whole values")
+    
+    if reasons and not rebuild:
+        logger.warning(f"{COLLECTION_NAME} needs a rebuild so {' and '.join(reasons)}; "
+                       f"run python main.py --ingest --migrate to rebuild it")
+    elif reasons:
+        logger.info(f"Rebuilding {COLLECTION_NAME} so {' and '.join(reasons)}")
+        collection = _rebuild_collection(client, collection)
+    
+    return collection
 
 @opik.track
-def setup_weaviate_schema(client, recreate=False):
+def setup_weaviate_schema(client, recreate=False, migrate=False):
     """
     Set up the Weaviate schema for historical documents.
     
     Args:
         client: Weaviate client
         recreate (bool): Whether to recreate the collection if it exists
+        migrate (bool): Whether to rebuild an existing collection whose schema
+            cannot be migrated in place; its objects and vectors are kept
         
     Returns:
         collection: The Weaviate collection object
     """
     # Check if collection already exists
-    collections = client.collections.list_all()
-    collection_names = [c.name for c in collections]
-    
-    if COLLECTION_NAME in collection_names:
+    if client.collections.exists(COLLECTION_NAME):
         if recreate:
             logger.info(f"{COLLECTION_NAME} collection already exists. Deleting it to recreate...")
             client.collections.delete(COLLECTION_NAME)
+            bump_import_generation()
         else:
             logger.info(f"{COLLECTION_NAME} collection already exists. Using existing collection.")
-            return client.collections.get(COLLECTION_NAME)
+            collection = client.collections.get(COLLECTION_NAME)
+            return _migrate_schema(client, collection, rebuild=migrate)
+    
+    return _create_collection(client)
+
+def _create_collection(client):
+    """Create the collection with the current schema."""
+    import weaviate
+
+    # In client embedding mode vectors are computed locally and sent with each object
+    if get_config()["embedding_mode"] == "client":
+        vectorizer_config = weaviate.classes.config.Configure.Vectorizer.none()
+    else:
+        vectorizer_config = weaviate.classes.config.Configure.Vectorizer.text2vec_transformers()
     
     # Define the schema for our collection
     historical_docs = client.collections.create(
         name=COLLECTION_NAME,
         description="Historical documents from the American Revolution and founding era",
-        vectorizer_config=weaviate.classes.config.Configure.Vectorizer.text2vec_transformers(),
+        vectorizer_config=vectorizer_config,
         properties=[
             weaviate.classes.config.Property(
                 name="text",
                 data_type=weaviate.classes.config.DataType.TEXT,
                 description="The text content of the document chunk",
                 skip_vectorization=False,
-                tokenization=weaviate.classes.config.Configure.Tokenization.field()
+                # Word tokenization makes chunk bodies searchable with BM25 / hybrid search
+                tokenization=weaviate.classes.config.Tokenization.WORD
             ),
             weaviate.classes.config.Property(
                 name="title",
                 data_type=weaviate.classes.config.DataType.TEXT,
                 description="The title of the document",
                 skip_vectorization=False,
-                tokenization=weaviate.classes.config.Configure.Tokenization.word()
+                tokenization=weaviate.classes.config.Tokenization.WORD
             ),
             weaviate.classes.config.Property(
                 name="date",
                 data_type=weaviate.classes.config.DataType.DATE,
                 description="The date the document was written",
-                skip_vectorization=True
+                skip_vectorization=True,
+                # Range index for the date-range filters used in retrieval
+                index_filterable=True,
+                index_range_filters=True
             ),
             weaviate.classes.config.Property(
                 name="authors",
                 data_type=weaviate.classes.config.DataType.TEXT_ARRAY,
                 description="The authors of the document",
                 skip_vectorization=False,
-                tokenization=weaviate.classes.config.Configure.Tokenization.word()
+                # Field tokenization: filters match whole names, not any name sharing a word
+                tokenization=weaviate.classes.config.Tokenization.FIELD,
+                index_filterable=True
             ),
             weaviate.classes.config.Property(
                 name="document_type",
                 data_type=weaviate.classes.config.DataType.TEXT,
                 description="The type of document (letter, speech, founding_document, etc.)",
                 skip_vectorization=False,
-                tokenization=weaviate.classes.config.Configure.Tokenization.word()
+                tokenization=weaviate.classes.config.Tokenization.FIELD,
+                index_filterable=True
             ),
             weaviate.classes.config.Property(
                 name="source_url",
                 data_type=weaviate.classes.config.DataType.TEXT,
                 description="The URL where the document was sourced",
-                skip_vectorization=True
+                skip_vectorization=True,
+                tokenization=weaviate.classes.config.Tokenization.FIELD
             ),
             weaviate.classes.config.Property(
                 name="chunk_id",
@@ -97,8 +250,11 @@ def setup_weaviate_schema(client, recreate=False):
                 data_type=weaviate.classes.config.DataType.TEXT,
                 description="The recipient of the document (for letters)",
                 skip_vectorization=False,
-                tokenization=weaviate.classes.config.Configure.Tokenization.word()
-            )
+                tokenization=weaviate.classes.config.Tokenization.FIELD,
+                index_filterable=True
+            ),
+            _content_hash_property(),
+            _token_count_property()
         ]
     )
     
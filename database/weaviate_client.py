@@ -4,16 +4,14 @@ Weaviate client setup and connection management.
 
 import os
 import logging
-import weaviate
-from weaviate.classes.init import Auth
-from dotenv import load_dotenv
 from utils.opik_tracking import opik
+from utils.config import load_environment
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 def get_weaviate_credentials():
     """Get Weaviate credentials from environment variables."""
+    load_environment()
     weaviate_url = os.getenv('WEAVIATE_CLUSTER_URL')
     weaviate_api_key = os.getenv('WEAVIATE_API_KEY')
     friendli_token = os.getenv('FRIENDLI_TOKEN')
@@ -28,6 +26,13 @@ def get_weaviate_credentials():
         "friendli_token": friendli_token
     }
 
+def _get_headers(credentials):
+    """Build the extra request headers for the Weaviate connection."""
+    headers = {}
+    if credentials.get("friendli_token"):
+        headers["X-Friendli-Token"] = credentials["friendli_token"]
+    return headers
+
 @opik.track
 def connect_to_weaviate():
     """
@@ -37,11 +42,11 @@ def connect_to_weaviate():
         weaviate.Client: Connected Weaviate client
     """
     credentials = get_weaviate_credentials()
+    headers = _get_headers(credentials)
     
-    headers = {}
-    if credentials.get("friendli_token"):
-        headers["X-Friendli-Token"] = credentials["friendli_token"]
-    
+    import weaviate
+    from weaviate.classes.init import Auth
+
     try:
         client = weaviate.connect_to_weaviate_cloud(
             cluster_url=credentials["url"],
@@ -59,3 +64,36 @@ def connect_to_weaviate():
     except Exception as e:
         logger.error(f"Error connecting to Weaviate: {str(e)}")
         raise
+
+@opik.track
+async def connect_to_weaviate_async():
+    """
+    Connect to Weaviate cluster with the asyncio client.
+    
+    Returns:
+        weaviate.WeaviateAsyncClient: Connected async Weaviate client
+    """
+    credentials = get_weaviate_credentials()
+    headers = _get_headers(credentials)
+    
+    import weaviate
+    from weaviate.classes.init import Auth
+
+    try:
+        client = weaviate.use_async_with_weaviate_cloud(
+            cluster_url=credentials["url"],
+            auth_credentials=Auth.api_key(credentials["api_key"]),
+            headers=headers
+        )
+        await client.connect()
+        
+        if client.is_connected():
+            logger.info("Successfully connected to Weaviate (async)")
+            return client
+        else:
+            logger.error("Failed to connect to Weaviate (async)")
+            raise ConnectionError("Failed to connect to Weaviate")
+    
+    except Exception as e:
+        logger.error(f"Error connecting to Weaviate: {str(e)}")
+        raise
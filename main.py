@@ -0,0 +1,150 @@
+"""
+Entry point for the Voices of Independence project.
+
+Runs a single query or a batch of queries from the command line, imports the
+source documents, serves the HTTP API, or starts the Gradio web interface when
+no query is given.
+"""
+
+import sys
+import json
+import argparse
+import logging
+from utils.config import get_config, configure_logging
+
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    """Parse command line arguments."""
+    config = get_config()
+
+    parser = argparse.ArgumentParser(description="Voices of Independence: An AI-Powered Time Travel Through 1776")
+    parser.add_argument("--query", help="Question to answer. Starts the web interface if omitted.")
+    parser.add_argument("--mode", default=config["default_mode"], choices=list(config["response_modes"].keys()),
+                        help="Response mode")
+    parser.add_argument("--limit", type=int, default=config["default_search_limit"],
+                        help="Number of documents to retrieve")
+    parser.add_argument("--evaluate", action="store_true", help="Evaluate the response")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Answer every question in FILE (one per line, or JSONL with a \"query\" field)")
+    parser.add_argument("--modes", nargs="+", choices=list(config["response_modes"].keys()),
+                        help="Response modes for --batch; defaults to --mode")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="JSONL file of finished --batch answers to resume from")
+    parser.add_argument("--api", action="store_true",
+                        help="Serve the HTTP API for the React interface instead of the Gradio interface")
+    parser.add_argument("--ingest", action="store_true",
+                        help="Fetch, chunk and import every source document, then exit")
+    parser.add_argument("--migrate", action="store_true",
+                        help="With --ingest, first rebuild the collection if its schema cannot be migrated in place")
+    return parser.parse_args()
+
+def run_ingest(migrate=False):
+    """
+    Fetch, chunk and import every source document into the configured vector backend.
+
+    Args:
+        migrate (bool): Whether to rebuild the collection first if its schema needs it
+    """
+    from database.connection_manager import get_connection_manager
+    from database.schema import setup_weaviate_schema
+    from database.import_data import import_documents_to_weaviate
+    from data.document_processor import collect_all_documents
+
+    with get_connection_manager().client() as client:
+        collection = setup_weaviate_schema(client, migrate=migrate)
+        stats = import_documents_to_weaviate(collection, collect_all_documents(),
+                                             batch_size=get_config()["batch_size"])
+
+    print(json.dumps(stats, indent=2))
+    if not stats["success"]:
+        sys.exit(1)
+
+def run_query(query, mode, limit, evaluate=False):
+    """
+    Answer a single query and print the result.
+
+    Args:
+        query (str): User query
+        mode (str): Response mode
+        limit (int): Number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+    """
+    from database.connection_manager import get_connection_manager
+    from rag.independence_rag import independence_rag
+
+    with get_connection_manager().collection() as collection:
+        result = independence_rag(collection, query, mode=mode, limit=limit, evaluate=evaluate)
+
+    print(result["response"])
+    print("\nSources:")
+    for source in result["sources"]:
+        print(f"- {source}")
+
+    if "evaluation" in result:
+        print("\nEvaluation:")
+        print(json.dumps(result["evaluation"]["retrieval_evaluation"], indent=2))
+        print(json.dumps(result["evaluation"]["response_evaluation"], indent=2))
+
+def load_batch_queries(path):
+    """
+    Read the questions of a batch file.
+
+    Args:
+        path (str): Text file with one question per line, or JSONL with a "query" field
+
+    Returns:
+        list: Questions in file order
+    """
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            queries.append(json.loads(line)["query"] if line.startswith("{") else line)
+    return queries
+
+def run_batch(path, modes, limit, checkpoint_path=None):
+    """
+    Answer every question of a batch file and print one JSON result per line.
+
+    Args:
+        path (str): Batch file
+        modes (list): Response modes
+        limit (int): Number of documents to retrieve
+        checkpoint_path (str, optional): JSONL file of finished answers to resume from
+    """
+    from database.connection_manager import get_connection_manager
+    from rag.batch import independence_rag_batch
+
+    queries = load_batch_queries(path)
+    with get_connection_manager().collection() as collection:
+        for event in independence_rag_batch(collection, queries, modes=modes, limit=limit,
+                                            checkpoint_path=checkpoint_path):
+            if event["type"] == "result":
+                result = {key: value for key, value in event["result"].items() if key != "context"}
+                print(json.dumps(result), flush=True)
+            else:
+                print(json.dumps({"summary": event["stats"]}))
+
+def main():
+    """Run the CLI or the web interface."""
+    configure_logging()
+    args = parse_args()
+
+    if args.ingest:
+        run_ingest(migrate=args.migrate)
+    elif args.api:
+        from api.server import run_server
+        run_server()
+    elif args.batch:
+        run_batch(args.batch, args.modes or [args.mode], args.limit, checkpoint_path=args.checkpoint)
+    elif args.query:
+        run_query(args.query, args.mode, args.limit, evaluate=args.evaluate)
+    else:
+        from ui.gradio_app import run_app
+        run_app()
+
+if __name__ == "__main__":
+    main()
@@ -4,36 +4,186 @@ Provides the retrieval-augmented generation system for answering
 questions about American Independence.
 """
 
-from .retriever import (
-    search_historical_documents,
-    format_search_results,
-    prepare_context_for_llm,
-    retrieve_context
-)
-from .generator import (
-    get_friendli_client,
-    call_llm,
-    get_system_prompt,
-    generate_response
-)
-from .evaluator import (
-    evaluate_retrieval_quality,
-    evaluate_response_quality,
-    evaluate_rag_system
+from utils.lazy import lazy_exports
+
+# Imported eagerly: independence_rag shares its submodule's name, which would shadow a lazy export
+from .independence_rag import (
+    independence_rag,
+    independence_rag_stream,
+    independence_rag_async,
+    independence_rag_stream_async
 )
-from .independence_rag import independence_rag
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    ".filters": [
+        'parse_date',
+        'normalize_filters',
+        'filters_key',
+        'build_filters'
+    ],
+    ".context_builder": [
+        'get_token_budget',
+        'overlap_length',
+        'merge_adjacent_chunks',
+        'build_context'
+    ],
+    ".retriever": [
+        'normalize_query',
+        'get_query_vectorizer',
+        'preload_query_vectorizer',
+        'get_query_vector_cache',
+        'prefetch_query_vectors',
+        'search_historical_documents',
+        'format_search_results',
+        'prepare_context_for_llm',
+        'assemble_context',
+        'retrieve_context',
+        'search_historical_documents_async',
+        'retrieve_context_async'
+    ],
+    ".llm_client": [
+        'get_shared_client',
+        'get_shared_async_client',
+        'close_shared_async_client',
+        'close_shared_clients'
+    ],
+    ".rate_limiter": [
+        'TokenBucket',
+        'LLMRateLimiter',
+        'estimate_tokens',
+        'is_retryable',
+        'get_rate_limiter',
+        'reset_rate_limiter'
+    ],
+    ".metrics": [
+        'observe_stages',
+        'observe_llm_call',
+        'track_request',
+        'stage_summary'
+    ],
+    ".generator": [
+        'get_friendli_client',
+        'call_llm',
+        'call_llm_stream',
+        'get_system_prompt',
+        'build_messages',
+        'generate_response',
+        'generate_response_stream',
+        'call_llm_async',
+        'call_llm_stream_async',
+        'generate_response_async',
+        'generate_response_stream_async'
+    ],
+    ".evaluator": [
+        'evaluate_retrieval_quality',
+        'evaluate_response_quality',
+        'evaluate_rag_system',
+        'evaluate_batch',
+        'parse_evaluation',
+        'evaluate_retrieval_quality_async',
+        'evaluate_response_quality_async',
+        'evaluate_rag_system_async',
+        'evaluate_batch_async'
+    ],
+    ".single_flight": [
+        'request_key',
+        'SingleFlight',
+        'get_single_flight',
+        'coalesced_independence_rag',
+        'coalesced_independence_rag_stream',
+        'coalesced_independence_rag_async',
+        'coalesced_independence_rag_stream_async'
+    ],
+    ".semantic_cache": [
+        'SemanticCache',
+        'get_semantic_cache',
+        'cached_independence_rag',
+        'cached_independence_rag_stream',
+        'cached_independence_rag_async',
+        'cached_independence_rag_stream_async'
+    ],
+    ".batch": [
+        'batch_item_key',
+        'BatchCheckpoint',
+        'independence_rag_batch',
+        'independence_rag_batch_async'
+    ]
+})
 
 __all__ = [
+    'parse_date',
+    'normalize_filters',
+    'filters_key',
+    'build_filters',
+    'get_token_budget',
+    'overlap_length',
+    'merge_adjacent_chunks',
+    'build_context',
+    'normalize_query',
+    'get_query_vectorizer',
+    'preload_query_vectorizer',
+    'get_query_vector_cache',
+    'prefetch_query_vectors',
     'search_historical_documents',
     'format_search_results',
     'prepare_context_for_llm',
+    'assemble_context',
     'retrieve_context',
+    'search_historical_documents_async',
+    'retrieve_context_async',
+    'get_shared_client',
+    'get_shared_async_client',
+    'close_shared_async_client',
+    'close_shared_clients',
+    'TokenBucket',
+    'LLMRateLimiter',
+    'estimate_tokens',
+    'is_retryable',
+    'get_rate_limiter',
+    'reset_rate_limiter',
+    'observe_stages',
+    'observe_llm_call',
+    'track_request',
+    'stage_summary',
     'get_friendli_client',
     'call_llm',
+    'call_llm_stream',
     'get_system_prompt',
+    'build_messages',
     'generate_response',
+    'generate_response_stream',
+    'call_llm_async',
+    'call_llm_stream_async',
+    'generate_response_async',
+    'generate_response_stream_async',
     'evaluate_retrieval_quality',
     'evaluate_response_quality',
     'evaluate_rag_system',
-    'independence_rag'
-]
\ No newline at end of file
+    'evaluate_batch',
+    'parse_evaluation',
+    'evaluate_retrieval_quality_async',
+    'evaluate_response_quality_async',
+    'evaluate_rag_system_async',
+    'evaluate_batch_async',
+    'independence_rag',
+    'independence_rag_stream',
+    'independence_rag_async',
+    'independence_rag_stream_async',
+    'request_key',
+    'SingleFlight',
+    'get_single_flight',
+    'coalesced_independence_rag',
+    'coalesced_independence_rag_stream',
+    'coalesced_independence_rag_async',
+    'coalesced_independence_rag_stream_async',
+    'SemanticCache',
+    'get_semantic_cache',
+    'cached_independence_rag',
+    'cached_independence_rag_stream',
+    'cached_independence_rag_async',
+    'cached_independence_rag_stream_async',
+    'batch_item_key',
+    'BatchCheckpoint',
+    'independence_rag_batch',
+    'independence_rag_batch_async'
+]
@@ -0,0 +1,383 @@
+"""
+Batched question answering over many queries and response modes.
+
+independence_rag_batch() answers every (query, mode) pair of a batch instead
+of paying one independence_rag() call per pair in series:
+
+- each distinct query is retrieved once and shared by all of its modes, and
+  repeated (query, mode) pairs are answered once; retrieval runs in groups
+  whose query vectors are embedded together when a local query vectorizer
+  is configured;
+- answers are generated with bounded concurrency while later groups are
+  still being retrieved;
+- results are yielded in input order, each as soon as it and every result
+  before it is done;
+- finished results are appended to an optional JSONL checkpoint, and a rerun
+  with the same checkpoint skips them. Items whose search or generation
+  failed are not checkpointed, so that a rerun retries them rather than
+  keeping answers written without context.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from utils.config import get_config
+from utils.cache import stable_hash
+from utils.tokens import count_tokens
+from .filters import filters_key
+from .retriever import (
+    normalize_query,
+    prefetch_query_vectors,
+    search_historical_documents,
+    search_historical_documents_async,
+    assemble_context
+)
+from .generator import generate_response, generate_response_async
+
+logger = logging.getLogger(__name__)
+
+def batch_item_key(query, mode, limit=5, filters=None):
+    """
+    Get the checkpoint key of one answer.
+
+    Returns:
+        str: Hash of the normalized query, mode, limit and filters
+    """
+    return stable_hash(normalize_query(query), mode, limit, filters_key(filters))
+
+class BatchCheckpoint:
+    """
+    Append-only JSONL file of finished batch results, keyed by batch_item_key().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        needs_newline = False
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    needs_newline = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line of a killed job can be cut short
+                        logger.warning(f"Ignoring unreadable line {line_number} of {path}")
+                        continue
+                    self.results[record["key"]] = record
+            logger.info(f"Resuming from {path} with {len(self.results)} finished results")
+
+        self._file = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def write(self, result):
+        """Append one finished result."""
+        with self._lock:
+            self._file.write(json.dumps(result, default=str) + "\n")
+            self._file.flush()
+
+    def close(self):
+        """Close the file."""
+        with self._lock:
+            self._file.close()
+
+def _plan(queries, modes, limit, filters, checkpoint):
+    """
+    List the batch items and group the unfinished ones for retrieval.
+
+    Returns:
+        tuple: (items in output order, dict of resumed results by index, list of
+        groups; a group is a list of item lists that share one query)
+    """
+    items = []
+    for query in queries:
+        for mode in modes:
+            items.append({
+                "index": len(items),
+                "query": query,
+                "mode": mode,
+                "key": batch_item_key(query, mode, limit, filters)
+            })
+
+    resumed = {}
+    by_query = OrderedDict()
+    for item in items:
+        record = checkpoint.results.get(item["key"]) if checkpoint is not None else None
+        if record is not None:
+            resumed[item["index"]] = dict(record, resumed=True)
+        else:
+            by_query.setdefault(normalize_query(item["query"]), []).append(item)
+
+    return items, resumed, list(by_query.values())
+
+def _groups(shared, size):
+    return [shared[start:start + size] for start in range(0, len(shared), size)]
+
+def _result(item, retrieved, response, retrieval_latency, generation_latency):
+    """Build a result like independence_rag()'s, plus its batch index and checkpoint key."""
+    return {
+        "index": item["index"],
+        "key": item["key"],
+        "query": item["query"],
+        "mode": item["mode"],
+        "response": response,
+        "context": retrieved["context"],
+        "sources": [doc["title"] for doc in retrieved["formatted_results"]],
+        "metrics": {
+            "retrieval_latency": retrieval_latency,
+            "generation_latency": generation_latency,
+            "context_tokens": retrieved["context_stats"]["prompt_tokens"],
+            "context_tokens_saved": retrieved["context_stats"]["tokens_saved"],
+            "response_tokens": count_tokens(response or "")
+        }
+    }
+
+def _failure(item, error):
+    logger.error(f"Batch item {item['index']} ({item['mode']}) failed: {str(error)}")
+    return {"index": item["index"], "key": item["key"], "query": item["query"], "mode": item["mode"],
+            "error": str(error)}
+
+def _failed(future, item, error):
+    """Resolve future with the failure result of an item whose search failed."""
+    future.set_result(_failure(item, f"search failed: {str(error)}"))
+    return future
+
+def _submit(members, submit):
+    """
+    Start one answer per distinct checkpoint key among items sharing a query.
+
+    Returns:
+        dict: Future or task for each item index; repeated items share one
+    """
+    started = {}
+    outcomes = {}
+    for item in members:
+        if item["key"] not in started:
+            started[item["key"]] = submit(item)
+        outcomes[item["index"]] = started[item["key"]]
+    return outcomes
+
+class _Throughput:
+    """Counters for the batch summary; only answers computed in this run count towards throughput."""
+
+    def __init__(self, items, distinct_queries):
+        self.start = time.perf_counter()
+        self.stats = {"items": items, "distinct_queries": distinct_queries, "answered": 0, "failed": 0,
+                      "resumed": 0, "response_tokens": 0, "context_tokens": 0}
+        self._counted = set()
+
+    def add(self, item, result):
+        """Count a finished answer and return it with the item's own index and query."""
+        if result.get("resumed"):
+            self.stats["resumed"] += 1
+        elif "error" in result:
+            self.stats["failed"] += 1
+        else:
+            self.stats["answered"] += 1
+            # A repeated item shares its answer, so its tokens are only generated once
+            if item["key"] not in self._counted:
+                self._counted.add(item["key"])
+                self.stats["response_tokens"] += result["metrics"]["response_tokens"]
+                self.stats["context_tokens"] += result["metrics"]["context_tokens"]
+        return dict(result, index=item["index"], query=item["query"])
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        stats = dict(self.stats, elapsed=elapsed)
+        stats["queries_per_min"] = stats["answered"] / elapsed * 60 if elapsed else 0.0
+        stats["tokens_per_s"] = stats["response_tokens"] / elapsed if elapsed else 0.0
+        logger.info(f"Batch finished: {stats['answered']} answered, {stats['failed']} failed, "
+                    f"{stats['resumed']} resumed in {elapsed:.1f}s ({stats['queries_per_min']:.1f} queries/min, "
+                    f"{stats['tokens_per_s']:.1f} tokens/s)")
+        return stats
+
+def _answer(item, results, retrieval_latency, checkpoint):
+    """Build the context for one mode and generate its answer (runs on a worker thread)."""
+    try:
+        start = time.perf_counter()
+        retrieved = assemble_context(results, item["mode"])
+        response = generate_response(item["query"], retrieved["context"], mode=item["mode"])
+        result = _result(item, retrieved, response, retrieval_latency, time.perf_counter() - start)
+    except Exception as e:
+        return _failure(item, e)
+
+    if checkpoint is not None:
+        checkpoint.write(result)
+    return result
+
+def independence_rag_batch(collection, queries, modes=None, limit=5, filters=None, max_concurrency=None,
+                           retrieval_batch_size=None, checkpoint_path=None):
+    """
+    Answer many queries in one or more response modes.
+
+    Args:
+        collection: Weaviate collection
+        queries (list): User queries
+        modes (list, optional): Response modes; each query is answered in every
+            mode. Defaults to the configured default mode
+        limit (int): Maximum number of documents to retrieve per query
+        filters (dict, optional): Metadata filters applied to every query
+        max_concurrency (int, optional): Maximum LLM calls in flight
+        retrieval_batch_size (int, optional): Distinct queries retrieved per group
+        checkpoint_path (str, optional): JSONL file of finished results to resume from and append to
+
+    Yields:
+        dict: {"type": "result", "result": ...} for every (query, mode) pair in
+        input order (query-major), then {"type": "summary", "stats": ...} with
+        queries_per_min and tokens_per_s. Failed answers carry an "error"
+        and are not checkpointed, so a rerun retries them
+    """
+    config = get_config()
+    modes = modes or [config["default_mode"]]
+    max_concurrency = max_concurrency or config["batch_max_concurrency"]
+    retrieval_batch_size = retrieval_batch_size or config["batch_retrieval_size"]
+
+    checkpoint = BatchCheckpoint(checkpoint_path) if checkpoint_path else None
+    items, resumed, shared = _plan(queries, modes, limit, filters, checkpoint)
+    throughput = _Throughput(len(items), len(shared))
+    logger.info(f"Batch of {len(items)} answers ({len(resumed)} resumed), {len(shared)} distinct queries, "
+                f"concurrency {max_concurrency}")
+
+    outcomes = {}
+    for index, record in resumed.items():
+        outcomes[index] = Future()
+        outcomes[index].set_result(record)
+
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="rag-batch")
+    next_index = 0
+
+    def ready(block):
+        nonlocal next_index
+        while next_index < len(items) and next_index in outcomes:
+            if not block and not outcomes[next_index].done():
+                return
+            result = throughput.add(items[next_index], outcomes.pop(next_index).result())
+            next_index += 1
+            yield {"type": "result", "result": result}
+
+    try:
+        for group in _groups(shared, retrieval_batch_size):
+            prefetch_query_vectors([members[0]["query"] for members in group])
+            for members in group:
+                start = time.perf_counter()
+                try:
+                    results = search_historical_documents(collection, members[0]["query"], limit=limit,
+                                                          filters=filters, raise_errors=True)
+                except Exception as e:
+                    outcomes.update(_submit(members, lambda item: _failed(Future(), item, e)))
+                    continue
+                retrieval_latency = time.perf_counter() - start
+                outcomes.update(_submit(
+                    members, lambda item: executor.submit(_answer, item, results, retrieval_latency, checkpoint)
+                ))
+            yield from ready(block=False)
+
+        yield from ready(block=True)
+        yield {"type": "summary", "stats": throughput.summary()}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        if checkpoint is not None:
+            checkpoint.close()
+
+async def independence_rag_batch_async(collection, queries, modes=None, limit=5, filters=None,
+                                       max_concurrency=None, retrieval_batch_size=None, checkpoint_path=None):
+    """
+    Asyncio variant of independence_rag_batch().
+
+    The searches of a group run concurrently on the async Weaviate client, and
+    answers are generated with the async LLM client.
+
+    Args:
+        collection: Async Weaviate collection
+        queries (list): User queries
+        modes (list, optional): Response modes; defaults to the configured default mode
+        limit (int): Maximum number of documents to retrieve per query
+        filters (dict, optional): Metadata filters applied to every query
+        max_concurrency (int, optional): Maximum LLM calls in flight
+        retrieval_batch_size (int, optional): Distinct queries retrieved per group
+        checkpoint_path (str, optional): JSONL file of finished results to resume from and append to
+
+    Yields:
+        dict: "result" events in input order, then a "summary" event
+    """
+    config = get_config()
+    modes = modes or [config["default_mode"]]
+    max_concurrency = max_concurrency or config["batch_max_concurrency"]
+    retrieval_batch_size = retrieval_batch_size or config["batch_retrieval_size"]
+
+    checkpoint = BatchCheckpoint(checkpoint_path) if checkpoint_path else None
+    items, resumed, shared = _plan(queries, modes, limit, filters, checkpoint)
+    throughput = _Throughput(len(items), len(shared))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def retrieve(query):
+        start = time.perf_counter()
+        try:
+            results = await search_historical_documents_async(collection, query, limit=limit, filters=filters,
+                                                              raise_errors=True)
+        except Exception as e:
+            return e, None
+        return results, time.perf_counter() - start
+
+    async def answer(item, results, retrieval_latency):
+        async with semaphore:
+            try:
+                start = time.perf_counter()
+                retrieved = assemble_context(results, item["mode"])
+                response = await generate_response_async(item["query"], retrieved["context"], mode=item["mode"])
+                result = _result(item, retrieved, response, retrieval_latency, time.perf_counter() - start)
+            except Exception as e:
+                return _failure(item, e)
+
+        if checkpoint is not None:
+            checkpoint.write(result)
+        return result
+
+    outcomes = {}
+    for index, record in resumed.items():
+        outcomes[index] = asyncio.get_running_loop().create_future()
+        outcomes[index].set_result(record)
+    next_index = 0
+
+    try:
+        for group in _groups(shared, retrieval_batch_size):
+            # Embedding is CPU-bound, so it must not run on the event loop
+            await asyncio.to_thread(prefetch_query_vectors, [members[0]["query"] for members in group])
+            retrieved = await asyncio.gather(*(retrieve(members[0]["query"]) for members in group))
+            for members, (results, retrieval_latency) in zip(group, retrieved):
+                if isinstance(results, Exception):
+                    future = asyncio.get_running_loop().create_future
+                    outcomes.update(_submit(members, lambda item: _failed(future(), item, results)))
+                    continue
+                outcomes.update(_submit(
+                    members, lambda item: asyncio.create_task(answer(item, results, retrieval_latency))
+                ))
+
+            while next_index in outcomes and outcomes[next_index].done():
+                result = throughput.add(items[next_index], outcomes.pop(next_index).result())
+                next_index += 1
+                yield {"type": "result", "result": result}
+
+        while next_index < len(items):
+            result = throughput.add(items[next_index], await outcomes.pop(next_index))
+            next_index += 1
+            yield {"type": "result", "result": result}
+
+        yield {"type": "summary", "stats": throughput.summary()}
+    finally:
+        for outcome in outcomes.values():
+            outcome.cancel()
+        if checkpoint is not None:
+            checkpoint.close()
@@ -0,0 +1,228 @@
+"""
+Token-budgeted assembly of the LLM context from retrieved chunks.
+
+Consecutive chunks of a document share up to chunk_overlap of text, so
+sending them verbatim repeats that text in the prompt. The builder merges runs
+of adjacent chunks of the same document into one passage with the overlap
+removed, then adds passages, most relevant first, until the mode's token
+budget is spent.
+"""
+
+import re
+import logging
+from utils.config import get_config
+from utils.tokens import count_tokens
+from data.document_processor import get_length_function
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE = re.compile(r"\s")
+
+# Below this, a truncated passage adds too little to be worth its header
+MIN_PARTIAL_TOKENS = 64
+
+def get_token_budget(mode=None):
+    """
+    Get the context token budget of a response mode.
+
+    Args:
+        mode (str, optional): Response mode; defaults to the configured default mode
+
+    Returns:
+        int: Token budget, or None if the context is not limited
+    """
+    config = get_config()
+    return config["context_token_budgets"].get(mode or config["default_mode"])
+
+def overlap_length(previous, text, max_overlap=None, unit=None):
+    """
+    Find how much of the start of a chunk repeats the end of the previous one.
+
+    The chunker starts each chunk with whole trailing sentences of the
+    previous chunk, so the overlap is an exact suffix/prefix match no longer
+    than chunk_overlap.
+
+    Args:
+        previous (str): Text of the previous chunk
+        text (str): Text of the next chunk
+        max_overlap (int, optional): Longest possible overlap; defaults to chunk_overlap
+        unit (str, optional): Unit of max_overlap, "chars" or "tokens"; defaults to chunk_unit
+
+    Returns:
+        int: Number of leading characters of text to drop
+    """
+    config = get_config()
+    max_overlap = config["chunk_overlap"] if max_overlap is None else max_overlap
+    length_function = get_length_function(unit or config["chunk_unit"])
+
+    if max_overlap <= 0 or not previous:
+        return 0
+
+    # The overlap is followed by the separator the chunker joined pieces with,
+    # so only whitespace positions are candidates, tried longest first
+    limit = min(len(previous), len(text) - 1)
+    if length_function is len:
+        limit = min(limit, max_overlap)
+    for match in reversed(list(_WHITESPACE.finditer(text, 1, limit + 1))):
+        end = match.start()
+        if text[end - 1] == previous[-1] and previous.endswith(text[:end]) \
+                and length_function(text[:end]) <= max_overlap:
+            return end
+    return 0
+
+def _chunk_tokens(doc):
+    """Token count precomputed at import, or counted now for chunks imported before it existed."""
+    tokens = doc.get("token_count")
+    return tokens if tokens is not None else count_tokens(doc["text"])
+
+def merge_adjacent_chunks(formatted_results):
+    """
+    Merge consecutive chunks of the same document into passages.
+
+    Args:
+        formatted_results (list): Results from format_search_results(), in retrieval order
+
+    Returns:
+        list: Passages ordered by the retrieval rank of their best chunk. Each
+        has the document fields of its first chunk plus "chunk_ids", "rank",
+        "text", "tokens" and "overlap_tokens" (repeated tokens removed)
+    """
+    config = get_config()
+    documents = {}
+    for rank, doc in enumerate(formatted_results):
+        key = doc.get("source_url") or doc["title"]
+        documents.setdefault(key, {})
+        # A chunk can come back twice, e.g. from both halves of a hybrid search
+        documents[key].setdefault(doc["chunk_id"], (rank, doc))
+
+    passages = []
+    for chunks in documents.values():
+        passage = None
+        for chunk_id in sorted(chunks):
+            rank, doc = chunks[chunk_id]
+            tokens = _chunk_tokens(doc)
+
+            if passage is not None and chunk_id == passage["chunk_ids"][-1] + 1:
+                overlap = overlap_length(passage["text"], doc["text"], config["chunk_overlap"], config["chunk_unit"])
+                overlap_tokens = count_tokens(doc["text"][:overlap]) if overlap else 0
+                # Without overlap the separator between the chunks is lost; a space is the likeliest one
+                passage["pieces"].append(doc["text"][overlap:] if overlap else " " + doc["text"])
+                passage["text"] = doc["text"]  # only the end of the passage matters for the next overlap
+                passage["chunk_ids"].append(chunk_id)
+                passage["rank"] = min(passage["rank"], rank)
+                passage["tokens"] += tokens - overlap_tokens
+                passage["overlap_tokens"] += overlap_tokens
+                continue
+
+            passage = dict(doc, chunk_ids=[chunk_id], rank=rank, pieces=[doc["text"]],
+                           tokens=tokens, overlap_tokens=0)
+            passages.append(passage)
+
+    for passage in passages:
+        passage["text"] = "".join(passage.pop("pieces"))
+
+    passages.sort(key=lambda passage: passage["rank"])
+    return passages
+
+def _header(doc, number):
+    """Metadata lines introducing one document in the context."""
+    chunk_ids = doc.get("chunk_ids", [doc["chunk_id"]])
+    if len(chunk_ids) > 1:
+        chunks = f"Chunks: {chunk_ids[0] + 1}-{chunk_ids[-1] + 1} of {doc['total_chunks']}"
+    else:
+        chunks = f"Chunk: {chunk_ids[0] + 1} of {doc['total_chunks']}"
+
+    lines = [
+        f"\n\nDOCUMENT {number}:",
+        f"Title: {doc['title']}",
+        f"Date: {doc['date']}",
+        f"Author(s): {doc['authors']}",
+        f"Type: {doc['document_type']}"
+    ]
+    if "recipient" in doc:
+        lines.append(f"Recipient: {doc['recipient']}")
+    lines.extend([chunks, "Content:\n"])
+    return "\n".join(lines)
+
+def _truncate(text, max_tokens):
+    """Cut text to at most max_tokens, at a sentence boundary where possible."""
+    kept = []
+    used = 0
+    for sentence in _SENTENCE_END.split(text):
+        tokens = count_tokens(sentence) + (1 if kept else 0)
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+
+    if kept:
+        return " ".join(kept)
+
+    # A single sentence longer than the budget is cut at a word boundary
+    words = text.split(" ")
+    return " ".join(words[:max(1, int(len(words) * max_tokens / max(count_tokens(text), 1)))])
+
+def build_context(formatted_results, token_budget=None):
+    """
+    Build the LLM context from retrieved chunks within a token budget.
+
+    Adjacent chunks of a document are merged with their overlap removed.
+    Passages are added in order of their best chunk's retrieval rank; the
+    first one that does not fit is truncated at a sentence boundary (if
+    enough budget is left to be useful) and the rest are dropped.
+
+    Args:
+        formatted_results (list): Results from format_search_results(), in retrieval order
+        token_budget (int, optional): Maximum context tokens; None includes everything
+
+    Returns:
+        dict: "context" text and "stats" with prompt_tokens, the tokens the
+        chunks would take verbatim (unmerged_tokens), tokens_saved,
+        overlap_tokens_removed, passages, chunks_included, chunks_dropped and truncated
+    """
+    passages = merge_adjacent_chunks(formatted_results)
+    unmerged_tokens = sum(count_tokens(_header(doc, i + 1)) + _chunk_tokens(doc)
+                          for i, doc in enumerate(formatted_results))
+
+    parts = []
+    used = 0
+    chunks_included = 0
+    overlap_removed = 0
+    truncated = False
+
+    for passage in passages:
+        header = _header(passage, len(parts) + 1)
+        header_tokens = count_tokens(header)
+        text = passage["text"]
+        tokens = header_tokens + passage["tokens"]
+
+        if token_budget is not None and used + tokens > token_budget:
+            remaining = token_budget - used - header_tokens
+            if remaining < MIN_PARTIAL_TOKENS:
+                break
+            text = _truncate(text, remaining)
+            tokens = header_tokens + count_tokens(text)
+            truncated = True
+
+        parts.append(header + text + "\n")
+        used += tokens
+        chunks_included += len(passage["chunk_ids"])
+        overlap_removed += passage["overlap_tokens"]
+        if truncated:
+            break
+
+    total_chunks = sum(len(passage["chunk_ids"]) for passage in passages)
+    stats = {
+        "prompt_tokens": used,
+        "unmerged_tokens": unmerged_tokens,
+        "tokens_saved": max(unmerged_tokens - used, 0),
+        "overlap_tokens_removed": overlap_removed,
+        "token_budget": token_budget,
+        "passages": len(parts),
+        "chunks_included": chunks_included,
+        "chunks_dropped": total_chunks - chunks_included,
+        "truncated": truncated
+    }
+    logger.debug(f"Built context: {stats}")
+    return {"context": "".join(parts), "stats": stats}
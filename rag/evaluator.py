@@ -2,124 +2,379 @@
 Evaluation functions for the RAG system.
 """
 
+import os
+import re
+import json
+import asyncio
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from utils.opik_tracking import opik
-from .generator import get_friendli_client, call_llm
+from utils.config import get_config
+from utils.cache import stable_hash, JSONDiskCache
+from .generator import get_friendli_client, call_llm, call_llm_async
+from .llm_client import get_shared_async_client
 from .retriever import prepare_context_for_llm
 
 logger = logging.getLogger(__name__)
 
-@opik.track
-def evaluate_retrieval_quality(query, retrieved_docs):
-    """
-    Evaluate the quality of retrieved documents.
-    
-    Args:
-        query (str): User query
-        retrieved_docs (list): Retrieved documents
-        
-    Returns:
-        str: Evaluation result
-    """
-    client = get_friendli_client()
-    
+# Bump when the evaluation prompts change so cached judgments are not reused
+EVALUATION_VERSION = 2
+EVALUATION_MODEL = "meta-llama-3.3-70b-instruct"
+
+_cache = None
+
+def get_evaluation_cache():
+    """Get the on-disk cache of evaluation results."""
+    global _cache
+    if _cache is None:
+        _cache = JSONDiskCache(os.path.join(get_config()["cache_dir"], "evaluations"))
+    return _cache
+
+def _retrieval_eval_messages(query, documents_text):
+    """Build the messages asking the LLM to judge retrieval quality."""
     # Create messages for the LLM to evaluate retrieval quality
     eval_prompt = f"""
     Given the user query: "{query}"
-    
+
     And these retrieved documents:
-    {prepare_context_for_llm(retrieved_docs)}
-    
+    {documents_text}
+
     Please evaluate the retrieval quality by answering these questions:
     1. On a scale of 1-10, how relevant are the retrieved documents to the query?
     2. Which document is most relevant to the query and why?
     3. Are there any retrieved documents that seem irrelevant?
     4. What related documents or information might be missing?
-    
-    Provide your evaluation in this format:
-    RELEVANCE_SCORE: [1-10]
-    MOST_RELEVANT: [document title]
-    IRRELEVANT_DOCS: [list or "None"]
-    MISSING_INFO: [description]
-    """
-    
+
+    Respond with only a JSON object with these keys:
+    "relevance_score": integer from 1 to 10,
+    "most_relevant": title of the most relevant document,
+    "most_relevant_reason": why it is the most relevant,
+    "irrelevant_docs": list of titles of irrelevant documents (empty if none),
+    "missing_info": description of missing documents or information
+    """
+
     messages = [
-        {"role": "system", "content": "You are an AI assistant that evaluates search result quality for historical document retrieval."},
+        {"role": "system", "content": "You are an AI assistant that evaluates search result quality for historical document retrieval. You always answer with valid JSON."},
         {"role": "user", "content": eval_prompt}
     ]
-    
-    response = call_llm(client, messages)
-    return response.choices[0].message.content
 
-@opik.track
-def evaluate_response_quality(query, context, response):
-    """
-    Evaluate the quality of the generated response.
-    
-    Args:
-        query (str): User query
-        context (str): Context provided to the LLM
-        response (str): Generated response
-        
-    Returns:
-        str: Evaluation result
-    """
-    client = get_friendli_client()
-    
+    return messages
+
+def _response_eval_messages(query, context, response):
+    """Build the messages asking the LLM to judge response quality."""
     # Create messages for the LLM to evaluate response quality
     eval_prompt = f"""
     Given the user query: "{query}"
-    
+
     The context provided to the AI:
     {context}
-    
+
     And the AI's response:
     {response}
-    
+
     Please evaluate the response quality by answering these questions:
     1. On a scale of 1-10, how well does the response answer the query?
     2. Does the response accurately reflect the information in the context?
     3. Is there any hallucination or information not supported by the context?
     4. How could the response be improved?
-    
-    Provide your evaluation in this format:
-    RESPONSE_QUALITY: [1-10]
-    ACCURACY: [1-10]
-    HALLUCINATION: [Yes/No with explanation]
-    IMPROVEMENTS: [suggestions]
-    """
-    
+
+    Respond with only a JSON object with these keys:
+    "response_quality": integer from 1 to 10,
+    "accuracy": integer from 1 to 10,
+    "hallucination": true or false,
+    "hallucination_explanation": explanation of any unsupported claims,
+    "improvements": suggestions for improving the response
+    """
+
     messages = [
-        {"role": "system", "content": "You are an AI assistant that evaluates response quality for historical document retrieval and synthesis."},
+        {"role": "system", "content": "You are an AI assistant that evaluates response quality for historical document retrieval and synthesis. You always answer with valid JSON."},
         {"role": "user", "content": eval_prompt}
     ]
-    
-    response = call_llm(client, messages)
-    return response.choices[0].message.content
+
+    return messages
+
+def parse_evaluation(text):
+    """
+    Parse the JSON object returned by an evaluation call.
+
+    Args:
+        text (str): Raw LLM output
+
+    Returns:
+        dict: Parsed evaluation, or {"error": ..., "raw": text} if it is not valid JSON
+    """
+    # Models sometimes wrap JSON in a markdown code fence or add a preamble
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except ValueError:
+            pass
+
+    logger.warning("Evaluation response was not valid JSON")
+    return {"error": "invalid_json", "raw": text}
+
+def _cache_key(kind, query, *inputs):
+    return stable_hash(kind, EVALUATION_VERSION, EVALUATION_MODEL, query, *inputs)
+
+def _cached(key, use_cache):
+    if not use_cache:
+        return None
+    return get_evaluation_cache().get(key)
+
+def _store(key, evaluation, use_cache):
+    # Unparseable answers are not cached so a re-run can try again
+    if use_cache and "error" not in evaluation:
+        get_evaluation_cache().set(key, evaluation)
+
+def _judge_retrieval(query, documents_text, use_cache=True):
+    key = _cache_key("retrieval", query, documents_text)
+    cached = _cached(key, use_cache)
+    if cached is not None:
+        return cached
+
+    messages = _retrieval_eval_messages(query, documents_text)
+    response = call_llm(get_friendli_client(), messages, model=EVALUATION_MODEL,
+                        response_format={"type": "json_object"})
+    evaluation = parse_evaluation(response.choices[0].message.content)
+    _store(key, evaluation, use_cache)
+    return evaluation
+
+def _judge_response(query, context, response_text, use_cache=True):
+    key = _cache_key("response", query, context, response_text)
+    cached = _cached(key, use_cache)
+    if cached is not None:
+        return cached
+
+    messages = _response_eval_messages(query, context, response_text)
+    response = call_llm(get_friendli_client(), messages, model=EVALUATION_MODEL,
+                        response_format={"type": "json_object"})
+    evaluation = parse_evaluation(response.choices[0].message.content)
+    _store(key, evaluation, use_cache)
+    return evaluation
+
+async def _judge_retrieval_async(query, documents_text, use_cache=True):
+    key = _cache_key("retrieval", query, documents_text)
+    cached = _cached(key, use_cache)
+    if cached is not None:
+        return cached
+
+    messages = _retrieval_eval_messages(query, documents_text)
+    response = await call_llm_async(get_shared_async_client(), messages, model=EVALUATION_MODEL,
+                                    response_format={"type": "json_object"})
+    evaluation = parse_evaluation(response.choices[0].message.content)
+    _store(key, evaluation, use_cache)
+    return evaluation
+
+async def _judge_response_async(query, context, response_text, use_cache=True):
+    key = _cache_key("response", query, context, response_text)
+    cached = _cached(key, use_cache)
+    if cached is not None:
+        return cached
+
+    messages = _response_eval_messages(query, context, response_text)
+    response = await call_llm_async(get_shared_async_client(), messages, model=EVALUATION_MODEL,
+                                    response_format={"type": "json_object"})
+    evaluation = parse_evaluation(response.choices[0].message.content)
+    _store(key, evaluation, use_cache)
+    return evaluation
+
+def _submit(executor, fn, *args):
+    """Submit work to a thread pool, carrying the caller's context (and Opik span) along."""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args)
+
+@opik.track
+def evaluate_retrieval_quality(query, retrieved_docs, use_cache=True):
+    """
+    Evaluate the quality of retrieved documents.
+
+    Args:
+        query (str): User query
+        retrieved_docs (list): Retrieved documents
+        use_cache (bool): Whether to reuse a cached judgment for identical inputs
+
+    Returns:
+        dict: Evaluation with relevance_score, most_relevant, irrelevant_docs and missing_info
+    """
+    return _judge_retrieval(query, prepare_context_for_llm(retrieved_docs), use_cache)
+
+@opik.track
+def evaluate_response_quality(query, context, response, use_cache=True):
+    """
+    Evaluate the quality of the generated response.
+
+    Args:
+        query (str): User query
+        context (str): Context provided to the LLM
+        response (str): Generated response
+        use_cache (bool): Whether to reuse a cached judgment for identical inputs
+
+    Returns:
+        dict: Evaluation with response_quality, accuracy, hallucination and improvements
+    """
+    return _judge_response(query, context, response, use_cache)
 
 @opik.track(name="evaluate-rag-system")
-def evaluate_rag_system(collection, query, response, context, formatted_results):
+def evaluate_rag_system(collection, query, response, context, formatted_results, use_cache=True):
     """
     Perform a complete evaluation of the RAG system for a given query.
-    
+
+    The retrieval and response judgments are independent, so they run in parallel.
+
     Args:
         collection: Weaviate collection
         query (str): User query
         response (str): Generated response
         context (str): Context provided to the LLM
         formatted_results (list): Formatted search results
-        
+        use_cache (bool): Whether to reuse cached judgments for identical inputs
+
     Returns:
         dict: Evaluation results
     """
-    # Evaluate retrieval quality
-    retrieval_eval = evaluate_retrieval_quality(query, formatted_results)
-    
-    # Evaluate response quality
-    response_eval = evaluate_response_quality(query, context, response)
-    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        retrieval_future = _submit(executor, evaluate_retrieval_quality, query, formatted_results, use_cache)
+        response_future = _submit(executor, evaluate_response_quality, query, context, response, use_cache)
+        retrieval_eval = retrieval_future.result()
+        response_eval = response_future.result()
+
     return {
         "query": query,
         "retrieval_evaluation": retrieval_eval,
         "response_evaluation": response_eval
-    }
\ No newline at end of file
+    }
+
+def _record_documents_text(record):
+    """Documents shown to the retrieval judge for a batch record."""
+    if record.get("formatted_results") is not None:
+        return prepare_context_for_llm(record["formatted_results"])
+    return record["context"]
+
+@opik.track(name="evaluate-batch")
+def evaluate_batch(records, max_concurrency=None, use_cache=True):
+    """
+    Evaluate many RAG results with bounded concurrency.
+
+    Args:
+        records (list): Dicts with "query", "context" and "response", and
+            optionally "formatted_results" for the retrieval judgment
+        max_concurrency (int, optional): Maximum LLM calls in flight
+        use_cache (bool): Whether to reuse cached judgments for identical inputs
+
+    Returns:
+        list: Evaluation results, in the same order as records
+    """
+    max_concurrency = max_concurrency or get_config()["evaluation_max_concurrency"]
+    logger.info(f"Evaluating {len(records)} records with concurrency {max_concurrency}")
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            (
+                _submit(executor, _judge_retrieval, record["query"], _record_documents_text(record), use_cache),
+                _submit(executor, _judge_response, record["query"], record["context"], record["response"], use_cache)
+            )
+            for record in records
+        ]
+
+        return [
+            {
+                "query": record["query"],
+                "retrieval_evaluation": retrieval_future.result(),
+                "response_evaluation": response_future.result()
+            }
+            for record, (retrieval_future, response_future) in zip(records, futures)
+        ]
+
+@opik.track
+async def evaluate_retrieval_quality_async(query, retrieved_docs, use_cache=True):
+    """
+    Evaluate the quality of retrieved documents with the async LLM client.
+
+    Args:
+        query (str): User query
+        retrieved_docs (list): Retrieved documents
+        use_cache (bool): Whether to reuse a cached judgment for identical inputs
+
+    Returns:
+        dict: Evaluation with relevance_score, most_relevant, irrelevant_docs and missing_info
+    """
+    return await _judge_retrieval_async(query, prepare_context_for_llm(retrieved_docs), use_cache)
+
+@opik.track
+async def evaluate_response_quality_async(query, context, response, use_cache=True):
+    """
+    Evaluate the quality of the generated response with the async LLM client.
+
+    Args:
+        query (str): User query
+        context (str): Context provided to the LLM
+        response (str): Generated response
+        use_cache (bool): Whether to reuse a cached judgment for identical inputs
+
+    Returns:
+        dict: Evaluation with response_quality, accuracy, hallucination and improvements
+    """
+    return await _judge_response_async(query, context, response, use_cache)
+
+@opik.track(name="evaluate-rag-system-async")
+async def evaluate_rag_system_async(collection, query, response, context, formatted_results, use_cache=True):
+    """
+    Perform a complete evaluation of the RAG system with the async LLM client.
+
+    Args:
+        collection: Weaviate collection
+        query (str): User query
+        response (str): Generated response
+        context (str): Context provided to the LLM
+        formatted_results (list): Formatted search results
+        use_cache (bool): Whether to reuse cached judgments for identical inputs
+
+    Returns:
+        dict: Evaluation results
+    """
+    retrieval_eval, response_eval = await asyncio.gather(
+        evaluate_retrieval_quality_async(query, formatted_results, use_cache),
+        evaluate_response_quality_async(query, context, response, use_cache)
+    )
+
+    return {
+        "query": query,
+        "retrieval_evaluation": retrieval_eval,
+        "response_evaluation": response_eval
+    }
+
+@opik.track(name="evaluate-batch-async")
+async def evaluate_batch_async(records, max_concurrency=None, use_cache=True):
+    """
+    Evaluate many RAG results with the async LLM client and bounded concurrency.
+
+    Args:
+        records (list): Dicts with "query", "context" and "response", and
+            optionally "formatted_results" for the retrieval judgment
+        max_concurrency (int, optional): Maximum LLM calls in flight
+        use_cache (bool): Whether to reuse cached judgments for identical inputs
+
+    Returns:
+        list: Evaluation results, in the same order as records
+    """
+    max_concurrency = max_concurrency or get_config()["evaluation_max_concurrency"]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+
+    async def evaluate_record(record):
+        retrieval_eval, response_eval = await asyncio.gather(
+            bounded(_judge_retrieval_async(record["query"], _record_documents_text(record), use_cache)),
+            bounded(_judge_response_async(record["query"], record["context"], record["response"], use_cache))
+        )
+        return {
+            "query": record["query"],
+            "retrieval_evaluation": retrieval_eval,
+            "response_evaluation": response_eval
+        }
+
+    return await asyncio.gather(*(evaluate_record(record) for record in records))
@@ -0,0 +1,138 @@
+"""
+Metadata filters for retrieval.
+
+Filters are passed around as a plain dict, so they can come straight from the
+UI or a JSON request and be part of cache keys:
+
+    {"date_from": "1776", "date_to": "1776-12", "document_types": ["letter"],
+     "authors": ["Abigail Adams"], "recipient": "John Adams"}
+
+build_filters() compiles them into a Weaviate filter that is evaluated by the
+database together with the vector search, instead of over-fetching and
+filtering results in Python.
+"""
+
+import json
+import calendar
+import logging
+from datetime import date, datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ("date_from", "date_to", "document_types", "authors", "recipient")
+
+def parse_date(value, end=False):
+    """
+    Parse a year, year-month or full date into a UTC datetime.
+
+    Args:
+        value: "1776", "1776-03", "1776-03-31", a date or a datetime
+        end (bool): Return the last moment of the period instead of the first,
+            so "1776" as an upper bound includes all of 1776
+
+    Returns:
+        datetime: Timezone-aware datetime
+    """
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, date):
+        value = value.isoformat()
+
+    parts = str(value).strip()[:10].split("-")
+    try:
+        year = int(parts[0])
+        month = int(parts[1]) if len(parts) > 1 else (12 if end else 1)
+        if len(parts) > 2:
+            day = int(parts[2])
+        else:
+            day = calendar.monthrange(year, month)[1] if end else 1
+        if end:
+            return datetime(year, month, day, 23, 59, 59, tzinfo=timezone.utc)
+        return datetime(year, month, day, tzinfo=timezone.utc)
+    except (ValueError, IndexError):
+        raise ValueError(f"Invalid date filter {value!r}; use YYYY, YYYY-MM or YYYY-MM-DD")
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    return sorted({str(item).strip() for item in value if str(item).strip()})
+
+def normalize_filters(filters):
+    """
+    Drop empty values and put list values in a canonical order.
+
+    Args:
+        filters (dict): Filter arguments, or None
+
+    Returns:
+        dict: Normalized filters, or None if nothing is filtered
+    """
+    if not filters:
+        return None
+
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter arguments: {', '.join(sorted(unknown))}")
+
+    normalized = {}
+    for key in ("date_from", "date_to", "recipient"):
+        value = filters.get(key)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        if value is not None and str(value).strip():
+            normalized[key] = str(value).strip()
+    for key in ("document_types", "authors"):
+        values = _as_list(filters.get(key))
+        if values:
+            normalized[key] = values
+
+    return normalized or None
+
+def filters_key(filters):
+    """
+    Get a hashable key for cache lookups.
+
+    Returns:
+        str: Canonical JSON of the normalized filters, or None if unfiltered
+    """
+    normalized = normalize_filters(filters)
+    return json.dumps(normalized, sort_keys=True) if normalized else None
+
+def build_filters(filters):
+    """
+    Compile filter arguments into a Weaviate filter.
+
+    Date bounds are inclusive. Several document types or authors match any of
+    them; the different kinds of filter must all match. Document types,
+    authors and the recipient are compared as whole, case-sensitive values:
+    the schema gives these properties field tokenization, so Weaviate and
+    the local index return the same documents.
+
+    Args:
+        filters (dict): Filter arguments (see FILTER_KEYS), or None
+
+    Returns:
+        Weaviate filter, or None if nothing is filtered
+    """
+    normalized = normalize_filters(filters)
+    if not normalized:
+        return None
+
+    from weaviate.classes.query import Filter
+
+    conditions = []
+    if "date_from" in normalized:
+        conditions.append(Filter.by_property("date").greater_or_equal(parse_date(normalized["date_from"])))
+    if "date_to" in normalized:
+        conditions.append(Filter.by_property("date").less_or_equal(parse_date(normalized["date_to"], end=True)))
+    if "document_types" in normalized:
+        conditions.append(Filter.by_property("document_type").contains_any(normalized["document_types"]))
+    if "authors" in normalized:
+        conditions.append(Filter.by_property("authors").contains_any(normalized["authors"]))
+    if "recipient" in normalized:
+        conditions.append(Filter.by_property("recipient").equal(normalized["recipient"]))
+
+    logger.debug(f"Compiled metadata filters: {normalized}")
+    return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
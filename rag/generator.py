@@ -2,49 +2,175 @@
 Response generation functions for the RAG system.
 """
 
-import os
+import time
 import logging
-from openai import OpenAI
 from utils.opik_tracking import opik
+from .llm_client import get_shared_client, get_shared_async_client
+from .rate_limiter import get_rate_limiter, estimate_tokens
+from .metrics import observe_llm_call, exit_status
 
 logger = logging.getLogger(__name__)
 
 # Set up FriendliAI client
 def get_friendli_client():
-    """Get FriendliAI client."""
-    friendli_token = os.getenv('FRIENDLI_TOKEN')
-    if not friendli_token:
-        raise ValueError("FRIENDLI_TOKEN environment variable is not set")
-    
-    return OpenAI(
-        base_url="https://api.friendli.ai/serverless/v1",
-        api_key=friendli_token
-    )
+    """Get the shared, keep-alive FriendliAI client."""
+    return get_shared_client()
 
 @opik.track
-def call_llm(client, messages, model="meta-llama-3.3-70b-instruct"):
+def call_llm(client, messages, model="meta-llama-3.3-70b-instruct", **kwargs):
     """
     Call the LLM through FriendliAI.
     
+    The call is paced, retried and concurrency-limited by the shared rate
+    limiter (see rag.rate_limiter).
+    
+    Args:
+        client: OpenAI-compatible client
+        messages (list): Messages for the chat completion
+        model (str): Model identifier
+        **kwargs: Extra chat completion parameters, e.g. response_format
+        
+    Returns:
+        response: LLM response
+    """
+    limiter = get_rate_limiter()
+    start = time.perf_counter()
+    try:
+        response = limiter.call(
+            lambda: client.chat.completions.create(model=model, messages=messages, **kwargs),
+            tokens=estimate_tokens(messages, kwargs.get("max_tokens"))
+        )
+        observe_llm_call(model, False, time.perf_counter() - start)
+        return response
+    except Exception as e:
+        logger.error(f"Error calling LLM: {str(e)}")
+        observe_llm_call(model, False, time.perf_counter() - start, status="error")
+        raise
+
+@opik.track
+def call_llm_stream(client, messages, model="meta-llama-3.3-70b-instruct"):
+    """
+    Call the LLM through FriendliAI and stream the answer.
+    
     Args:
         client: OpenAI-compatible client
         messages (list): Messages for the chat completion
         model (str): Model identifier
         
+    Yields:
+        str: Pieces of the response text as they arrive
+    """
+    limiter = get_rate_limiter()
+    start = time.perf_counter()
+    try:
+        # The stream holds its concurrency slot until it has been read
+        stream = limiter.call(
+            lambda: client.chat.completions.create(model=model, messages=messages, stream=True),
+            tokens=estimate_tokens(messages),
+            keep_slot=True
+        )
+    except Exception as e:
+        logger.error(f"Error streaming from LLM: {str(e)}")
+        observe_llm_call(model, True, time.perf_counter() - start, status="error")
+        raise
+    
+    time_to_first_token = None
+    exc_type = None
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error(f"Error streaming from LLM: {str(e)}")
+        exc_type = type(e)
+        raise
+    except BaseException as e:
+        # The consumer stopped reading (GeneratorExit) or was cancelled
+        exc_type = type(e)
+        raise
+    finally:
+        limiter.release()
+        observe_llm_call(model, True, time.perf_counter() - start, status=exit_status(exc_type),
+                         time_to_first_token=time_to_first_token)
+
+@opik.track
+async def call_llm_async(client, messages, model="meta-llama-3.3-70b-instruct", **kwargs):
+    """
+    Call the LLM through FriendliAI with the async client.
+    
+    Args:
+        client: Async OpenAI-compatible client
+        messages (list): Messages for the chat completion
+        model (str): Model identifier
+        **kwargs: Extra chat completion parameters, e.g. response_format
+        
     Returns:
         response: LLM response
     """
+    limiter = get_rate_limiter()
+    start = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages
+        response = await limiter.call_async(
+            lambda: client.chat.completions.create(model=model, messages=messages, **kwargs),
+            tokens=estimate_tokens(messages, kwargs.get("max_tokens"))
         )
+        observe_llm_call(model, False, time.perf_counter() - start)
         return response
     except Exception as e:
         logger.error(f"Error calling LLM: {str(e)}")
+        observe_llm_call(model, False, time.perf_counter() - start, status="error")
         raise
 
 @opik.track
+async def call_llm_stream_async(client, messages, model="meta-llama-3.3-70b-instruct"):
+    """
+    Call the LLM through FriendliAI with the async client and stream the answer.
+    
+    Args:
+        client: Async OpenAI-compatible client
+        messages (list): Messages for the chat completion
+        model (str): Model identifier
+        
+    Yields:
+        str: Pieces of the response text as they arrive
+    """
+    limiter = get_rate_limiter()
+    start = time.perf_counter()
+    try:
+        stream = await limiter.call_async(
+            lambda: client.chat.completions.create(model=model, messages=messages, stream=True),
+            tokens=estimate_tokens(messages),
+            keep_slot=True
+        )
+    except Exception as e:
+        logger.error(f"Error streaming from LLM: {str(e)}")
+        observe_llm_call(model, True, time.perf_counter() - start, status="error")
+        raise
+    
+    time_to_first_token = None
+    exc_type = None
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error(f"Error streaming from LLM: {str(e)}")
+        exc_type = type(e)
+        raise
+    except BaseException as e:
+        # The consumer stopped reading (GeneratorExit) or was cancelled
+        exc_type = type(e)
+        raise
+    finally:
+        limiter.release()
+        observe_llm_call(model, True, time.perf_counter() - start, status=exit_status(exc_type),
+                         time_to_first_token=time_to_first_token)
+
+@opik.track(trivial=True)
 def get_system_prompt(mode="historian"):
     """
     Get system prompt based on response mode.
@@ -86,10 +212,9 @@ def get_system_prompt(mode="historian"):
         provided historical documents as reference.
         """
 
-@opik.track
-def generate_response(query, context, mode="historian"):
+def build_messages(query, context, mode="historian"):
     """
-    Generate a response using the LLM based on the retrieved context.
+    Build the chat messages for answering a query from retrieved context.
     
     Args:
         query (str): User query
@@ -97,19 +222,93 @@ def generate_response(query, context, mode="historian"):
         mode (str): Response mode
         
     Returns:
-        str: Generated response
+        list: Messages for the chat completion
     """
-    client = get_friendli_client()
     system_message = get_system_prompt(mode)
     
-    # Create messages for the LLM
-    messages = [
+    return [
         {"role": "system", "content": system_message},
         {"role": "user", "content": f"Here are some relevant historical documents:\n\n{context}\n\nBased on these documents, please answer: {query}"}
     ]
+
+@opik.track
+def generate_response(query, context, mode="historian"):
+    """
+    Generate a response using the LLM based on the retrieved context.
+    
+    Args:
+        query (str): User query
+        context (str): Retrieved context
+        mode (str): Response mode
+        
+    Returns:
+        str: Generated response
+    """
+    client = get_friendli_client()
+    messages = build_messages(query, context, mode)
     
     # Call the LLM
     logger.info(f"Generating response in '{mode}' mode")
     response = call_llm(client, messages)
     
-    return response.choices[0].message.content
\ No newline at end of file
+    return response.choices[0].message.content
+
+@opik.track
+def generate_response_stream(query, context, mode="historian"):
+    """
+    Generate a response using the LLM and stream it as it is produced.
+    
+    Args:
+        query (str): User query
+        context (str): Retrieved context
+        mode (str): Response mode
+        
+    Yields:
+        str: Pieces of the generated response
+    """
+    client = get_friendli_client()
+    messages = build_messages(query, context, mode)
+    
+    logger.info(f"Streaming response in '{mode}' mode")
+    yield from call_llm_stream(client, messages)
+
+@opik.track
+async def generate_response_async(query, context, mode="historian"):
+    """
+    Generate a response using the async LLM client.
+    
+    Args:
+        query (str): User query
+        context (str): Retrieved context
+        mode (str): Response mode
+        
+    Returns:
+        str: Generated response
+    """
+    client = get_shared_async_client()
+    messages = build_messages(query, context, mode)
+    
+    logger.info(f"Generating response in '{mode}' mode")
+    response = await call_llm_async(client, messages)
+    
+    return response.choices[0].message.content
+
+@opik.track
+async def generate_response_stream_async(query, context, mode="historian"):
+    """
+    Generate a response using the async LLM client and stream it.
+    
+    Args:
+        query (str): User query
+        context (str): Retrieved context
+        mode (str): Response mode
+        
+    Yields:
+        str: Pieces of the generated response
+    """
+    client = get_shared_async_client()
+    messages = build_messages(query, context, mode)
+    
+    logger.info(f"Streaming response in '{mode}' mode")
+    async for piece in call_llm_stream_async(client, messages):
+        yield piece
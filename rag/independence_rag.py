@@ -2,16 +2,23 @@
 Main RAG pipeline for the Voices of Independence project.
 """
 
+import time
 import logging
-from utils.opik_tracking import opik
-from .retriever import retrieve_context
-from .generator import generate_response
-from .evaluator import evaluate_rag_system
+from utils.opik_tracking import opik, log_metrics
+from .retriever import retrieve_context, retrieve_context_async
+from .generator import (
+    generate_response,
+    generate_response_stream,
+    generate_response_async,
+    generate_response_stream_async
+)
+from .evaluator import evaluate_rag_system, evaluate_rag_system_async
+from .metrics import observe_stages
 
 logger = logging.getLogger(__name__)
 
 @opik.track(name="independence-rag")
-def independence_rag(collection, query, mode="historian", limit=5, evaluate=False):
+def independence_rag(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
     """
     Complete RAG pipeline for answering questions about American Independence.
     
@@ -21,19 +28,23 @@ def independence_rag(collection, query, mode="historian", limit=5, evaluate=Fals
         mode (str): Response mode (historian, founding_father, time_traveler)
         limit (int): Maximum number of documents to retrieve
         evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
         
     Returns:
         dict: RAG results including query, response, and sources
     """
     logger.info(f"Processing query: '{query}' in mode: '{mode}'")
+    start_time = time.perf_counter()
     
     # Retrieve context
-    retrieved_info = retrieve_context(collection, query, limit=limit)
+    retrieved_info = retrieve_context(collection, query, limit=limit, filters=filters, mode=mode)
     context = retrieved_info["context"]
     formatted_results = retrieved_info["formatted_results"]
     
     # Generate response
+    generation_start = time.perf_counter()
     response = generate_response(query, context, mode=mode)
+    stages = dict(retrieved_info["timings"], generation=time.perf_counter() - generation_start)
     
     # Prepare result
     result = {
@@ -47,6 +58,7 @@ def independence_rag(collection, query, mode="historian", limit=5, evaluate=Fals
     # Evaluate if requested
     if evaluate:
         logger.info("Evaluating RAG response")
+        evaluation_start = time.perf_counter()
         evaluation = evaluate_rag_system(
             collection, 
             query, 
@@ -55,5 +67,238 @@ def independence_rag(collection, query, mode="historian", limit=5, evaluate=Fals
             formatted_results
         )
         result["evaluation"] = evaluation
+        stages["evaluation"] = time.perf_counter() - evaluation_start
     
-    return result
\ No newline at end of file
+    result["metrics"] = {
+        "total_latency": time.perf_counter() - start_time,
+        "context_tokens": retrieved_info["context_stats"]["prompt_tokens"],
+        "context_tokens_saved": retrieved_info["context_stats"]["tokens_saved"]
+    }
+    log_metrics(**result["metrics"])
+    stages["total"] = result["metrics"]["total_latency"]
+    observe_stages(stages, mode, limit)
+    
+    return result
+
+@opik.track(name="independence-rag-stream")
+def independence_rag_stream(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Streaming RAG pipeline for answering questions about American Independence.
+    
+    Sources are emitted as soon as retrieval completes, followed by the response
+    tokens as the LLM produces them. The collection is no longer used once the
+    sources event has been yielded.
+    
+    Args:
+        collection: Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+        
+    Yields:
+        dict: Events of type "sources" (with the source titles), "token" (with a
+        piece of response text) and finally "done" (with the complete result,
+        including time-to-first-token and total latency metrics)
+    """
+    logger.info(f"Streaming query: '{query}' in mode: '{mode}'")
+    start_time = time.perf_counter()
+    
+    # Retrieve context
+    retrieved_info = retrieve_context(collection, query, limit=limit, filters=filters, mode=mode)
+    context = retrieved_info["context"]
+    formatted_results = retrieved_info["formatted_results"]
+    sources = [doc["title"] for doc in formatted_results]
+    retrieval_time = time.perf_counter() - start_time
+    stages = dict(retrieved_info["timings"])
+    
+    yield {"type": "sources", "sources": sources}
+    
+    # Stream the response
+    pieces = []
+    time_to_first_token = None
+    generation_start = time.perf_counter()
+    for piece in generate_response_stream(query, context, mode=mode):
+        if time_to_first_token is None:
+            time_to_first_token = time.perf_counter() - start_time
+        pieces.append(piece)
+        yield {"type": "token", "text": piece}
+    
+    response = "".join(pieces)
+    generation_done = time.perf_counter()
+    stages["generation"] = generation_done - generation_start
+    stages["time_to_first_token"] = time_to_first_token
+    
+    result = {
+        "query": query,
+        "response": response,
+        "context": context,
+        "mode": mode,
+        "sources": sources
+    }
+    
+    if evaluate:
+        logger.info("Evaluating RAG response")
+        evaluation_start = time.perf_counter()
+        result["evaluation"] = evaluate_rag_system(
+            collection,
+            query,
+            response,
+            context,
+            formatted_results
+        )
+        stages["evaluation"] = time.perf_counter() - evaluation_start
+    
+    result["metrics"] = {
+        "retrieval_latency": retrieval_time,
+        "time_to_first_token": time_to_first_token,
+        "generation_latency": generation_done - start_time,
+        "total_latency": time.perf_counter() - start_time,
+        "context_tokens": retrieved_info["context_stats"]["prompt_tokens"],
+        "context_tokens_saved": retrieved_info["context_stats"]["tokens_saved"]
+    }
+    log_metrics(**result["metrics"])
+    stages["total"] = result["metrics"]["total_latency"]
+    observe_stages(stages, mode, limit)
+    
+    yield {"type": "done", "result": result}
+
+@opik.track(name="independence-rag-async")
+async def independence_rag_async(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Asyncio RAG pipeline for answering questions about American Independence.
+    
+    Uses the async Weaviate and LLM clients, so many queries can wait on I/O
+    concurrently in one process.
+    
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+        
+    Returns:
+        dict: RAG results including query, response, and sources
+    """
+    logger.info(f"Processing query: '{query}' in mode: '{mode}'")
+    start_time = time.perf_counter()
+    
+    retrieved_info = await retrieve_context_async(collection, query, limit=limit, filters=filters, mode=mode)
+    context = retrieved_info["context"]
+    formatted_results = retrieved_info["formatted_results"]
+    
+    generation_start = time.perf_counter()
+    response = await generate_response_async(query, context, mode=mode)
+    stages = dict(retrieved_info["timings"], generation=time.perf_counter() - generation_start)
+    
+    result = {
+        "query": query,
+        "response": response,
+        "context": context,
+        "mode": mode,
+        "sources": [doc["title"] for doc in formatted_results]
+    }
+    
+    if evaluate:
+        logger.info("Evaluating RAG response")
+        evaluation_start = time.perf_counter()
+        result["evaluation"] = await evaluate_rag_system_async(
+            collection,
+            query,
+            response,
+            context,
+            formatted_results
+        )
+        stages["evaluation"] = time.perf_counter() - evaluation_start
+    
+    result["metrics"] = {
+        "total_latency": time.perf_counter() - start_time,
+        "context_tokens": retrieved_info["context_stats"]["prompt_tokens"],
+        "context_tokens_saved": retrieved_info["context_stats"]["tokens_saved"]
+    }
+    log_metrics(**result["metrics"])
+    stages["total"] = result["metrics"]["total_latency"]
+    observe_stages(stages, mode, limit)
+    
+    return result
+
+@opik.track(name="independence-rag-stream-async")
+async def independence_rag_stream_async(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Asyncio streaming RAG pipeline.
+    
+    Emits the same events as independence_rag_stream().
+    
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+        
+    Yields:
+        dict: "sources", "token" and "done" events
+    """
+    logger.info(f"Streaming query: '{query}' in mode: '{mode}'")
+    start_time = time.perf_counter()
+    
+    retrieved_info = await retrieve_context_async(collection, query, limit=limit, filters=filters, mode=mode)
+    context = retrieved_info["context"]
+    formatted_results = retrieved_info["formatted_results"]
+    sources = [doc["title"] for doc in formatted_results]
+    retrieval_time = time.perf_counter() - start_time
+    stages = dict(retrieved_info["timings"])
+    
+    yield {"type": "sources", "sources": sources}
+    
+    pieces = []
+    time_to_first_token = None
+    generation_start = time.perf_counter()
+    async for piece in generate_response_stream_async(query, context, mode=mode):
+        if time_to_first_token is None:
+            time_to_first_token = time.perf_counter() - start_time
+        pieces.append(piece)
+        yield {"type": "token", "text": piece}
+    
+    response = "".join(pieces)
+    generation_done = time.perf_counter()
+    stages["generation"] = generation_done - generation_start
+    stages["time_to_first_token"] = time_to_first_token
+    
+    result = {
+        "query": query,
+        "response": response,
+        "context": context,
+        "mode": mode,
+        "sources": sources
+    }
+    
+    if evaluate:
+        logger.info("Evaluating RAG response")
+        evaluation_start = time.perf_counter()
+        result["evaluation"] = await evaluate_rag_system_async(
+            collection,
+            query,
+            response,
+            context,
+            formatted_results
+        )
+        stages["evaluation"] = time.perf_counter() - evaluation_start
+    
+    result["metrics"] = {
+        "retrieval_latency": retrieval_time,
+        "time_to_first_token": time_to_first_token,
+        "generation_latency": generation_done - start_time,
+        "total_latency": time.perf_counter() - start_time,
+        "context_tokens": retrieved_info["context_stats"]["prompt_tokens"],
+        "context_tokens_saved": retrieved_info["context_stats"]["tokens_saved"]
+    }
+    log_metrics(**result["metrics"])
+    stages["total"] = result["metrics"]["total_latency"]
+    observe_stages(stages, mode, limit)
+    
+    yield {"type": "done", "result": result}
@@ -0,0 +1,161 @@
+"""
+Shared FriendliAI client layer.
+
+Generation and evaluation reuse one OpenAI-compatible client per process (and
+one async client per event loop) so that requests share pooled keep-alive
+connections instead of paying a new TLS handshake on every call. The clients
+do not retry by themselves; rag.rate_limiter retries on their behalf.
+"""
+
+import os
+import atexit
+import asyncio
+import logging
+import threading
+from utils.config import get_config
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = {}
+_async_clients_lock = threading.Lock()
+
+def get_client_settings():
+    """
+    Get connection settings for the FriendliAI client.
+
+    Returns:
+        dict: Base URL, API key, pool limits and timeouts
+    """
+    friendli_token = os.getenv('FRIENDLI_TOKEN')
+    if not friendli_token:
+        raise ValueError("FRIENDLI_TOKEN environment variable is not set")
+
+    config = get_config()
+    return {
+        "base_url": config["friendli_base_url"],
+        "api_key": friendli_token,
+        "max_connections": config["llm_max_connections"],
+        "max_keepalive_connections": config["llm_max_keepalive_connections"],
+        "keepalive_expiry": config["llm_keepalive_expiry"],
+        "timeout": config["llm_timeout"],
+        "connect_timeout": config["llm_connect_timeout"]
+    }
+
+def _http_options(settings):
+    """Build the httpx pool limits and timeouts shared by sync and async clients."""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=settings["max_connections"],
+        max_keepalive_connections=settings["max_keepalive_connections"],
+        keepalive_expiry=settings["keepalive_expiry"]
+    )
+    timeout = httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"])
+    return {"limits": limits, "timeout": timeout}
+
+def create_friendli_client(settings=None):
+    """
+    Create a new FriendliAI client with a pooled keep-alive HTTP transport.
+
+    Args:
+        settings (dict, optional): Connection settings, see get_client_settings()
+
+    Returns:
+        OpenAI: OpenAI-compatible client
+    """
+    import httpx
+    from openai import OpenAI
+
+    settings = settings or get_client_settings()
+    options = _http_options(settings)
+
+    return OpenAI(
+        base_url=settings["base_url"],
+        api_key=settings["api_key"],
+        timeout=options["timeout"],
+        max_retries=0,
+        http_client=httpx.Client(**options)
+    )
+
+def get_shared_client():
+    """
+    Get the process-wide FriendliAI client, creating it on first use.
+
+    The client is safe to share between threads.
+
+    Returns:
+        OpenAI: Shared OpenAI-compatible client
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_friendli_client()
+                logger.info("Created shared FriendliAI client")
+
+    return _client
+
+def get_shared_async_client():
+    """
+    Get the FriendliAI async client for the running event loop.
+
+    Async HTTP connections are bound to the loop that opened them, so one
+    client is kept per event loop. Await close_shared_async_client() before
+    the loop ends; clients of loops closed without it are dropped unclosed.
+
+    Returns:
+        AsyncOpenAI: Shared async OpenAI-compatible client
+    """
+    loop = asyncio.get_running_loop()
+
+    with _async_clients_lock:
+        # Drop clients whose loops have gone away; they can no longer be closed
+        for stale_loop in [l for l in _async_clients if l.is_closed()]:
+            del _async_clients[stale_loop]
+
+        client = _async_clients.get(loop)
+        if client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            settings = get_client_settings()
+            options = _http_options(settings)
+            client = AsyncOpenAI(
+                base_url=settings["base_url"],
+                api_key=settings["api_key"],
+                timeout=options["timeout"],
+                max_retries=0,
+                http_client=httpx.AsyncClient(**options)
+            )
+            _async_clients[loop] = client
+            logger.info("Created shared async FriendliAI client")
+
+    return client
+
+async def close_shared_async_client():
+    """Close the async client of the running event loop, if one was created."""
+    with _async_clients_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        # Also closes the httpx.AsyncClient and its pooled connections
+        await client.close()
+        logger.info("Closed shared async FriendliAI client")
+
+def close_shared_clients():
+    """
+    Close the shared sync client.
+
+    Async clients must be closed on their own event loop, with
+    close_shared_async_client().
+    """
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+atexit.register(close_shared_clients)
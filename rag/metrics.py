@@ -0,0 +1,156 @@
+"""
+Latency and request metrics of the RAG pipeline.
+
+Stage durations are recorded by independence_rag() and its variants, LLM call
+durations by rag.generator, and whole requests by the web entry points, in
+the process-wide registry of utils.metrics. Stages are labelled with the
+response mode and retrieval limit, requests also with whether they were
+answered from the semantic cache ("hit"), by a coalesced identical request
+("coalesced") or by the pipeline ("miss").
+"""
+
+import time
+from utils.config import get_config
+from utils.metrics import get_registry
+
+_enabled = get_config()["metrics_enabled"]
+_registry = get_registry()
+
+STAGE_SECONDS = _registry.histogram(
+    "rag_stage_duration_seconds",
+    "Duration of one stage of the RAG pipeline",
+    ("stage", "mode", "limit")
+)
+REQUEST_SECONDS = _registry.histogram(
+    "rag_request_duration_seconds",
+    "Duration of RAG requests at the entry point, including cache lookups",
+    ("entry", "mode", "limit", "cache")
+)
+REQUESTS = _registry.counter(
+    "rag_requests_total",
+    "RAG requests by outcome",
+    ("entry", "mode", "limit", "cache", "status")
+)
+IN_FLIGHT = _registry.gauge(
+    "rag_requests_in_flight",
+    "RAG requests being answered",
+    ("entry",)
+)
+LLM_SECONDS = _registry.histogram(
+    "llm_request_duration_seconds",
+    "Duration of LLM calls, including rate limiter waits and retries",
+    ("model", "stream", "status")
+)
+LLM_FIRST_TOKEN_SECONDS = _registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from starting a streaming LLM call to its first token",
+    ("model",)
+)
+
+def observe_stages(timings, mode, limit):
+    """
+    Record the durations of pipeline stages.
+
+    Args:
+        timings (dict): Stage name to seconds; None values are skipped
+        mode (str): Response mode
+        limit (int): Retrieval limit
+    """
+    if not _enabled:
+        return
+    for stage, seconds in timings.items():
+        if seconds is not None:
+            STAGE_SECONDS.observe(seconds, stage=stage, mode=mode, limit=limit)
+
+def observe_llm_call(model, stream, seconds, status="ok", time_to_first_token=None):
+    """
+    Record one LLM call.
+
+    Args:
+        model (str): Model identifier
+        stream (bool): Whether the answer was streamed
+        seconds (float): Duration until the answer was complete or the call failed
+        status (str): "ok", "error" or "cancelled"
+        time_to_first_token (float, optional): Seconds until the first streamed token
+    """
+    if not _enabled:
+        return
+    LLM_SECONDS.observe(seconds, model=model, stream="true" if stream else "false", status=status)
+    if time_to_first_token is not None:
+        LLM_FIRST_TOKEN_SECONDS.observe(time_to_first_token, model=model)
+
+def cache_status(result):
+    """How a RAG result was produced: "hit", "coalesced" or "miss"."""
+    if result.get("cache", {}).get("hit"):
+        return "hit"
+    if result.get("coalesced"):
+        return "coalesced"
+    return "miss"
+
+def exit_status(exc_type):
+    """Status label for a block left with exc_type: "ok", "error" or "cancelled"."""
+    if exc_type is None:
+        return "ok"
+    # GeneratorExit and asyncio.CancelledError: the client went away
+    return "error" if issubclass(exc_type, Exception) else "cancelled"
+
+class RequestMetrics:
+    """
+    Context manager recording one RAG request at an entry point.
+
+    Works in sync and async code, since it does not suspend. Call
+    set_result() with the RAG result to label the request with its cache
+    status; requests left without a result are labelled "none".
+    """
+
+    def __init__(self, entry, mode, limit):
+        self.entry = entry
+        self.mode = mode
+        self.limit = limit
+        self.cache = "none"
+        self._start = None
+
+    def set_result(self, result):
+        """Label the request with how result was produced."""
+        self.cache = cache_status(result)
+
+    def __enter__(self):
+        if _enabled:
+            IN_FLIGHT.inc(entry=self.entry)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if not _enabled:
+            return False
+        status = exit_status(exc_type)
+        IN_FLIGHT.dec(entry=self.entry)
+        if status == "ok":
+            REQUEST_SECONDS.observe(time.perf_counter() - self._start, entry=self.entry, mode=self.mode,
+                                    limit=self.limit, cache=self.cache)
+        REQUESTS.inc(entry=self.entry, mode=self.mode, limit=self.limit, cache=self.cache, status=status)
+        return False
+
+def track_request(entry, mode, limit):
+    """
+    Record a RAG request: requests in flight, duration and outcome.
+
+    Args:
+        entry (str): Entry point, e.g. "api" or "gradio-stream"
+        mode (str): Response mode
+        limit (int): Retrieval limit
+
+    Returns:
+        RequestMetrics: Context manager; call its set_result() with the result
+    """
+    return RequestMetrics(entry, mode, limit)
+
+def stage_summary():
+    """
+    Get estimated p50/p95/p99 seconds per stage over all modes and limits.
+
+    Returns:
+        dict: Stage name to count, p50, p95 and p99
+    """
+    stages = sorted({key[0] for key, _ in STAGE_SECONDS.samples()})
+    return {stage: STAGE_SECONDS.summary(stage=stage) for stage in stages}
@@ -0,0 +1,486 @@
+"""
+Rate limiting, retries and adaptive concurrency for FriendliAI calls.
+
+Every chat completion made by generation and evaluation goes through one
+process-wide LLMRateLimiter, which
+
+- paces requests with token buckets for requests per minute and tokens per
+  minute (estimated from the prompt, corrected with the reported usage);
+- retries 429, 5xx, connection errors and timeouts with jittered
+  exponential backoff, waiting for Retry-After when the server sends it;
+- caps the calls in flight with a limit that grows additively while calls
+  succeed at normal latency and shrinks multiplicatively on throttling,
+  server errors or rising latency.
+
+The limiter serves threads and asyncio tasks alike; stats() reports its
+queue depth, wait times and throttle events.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from utils.opik_tracking import log_metrics
+from utils.config import get_config
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    Reservations may overdraw the bucket; the caller then waits until the
+    debt has been refilled, which keeps waiting callers in arrival order.
+    Not thread-safe on its own; LLMRateLimiter holds its lock around it.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """
+        Take amount from the bucket.
+
+        Returns:
+            float: Seconds to wait before the reserved amount is available
+        """
+        self._refill()
+        self.level -= amount
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+    def refund(self, amount):
+        """Return amount to the bucket (negative to charge more)."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def available(self):
+        self._refill()
+        return self.level
+
+def estimate_tokens(messages, max_tokens=None):
+    """
+    Estimate the tokens a chat completion will use.
+
+    Args:
+        messages (list): Chat messages
+        max_tokens (int, optional): Completion limit of the request
+
+    Returns:
+        int: Prompt tokens plus the expected completion tokens
+    """
+    prompt = sum(count_tokens(message.get("content") or "") for message in messages)
+    return prompt + (max_tokens or get_config()["llm_expected_completion_tokens"])
+
+def _retry_after(error):
+    """Seconds the server asked us to wait, or None."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    """Whether a failed call may succeed if repeated."""
+    import openai
+
+    if isinstance(error, openai.APIConnectionError):  # includes timeouts
+        return True
+    return getattr(error, "status_code", None) in RETRY_STATUS_CODES
+
+class LLMRateLimiter:
+    """
+    Shared gate in front of every LLM call.
+
+    Args:
+        requests_per_minute (float, optional): Request rate limit; 0 or None disables it
+        tokens_per_minute (float, optional): Token rate limit; 0 or None disables it
+        max_concurrency (int): Upper (and initial) limit of calls in flight
+        min_concurrency (int): Lower limit of calls in flight
+        max_retries (int): Retries after the first attempt
+        backoff (float): Base of the exponential retry backoff in seconds
+        max_delay (float): Longest single wait between attempts, Retry-After included
+        latency_tolerance (float): Latency, as a multiple of the best recent
+            latency, above which the concurrency limit is lowered
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=16, min_concurrency=1,
+                 max_retries=4, backoff=0.5, max_delay=30.0, latency_tolerance=2.0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.latency_tolerance = latency_tolerance
+
+        self._lock = threading.Lock()
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._waiters = deque()
+        self._latency = None
+        self._baseline = None
+        self._last_decrease = 0.0
+        self._stats = {
+            "requests": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "connection_errors": 0,
+            "limit_decreases": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "retry_wait_total": 0.0
+        }
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Create a limiter from the llm_* settings."""
+        config = config or get_config()
+        return cls(
+            requests_per_minute=config["llm_requests_per_minute"],
+            tokens_per_minute=config["llm_tokens_per_minute"],
+            max_concurrency=config["llm_max_concurrency"],
+            min_concurrency=config["llm_min_concurrency"],
+            max_retries=config["llm_max_retries"],
+            backoff=config["llm_retry_backoff"],
+            max_delay=config["llm_retry_max_delay"],
+            latency_tolerance=config["llm_latency_tolerance"]
+        )
+
+    # Concurrency slots
+
+    def _dispatch(self):
+        """Hand free slots to waiters in arrival order (lock held)."""
+        while self._waiters and self._in_flight < max(int(self._limit), 1):
+            wake = self._waiters.popleft()
+            self._in_flight += 1
+            try:
+                wake()
+            except RuntimeError:
+                # The waiter's event loop has closed
+                self._in_flight -= 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def _reserve(self, tokens):
+        """Take one request and the estimated tokens from the buckets (lock held)."""
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = self.request_bucket.reserve(1)
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.reserve(tokens))
+        return wait
+
+    def _record_wait(self, waited):
+        with self._lock:
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+
+    def _acquire(self, tokens):
+        """Wait for a slot and for the rate limits; returns the seconds waited."""
+        start = time.perf_counter()
+        event = None
+        with self._lock:
+            if not self._waiters and self._in_flight < max(int(self._limit), 1):
+                self._in_flight += 1
+            else:
+                event = threading.Event()
+                self._waiters.append(event.set)
+        if event is not None:
+            event.wait()
+
+        with self._lock:
+            pause = self._reserve(tokens)
+        if pause:
+            time.sleep(pause)
+
+        waited = time.perf_counter() - start
+        self._record_wait(waited)
+        return waited
+
+    async def _acquire_async(self, tokens):
+        """Asyncio variant of _acquire()."""
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        future = None
+
+        with self._lock:
+            if not self._waiters and self._in_flight < max(int(self._limit), 1):
+                self._in_flight += 1
+            else:
+                future = loop.create_future()
+
+                def wake():
+                    loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+                self._waiters.append(wake)
+
+        if future is not None:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if wake in self._waiters:
+                        self._waiters.remove(wake)
+                        raise
+                # The slot was already handed to us
+                self._release()
+                raise
+
+        with self._lock:
+            pause = self._reserve(tokens)
+        if pause:
+            try:
+                await asyncio.sleep(pause)
+            except asyncio.CancelledError:
+                self._release()
+                raise
+
+        waited = time.perf_counter() - start
+        self._record_wait(waited)
+        return waited
+
+    # Feedback
+
+    def _decrease(self, factor):
+        """Lower the concurrency limit, at most once per typical call duration (lock held)."""
+        now = time.monotonic()
+        if now - self._last_decrease < (self._latency or 1.0):
+            return
+        self._limit = max(float(self.min_concurrency), self._limit * factor)
+        self._last_decrease = now
+        self._stats["limit_decreases"] += 1
+
+    def _on_success(self, latency, response, tokens):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["succeeded"] += 1
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            # The baseline follows the best recent latency but drifts up, so a
+            # lasting slowdown (e.g. longer answers) stops counting as congestion
+            self._baseline = self._latency if self._baseline is None else min(self._latency, self._baseline * 1.05)
+
+            if self._latency > self._baseline * self.latency_tolerance:
+                self._decrease(0.9)
+            else:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+
+            usage = getattr(response, "usage", None)
+            if self.token_bucket is not None and usage is not None and usage.total_tokens:
+                self.token_bucket.refund(tokens - usage.total_tokens)
+
+            self._dispatch()
+
+    def _on_error(self, error, attempt):
+        """
+        Record a failed attempt.
+
+        Returns:
+            float: Seconds to wait before retrying, or None to give up
+        """
+        import openai
+
+        status = getattr(error, "status_code", None)
+        retryable = is_retryable(error)
+
+        with self._lock:
+            self._stats["requests"] += 1
+            if status == 429:
+                self._stats["throttled"] += 1
+            elif status is not None and status >= 500:
+                self._stats["server_errors"] += 1
+            elif isinstance(error, openai.APIConnectionError):
+                self._stats["connection_errors"] += 1
+
+            if retryable:
+                self._decrease(0.5)
+            if not retryable or attempt >= self.max_retries:
+                self._stats["failed"] += 1
+                return None
+            self._stats["retries"] += 1
+
+        delay = _retry_after(error)
+        if delay is None:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+        delay = min(delay, self.max_delay)
+
+        with self._lock:
+            self._stats["retry_wait_total"] += delay
+        logger.warning(f"LLM call failed ({status or type(error).__name__}), "
+                       f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        return delay
+
+    def _log_call(self, waited, attempts):
+        """Attach the limiter's view of a call to the current trace span."""
+        with self._lock:
+            limit, queue_depth = max(int(self._limit), 1), len(self._waiters)
+        log_metrics(llm_wait_time=waited, llm_attempts=attempts, llm_concurrency_limit=limit,
+                    llm_queue_depth=queue_depth)
+
+    # Calls
+
+    def call(self, request, tokens=0, keep_slot=False):
+        """
+        Make a request under the limits, retrying transient failures.
+
+        Args:
+            request (callable): Makes one attempt and returns its response
+            tokens (int): Estimated tokens of the request
+            keep_slot (bool): Keep the concurrency slot after success; the
+                caller must then call release()
+
+        Returns:
+            Response of the first successful attempt
+        """
+        attempt = 0
+        waited = 0.0
+        while True:
+            waited += self._acquire(tokens)
+            start = time.perf_counter()
+            try:
+                response = request()
+            except Exception as e:
+                self._release()
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    self._log_call(waited, attempt + 1)
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            self._on_success(time.perf_counter() - start, response, tokens)
+            if not keep_slot:
+                self._release()
+            self._log_call(waited, attempt + 1)
+            return response
+
+    async def call_async(self, request, tokens=0, keep_slot=False):
+        """
+        Asyncio variant of call().
+
+        Args:
+            request (callable): Returns an awaitable making one attempt
+            tokens (int): Estimated tokens of the request
+            keep_slot (bool): Keep the concurrency slot after success
+
+        Returns:
+            Response of the first successful attempt
+        """
+        attempt = 0
+        waited = 0.0
+        while True:
+            waited += await self._acquire_async(tokens)
+            start = time.perf_counter()
+            try:
+                response = await request()
+            except asyncio.CancelledError:
+                self._release()
+                raise
+            except Exception as e:
+                self._release()
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    self._log_call(waited, attempt + 1)
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            self._on_success(time.perf_counter() - start, response, tokens)
+            if not keep_slot:
+                self._release()
+            self._log_call(waited, attempt + 1)
+            return response
+
+    def release(self):
+        """Give back a slot kept with keep_slot=True."""
+        self._release()
+
+    def stats(self):
+        """
+        Get a snapshot of the limiter state.
+
+        Returns:
+            dict: Counters plus concurrency_limit, in_flight, queue_depth,
+            latency_ewma and the available request and token budget
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "concurrency_limit": max(int(self._limit), 1),
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "latency_ewma": self._latency,
+                "requests_available": self.request_bucket.available() if self.request_bucket else None,
+                "tokens_available": self.token_bucket.available() if self.token_bucket else None
+            })
+        return stats
+
+def get_rate_limiter():
+    """
+    Get the process-wide limiter shared by generation and evaluation.
+
+    Returns:
+        LLMRateLimiter: Shared limiter
+    """
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = LLMRateLimiter.from_config()
+    return _limiter
+
+def reset_rate_limiter(limiter=None):
+    """
+    Replace the shared limiter, e.g. after changing the llm_* settings.
+
+    Args:
+        limiter (LLMRateLimiter, optional): New limiter; None creates one from the config on next use
+    """
+    global _limiter
+
+    with _limiter_lock:
+        _limiter = limiter
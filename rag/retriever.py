@@ -2,40 +2,330 @@
 Document retrieval functions for the RAG system.
 """
 
+import time
+import asyncio
 import logging
-from utils.opik_tracking import opik
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.opik_tracking import opik, log_metrics
+from utils.config import get_config
+from utils.cache import LRUCache
+from utils.embeddings import get_embedder, get_client_embedder
+from utils.embedding_cache import embed_texts
+from .filters import build_filters
+from .context_builder import build_context, get_token_budget
 
 logger = logging.getLogger(__name__)
 
+_query_vector_cache = None
+_capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-vector")
+_pending_captures = set()
+_pending_lock = threading.Lock()
+_vectorizer_load = None
+_vector_errors_logged = set()
+
+def normalize_query(query):
+    """Normalize a query for cache lookups (case and whitespace insensitive)."""
+    return " ".join(query.lower().split())
+
+def _load_query_vectorizer(model_id):
+    """Load the configured query vectorizer; a failure is logged once and leaves searches on near_text."""
+    try:
+        vectorizer = get_embedder(model_id)
+    except Exception as e:
+        logger.error(f"Could not load query vectorizer {model_id}; searching with near_text: {str(e)}")
+        return None
+    logger.info(f"Query vectorizer {model_id} loaded")
+    return vectorizer
+
+def preload_query_vectorizer():
+    """
+    Start loading the local query vectorizer on the background executor.
+    
+    Called at startup by the web interfaces so the model is not loaded on a
+    request; searches use near_text until it is ready.
+    
+    Returns:
+        concurrent.futures.Future: Resolves to the vectorizer, or None if none
+        is configured or it failed to load
+    """
+    global _vectorizer_load
+    
+    with _pending_lock:
+        if _vectorizer_load is None:
+            config = get_config()
+            if config["embedding_mode"] == "client":
+                _vectorizer_load = _capture_executor.submit(get_client_embedder)
+            elif config["query_vectorizer"]:
+                _vectorizer_load = _capture_executor.submit(_load_query_vectorizer, config["query_vectorizer"])
+            else:
+                _vectorizer_load = _capture_executor.submit(lambda: None)
+        return _vectorizer_load
+
+def get_query_vectorizer(wait=False):
+    """
+    Get the local query vectorizer, if one is configured.
+    
+    It must use the same model as the collection's vectorizer, otherwise its
+    vectors are not comparable with the stored ones. In client embedding mode
+    this is always the model the chunks were embedded with, which searches
+    cannot do without, so it is loaded inline if needed. A QUERY_VECTORIZER
+    is an optimization and is loaded in the background.
+    
+    Args:
+        wait (bool): Wait for a QUERY_VECTORIZER that is still loading
+    
+    Returns:
+        Embedder instance, or None if query vectors are not cached (or the
+        vectorizer is not loaded yet)
+    """
+    config = get_config()
+    if config["embedding_mode"] == "client":
+        return get_client_embedder()
+    if not config["query_vectorizer"]:
+        return None
+    
+    load = preload_query_vectorizer()
+    if not wait and not load.done():
+        return None
+    return load.result()
+
+def get_query_vector_cache():
+    """Get the process-wide cache of query vectors."""
+    global _query_vector_cache
+    if _query_vector_cache is None:
+        _query_vector_cache = LRUCache(maxsize=get_config()["query_vector_cache_size"])
+    return _query_vector_cache
+
+def _lookup_query_vector(query):
+    """
+    Find the cached vector for a query.
+    
+    Returns:
+        tuple: (vector or None, cache key or None)
+    """
+    vectorizer = get_query_vectorizer()
+    if vectorizer is None:
+        return None, None
+    
+    key = (normalize_query(query), vectorizer.model_id)
+    return get_query_vector_cache().get(key), key
+
+def _capture_query_vector(key, query):
+    """Embed a query off the request path so the next identical query can use near_vector."""
+    with _pending_lock:
+        if key in _pending_captures:
+            return
+        _pending_captures.add(key)
+    
+    def capture():
+        try:
+            vector = get_query_vectorizer().embed([query])[0]
+            get_query_vector_cache().set(key, vector.tolist())
+        except Exception as e:
+            logger.warning(f"Could not capture query vector: {str(e)}")
+        finally:
+            with _pending_lock:
+                _pending_captures.discard(key)
+    
+    _capture_executor.submit(capture)
+
+def _resolve_query_vector(query):
+    """
+    Get the vector to search with, if one is available without waiting on Weaviate.
+    
+    In client embedding mode the collection has no vectorizer, so the query
+    is embedded inline on a cache miss. Otherwise a miss returns None (search
+    with near_text) and the vector is captured in the background.
+    
+    Returns:
+        list: Query vector, or None to search with near_text
+    """
+    vector, key = _lookup_query_vector(query)
+    if vector is not None or key is None:
+        return vector
+    
+    if get_client_embedder() is not None:
+        vector = get_query_vectorizer().embed([query])[0].tolist()
+        get_query_vector_cache().set(key, vector)
+        return vector
+    
+    _capture_query_vector(key, query)
+    return None
+
+def prefetch_query_vectors(queries):
+    """
+    Embed the queries missing from the query-vector cache in batched embedder calls.
+    
+    Later searches for these queries then use near_vector without embedding
+    them one at a time. Does nothing if no local query vectorizer is configured.
+    
+    Args:
+        queries (list): User queries
+        
+    Returns:
+        int: Number of queries embedded
+    """
+    vectorizer = get_query_vectorizer(wait=True)
+    if vectorizer is None:
+        return 0
+    
+    cache = get_query_vector_cache()
+    missing = {}
+    for query in queries:
+        key = (normalize_query(query), vectorizer.model_id)
+        if key not in missing and cache.get(key) is None:
+            missing[key] = query
+    
+    if missing:
+        vectors = embed_texts(list(missing.values()), vectorizer, batch_size=get_config()["embedding_batch_size"])
+        for key, vector in zip(missing, vectors):
+            cache.set(key, vector.tolist())
+    
+    return len(missing)
+
+def _search_vector(query):
+    """
+    Query vector for a search, or None to search with near_text.
+    
+    Query vectors only save Weaviate from embedding the query, so a failing
+    vectorizer falls back to near_text instead of failing the search; each
+    distinct error is logged once.
+    """
+    try:
+        return _resolve_query_vector(query)
+    except Exception as e:
+        message = f"{type(e).__name__}: {str(e)}"
+        with _pending_lock:
+            first = message not in _vector_errors_logged
+            _vector_errors_logged.add(message)
+        if first:
+            logger.error(f"Query vectorizer failed; searching with near_text: {message}")
+        return None
+
+def _search_request(collection, query, limit, vector, where=None):
+    """
+    Choose the collection query method and arguments for the configured search mode.
+    
+    Args:
+        where: Compiled Weaviate filter, or None
+    
+    Returns:
+        tuple: (query method, keyword arguments)
+    """
+    config = get_config()
+    
+    if config["search_mode"] == "hybrid":
+        from weaviate.classes.query import HybridFusion
+
+        fusion = HybridFusion.RANKED if config["hybrid_fusion"] == "ranked" else HybridFusion.RELATIVE_SCORE
+        return collection.query.hybrid, {
+            "query": query,
+            "vector": vector,
+            "alpha": config["hybrid_alpha"],
+            "fusion_type": fusion,
+            "query_properties": config["hybrid_query_properties"],
+            "limit": limit,
+            "filters": where
+        }
+    
+    if vector is not None:
+        return collection.query.near_vector, {"near_vector": vector, "limit": limit, "filters": where}
+    return collection.query.near_text, {"query": query, "limit": limit, "filters": where}
+
 @opik.track
-def search_historical_documents(collection, query, limit=5):
+def search_historical_documents(collection, query, limit=5, filters=None, raise_errors=False):
     """
     Search for historical documents relevant to the query.
     
+    Repeat queries are searched with their cached vector (near_vector), so
+    Weaviate does not have to embed them again. Other queries use near_text
+    and their vector is captured for next time. In client embedding mode
+    every query is embedded locally and searched with near_vector.
+    
+    With SEARCH_MODE=hybrid, BM25 keyword scores over the chunk text and
+    title are fused with vector similarity (HYBRID_ALPHA, HYBRID_FUSION),
+    which finds exact phrases such as "remember the ladies" at a small limit.
+    
+    Metadata filters (see rag.filters) are evaluated by Weaviate as part of
+    the search, so the limit applies to matching documents only.
+    
     Args:
         collection: Weaviate collection
         query (str): User query
         limit (int): Maximum number of results
+        filters (dict, optional): Date range, document type, author and recipient filters
+        raise_errors (bool): Raise search errors instead of logging them and returning no results
         
     Returns:
         list: Search results
     """
     logger.info(f"Searching for: {query}")
+    # Invalid filters are the caller's error, so they are raised rather than logged
+    where = build_filters(filters)
     
+    vector = _search_vector(query)
     try:
-        results = collection.query.near_text(
-            query=query,
-            limit=limit
-        )
+        search, kwargs = _search_request(collection, query, limit, vector, where)
+        results = search(**kwargs)
         
         logger.info(f"Found {len(results.objects)} relevant documents")
         return results.objects
     
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Error searching documents: {str(e)}")
         return []
 
 @opik.track
+async def search_historical_documents_async(collection, query, limit=5, filters=None, raise_errors=False):
+    """
+    Search for historical documents relevant to the query with the async client.
+    
+    Uses the same query-vector cache, search mode and filters as search_historical_documents().
+    
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        limit (int): Maximum number of results
+        filters (dict, optional): Date range, document type, author and recipient filters
+        raise_errors (bool): Raise search errors instead of logging them and returning no results
+        
+    Returns:
+        list: Search results
+    """
+    logger.info(f"Searching for: {query}")
+    # Invalid filters are the caller's error, so they are raised rather than logged
+    where = build_filters(filters)
+    
+    if get_config()["embedding_mode"] == "client":
+        # Embedding the query inline would block the event loop
+        vector = await asyncio.to_thread(_search_vector, query)
+    else:
+        # Only cache lookups; a vectorizer is never loaded or run here
+        vector = _search_vector(query)
+    
+    try:
+        search, kwargs = _search_request(collection, query, limit, vector, where)
+        results = await search(**kwargs)
+        
+        logger.info(f"Found {len(results.objects)} relevant documents")
+        return results.objects
+    
+    except Exception as e:
+        if raise_errors:
+            raise
+        logger.error(f"Error searching documents: {str(e)}")
+        return []
+
+def _format_date(value):
+    """Show a stored date (a datetime from Weaviate, an RFC 3339 string locally) as YYYY-MM-DD."""
+    if hasattr(value, "date"):
+        return value.date().isoformat()
+    return str(value)[:10]
+
+@opik.track(trivial=True)
 def format_search_results(results):
     """
     Format search results for display and LLM context.
@@ -52,11 +342,13 @@ def format_search_results(results):
         doc = {
             "text": result.properties["text"],
             "title": result.properties["title"],
-            "date": result.properties["date"],
+            "date": _format_date(result.properties["date"]),
             "authors": ", ".join(result.properties["authors"]),
             "document_type": result.properties["document_type"],
+            "source_url": result.properties.get("source_url"),
             "chunk_id": result.properties.get("chunk_id", 0),
-            "total_chunks": result.properties.get("total_chunks", 1)
+            "total_chunks": result.properties.get("total_chunks", 1),
+            "token_count": result.properties.get("token_count")
         }
         
         # Add recipient for letters
@@ -67,36 +359,54 @@ def format_search_results(results):
     
     return formatted_results
 
-@opik.track
+@opik.track(trivial=True)
 def prepare_context_for_llm(formatted_results):
     """
     Prepare context from search results for the LLM.
     
+    Adjacent chunks of a document are merged without their overlap; see
+    rag.context_builder.build_context() for the token-budgeted variant.
+    
     Args:
         formatted_results (list): Formatted search results
         
     Returns:
         str: Context text for LLM prompt
     """
-    context = ""
+    return build_context(formatted_results)["context"]
+
+def assemble_context(results, mode=None):
+    """
+    Format search results and build the context within the mode's token budget.
     
-    for i, doc in enumerate(formatted_results):
-        context += f"\n\nDOCUMENT {i+1}:\n"
-        context += f"Title: {doc['title']}\n"
-        context += f"Date: {doc['date']}\n"
-        context += f"Author(s): {doc['authors']}\n"
-        context += f"Type: {doc['document_type']}\n"
-        
-        if "recipient" in doc:
-            context += f"Recipient: {doc['recipient']}\n"
+    Args:
+        results (list): Raw search results
+        mode (str, optional): Response mode whose context token budget applies
         
-        context += f"Chunk: {doc['chunk_id']+1} of {doc['total_chunks']}\n"
-        context += f"Content:\n{doc['text']}\n"
+    Returns:
+        dict: "context", "formatted_results", "raw_results", "context_stats"
+        and "timings" (seconds spent formatting and building the context)
+    """
+    start = time.perf_counter()
+    formatted_results = format_search_results(results)
+    formatted = time.perf_counter()
+    built = build_context(formatted_results, token_budget=get_token_budget(mode))
+    timings = {"format": formatted - start, "context": time.perf_counter() - formatted}
+    log_metrics(
+        context_prompt_tokens=built["stats"]["prompt_tokens"],
+        context_tokens_saved=built["stats"]["tokens_saved"]
+    )
     
-    return context
+    return {
+        "context": built["context"],
+        "formatted_results": formatted_results,
+        "raw_results": results,
+        "context_stats": built["stats"],
+        "timings": timings
+    }
 
 @opik.track(name="retrieve-context")
-def retrieve_context(collection, query, limit=5):
+def retrieve_context(collection, query, limit=5, filters=None, mode=None):
     """
     Retrieve context relevant to the user's query.
     
@@ -104,21 +414,39 @@ def retrieve_context(collection, query, limit=5):
         collection: Weaviate collection
         query (str): User query
         limit (int): Maximum number of results
+        filters (dict, optional): Date range, document type, author and recipient filters
+        mode (str, optional): Response mode whose context token budget applies
         
     Returns:
-        dict: Retrieved context and metadata
+        dict: Retrieved context and metadata, with "context_stats" reporting
+        the prompt tokens used and saved, and "timings" the seconds spent in
+        search, format and context building
     """
-    # Search for relevant documents
-    results = search_historical_documents(collection, query, limit=limit)
-    
-    # Format results
-    formatted_results = format_search_results(results)
-    
-    # Prepare context for LLM
-    context = prepare_context_for_llm(formatted_results)
+    start = time.perf_counter()
+    results = search_historical_documents(collection, query, limit=limit, filters=filters)
+    search_time = time.perf_counter() - start
+    retrieved = assemble_context(results, mode)
+    retrieved["timings"]["search"] = search_time
+    return retrieved
+
+@opik.track(name="retrieve-context-async")
+async def retrieve_context_async(collection, query, limit=5, filters=None, mode=None):
+    """
+    Retrieve context relevant to the user's query with the async client.
     
-    return {
-        "context": context,
-        "formatted_results": formatted_results,
-        "raw_results": results
-    }
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        limit (int): Maximum number of results
+        filters (dict, optional): Date range, document type, author and recipient filters
+        mode (str, optional): Response mode whose context token budget applies
+        
+    Returns:
+        dict: Retrieved context and metadata, with "context_stats" and "timings"
+    """
+    start = time.perf_counter()
+    results = await search_historical_documents_async(collection, query, limit=limit, filters=filters)
+    search_time = time.perf_counter() - start
+    retrieved = assemble_context(results, mode)
+    retrieved["timings"]["search"] = search_time
+    return retrieved
@@ -0,0 +1,418 @@
+"""
+Semantic answer cache in front of the RAG pipeline.
+
+Answers are reused for queries with the same mode, limit and metadata filters
+whose embedding is close enough to a previously answered query and that use
+the same words apart from stopwords, so questions differing in a year, a name
+or a negation are never answered with each other's answers. Entries expire by LRU and TTL, and
+the whole cache is dropped when the corpus import generation changes. Misses
+go through single-flight coalescing, so identical concurrent misses are
+answered once.
+"""
+
+import re
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.opik_tracking import opik, log_metrics
+from utils.config import get_config
+from utils.embeddings import get_embedder
+from database.generation import get_import_generation
+from .single_flight import (
+    coalesced_independence_rag,
+    coalesced_independence_rag_stream,
+    coalesced_independence_rag_async,
+    coalesced_independence_rag_stream_async
+)
+from .filters import filters_key
+
+logger = logging.getLogger(__name__)
+
+_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+# The BM25 index's English stopwords without "no" and "not", which change the question
+_STOPWORDS = frozenset((
+    "a an and are as at be but by for if in into is it of on or such that the their then there "
+    "these they this to was will with"
+).split())
+
+def query_terms(query):
+    """
+    Words of a query that must match for a cached answer to be reused.
+
+    Args:
+        query (str): User query
+
+    Returns:
+        frozenset: Lowercased words, numbers included, without stopwords
+    """
+    return frozenset(term for term in _TERM_PATTERN.findall(query.lower()) if term not in _STOPWORDS)
+
+class SemanticCache:
+    """
+    Thread-safe LRU/TTL cache of RAG results matched by query similarity.
+
+    A cached result is only a candidate for queries with the same
+    query_terms(); the embedding similarity then has to reach threshold,
+    which rejects the same words in a different order.
+    """
+
+    def __init__(self, embedder, threshold=0.98, max_entries=1024, ttl=3600.0,
+                 generation_fn=get_import_generation):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._generation_fn = generation_fn
+        self._generation = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._lru = OrderedDict()  # entry id -> bucket key, oldest first
+        self._buckets = {}  # (mode, limit, filters key) -> {entry id: entry}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "latency_saved_total": 0.0
+        }
+
+    def _check_generation(self):
+        """Drop every entry if the corpus has been re-imported. Caller holds the lock."""
+        generation = self._generation_fn()
+        if generation != self._generation:
+            if self._lru:
+                logger.info("Corpus import generation changed, clearing semantic cache")
+                self._stats["invalidations"] += 1
+            self._lru.clear()
+            self._buckets.clear()
+            self._generation = generation
+
+    def _remove(self, entry_id):
+        """Remove one entry. Caller holds the lock."""
+        bucket_key = self._lru.pop(entry_id)
+        bucket = self._buckets[bucket_key]
+        del bucket[entry_id]
+        if not bucket:
+            del self._buckets[bucket_key]
+
+    def embed(self, query):
+        """
+        Embed a query for lookup and storage.
+
+        Args:
+            query (str): User query
+
+        Returns:
+            numpy.ndarray: Normalized query vector
+        """
+        return self.embedder.embed([query])[0]
+
+    def lookup(self, query, mode, limit, vector=None, filters=None):
+        """
+        Find a cached result for a similar query.
+
+        Args:
+            query (str): User query
+            mode (str): Response mode
+            limit (int): Number of documents retrieved
+            vector (numpy.ndarray, optional): Precomputed query vector
+            filters (dict, optional): Metadata filters the documents were retrieved with
+
+        Returns:
+            tuple: (cached result or None, query vector)
+        """
+        if vector is None:
+            vector = self.embed(query)
+        terms = query_terms(query)
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_generation()
+            bucket_key = (mode, limit, filters_key(filters))
+            bucket = self._buckets.get(bucket_key)
+
+            if bucket:
+                expired = [entry_id for entry_id, entry in bucket.items() if now - entry["created"] > self.ttl]
+                for entry_id in expired:
+                    self._remove(entry_id)
+                self._stats["expirations"] += len(expired)
+                bucket = self._buckets.get(bucket_key)
+
+            entry_ids = [entry_id for entry_id, entry in (bucket or {}).items() if entry["terms"] == terms]
+            if not entry_ids:
+                self._stats["misses"] += 1
+                return None, vector
+
+            similarities = np.stack([bucket[entry_id]["vector"] for entry_id in entry_ids]) @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity < self.threshold:
+                self._stats["misses"] += 1
+                return None, vector
+
+            entry = bucket[entry_ids[best]]
+            self._lru.move_to_end(entry_ids[best])
+            self._stats["hits"] += 1
+            self._stats["latency_saved_total"] += entry["latency"]
+
+        result = dict(entry["result"])
+        result["query"] = query
+        result["cache"] = {
+            "hit": True,
+            "similarity": similarity,
+            "cached_query": entry["result"]["query"],
+            "latency_saved": entry["latency"]
+        }
+        return result, vector
+
+    def store(self, query, mode, limit, result, vector=None, filters=None):
+        """
+        Cache a RAG result.
+
+        Args:
+            query (str): User query
+            mode (str): Response mode
+            limit (int): Number of documents retrieved
+            result (dict): RAG result
+            vector (numpy.ndarray, optional): Precomputed query vector
+            filters (dict, optional): Metadata filters the documents were retrieved with
+        """
+        if vector is None:
+            vector = self.embed(query)
+        latency = result.get("metrics", {}).get("total_latency", 0.0)
+
+        with self._lock:
+            self._check_generation()
+
+            entry_id = self._next_id
+            self._next_id += 1
+            bucket_key = (mode, limit, filters_key(filters))
+            self._buckets.setdefault(bucket_key, {})[entry_id] = {
+                "vector": vector,
+                "terms": query_terms(query),
+                "result": result,
+                "latency": latency,
+                "created": time.monotonic()
+            }
+            self._lru[entry_id] = bucket_key
+            self._stats["stores"] += 1
+
+            while len(self._lru) > self.max_entries:
+                self._remove(next(iter(self._lru)))
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._lru.clear()
+            self._buckets.clear()
+
+    def get_stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hits, misses, evictions, latency saved and current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._lru)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_semantic_cache():
+    """
+    Get the process-wide semantic cache.
+
+    Returns:
+        SemanticCache: Shared cache, or None if disabled in the configuration
+    """
+    global _cache
+
+    config = get_config()
+    if not config["semantic_cache_enabled"]:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(
+                    embedder=get_embedder(config["semantic_cache_embedder"]),
+                    threshold=config["semantic_cache_threshold"],
+                    max_entries=config["semantic_cache_max_entries"],
+                    ttl=config["semantic_cache_ttl"]
+                )
+
+    return _cache
+
+def _log_cache_metrics(cache, hit, result=None):
+    stats = cache.get_stats()
+    metrics = {
+        "semantic_cache_hit": hit,
+        "semantic_cache_hits": stats["hits"],
+        "semantic_cache_misses": stats["misses"],
+        "semantic_cache_latency_saved_total": stats["latency_saved_total"]
+    }
+    if hit:
+        metrics["semantic_cache_similarity"] = result["cache"]["similarity"]
+        metrics["semantic_cache_latency_saved"] = result["cache"]["latency_saved"]
+    log_metrics(**metrics)
+
+@opik.track(name="cached-independence-rag")
+def cached_independence_rag(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Answer a query from the semantic cache, falling back to the RAG pipeline.
+
+    Evaluated requests always run the full pipeline.
+
+    Args:
+        collection: Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Returns:
+        dict: RAG results; cache hits carry a "cache" entry with the similarity
+    """
+    cache = get_semantic_cache()
+    if cache is None or evaluate:
+        return coalesced_independence_rag(collection, query, mode=mode, limit=limit, evaluate=evaluate,
+                                          filters=filters)
+
+    cached, vector = cache.lookup(query, mode, limit, filters=filters)
+    if cached is not None:
+        _log_cache_metrics(cache, True, cached)
+        return cached
+
+    result = coalesced_independence_rag(collection, query, mode=mode, limit=limit, filters=filters)
+    # Only the request that computed a coalesced result stores it
+    if not result.get("coalesced"):
+        cache.store(query, mode, limit, result, vector=vector, filters=filters)
+    _log_cache_metrics(cache, False)
+    return result
+
+@opik.track(name="cached-independence-rag-stream")
+def cached_independence_rag_stream(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Streaming variant of cached_independence_rag().
+
+    A cache hit is emitted as a sources event, a single token event holding
+    the whole answer and a done event.
+
+    Args:
+        collection: Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Yields:
+        dict: "sources", "token" and "done" events
+    """
+    cache = get_semantic_cache()
+    if cache is None or evaluate:
+        yield from coalesced_independence_rag_stream(collection, query, mode=mode, limit=limit, evaluate=evaluate,
+                                                     filters=filters)
+        return
+
+    cached, vector = cache.lookup(query, mode, limit, filters=filters)
+    if cached is not None:
+        _log_cache_metrics(cache, True, cached)
+        yield {"type": "sources", "sources": cached["sources"]}
+        yield {"type": "token", "text": cached["response"]}
+        yield {"type": "done", "result": cached}
+        return
+
+    for event in coalesced_independence_rag_stream(collection, query, mode=mode, limit=limit, filters=filters):
+        if event["type"] == "done":
+            if not event["result"].get("coalesced"):
+                cache.store(query, mode, limit, event["result"], vector=vector, filters=filters)
+            _log_cache_metrics(cache, False)
+        yield event
+
+@opik.track(name="cached-independence-rag-async")
+async def cached_independence_rag_async(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Asyncio variant of cached_independence_rag().
+
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Returns:
+        dict: RAG results; cache hits carry a "cache" entry with the similarity
+    """
+    cache = get_semantic_cache()
+    if cache is None or evaluate:
+        return await coalesced_independence_rag_async(collection, query, mode=mode, limit=limit,
+                                                      evaluate=evaluate, filters=filters)
+
+    # Embedding the query would block the event loop
+    cached, vector = await asyncio.to_thread(cache.lookup, query, mode, limit, filters=filters)
+    if cached is not None:
+        _log_cache_metrics(cache, True, cached)
+        return cached
+
+    result = await coalesced_independence_rag_async(collection, query, mode=mode, limit=limit, filters=filters)
+    if not result.get("coalesced"):
+        cache.store(query, mode, limit, result, vector=vector, filters=filters)
+    _log_cache_metrics(cache, False)
+    return result
+
+@opik.track(name="cached-independence-rag-stream-async")
+async def cached_independence_rag_stream_async(collection, query, mode="historian", limit=5, evaluate=False,
+                                               filters=None):
+    """
+    Asyncio variant of cached_independence_rag_stream().
+
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Yields:
+        dict: "sources", "token" and "done" events
+    """
+    cache = get_semantic_cache()
+    if cache is None or evaluate:
+        async for event in coalesced_independence_rag_stream_async(collection, query, mode=mode, limit=limit,
+                                                                   evaluate=evaluate, filters=filters):
+            yield event
+        return
+
+    cached, vector = await asyncio.to_thread(cache.lookup, query, mode, limit, filters=filters)
+    if cached is not None:
+        _log_cache_metrics(cache, True, cached)
+        yield {"type": "sources", "sources": cached["sources"]}
+        yield {"type": "token", "text": cached["response"]}
+        yield {"type": "done", "result": cached}
+        return
+
+    async for event in coalesced_independence_rag_stream_async(collection, query, mode=mode, limit=limit,
+                                                               filters=filters):
+        if event["type"] == "done":
+            if not event["result"].get("coalesced"):
+                cache.store(query, mode, limit, event["result"], vector=vector, filters=filters)
+            _log_cache_metrics(cache, False)
+        yield event
@@ -0,0 +1,403 @@
+"""
+Single-flight coalescing of identical in-flight RAG requests.
+
+When the same question is asked several times at once (a classroom, a shared
+link), only the first request runs retrieval and generation. Requests with
+the same normalized query, mode, limit and filters that arrive while it is
+in flight wait for it and receive its result; streaming followers receive the
+same events, including those sent before they joined. Once a computation
+finishes its key is released, so later requests run again (or hit the
+semantic cache).
+"""
+
+import asyncio
+import logging
+import threading
+import contextvars
+from utils.opik_tracking import log_metrics
+from utils.config import get_config
+from .filters import filters_key
+from .retriever import normalize_query
+from .independence_rag import (
+    independence_rag,
+    independence_rag_stream,
+    independence_rag_async,
+    independence_rag_stream_async
+)
+
+logger = logging.getLogger(__name__)
+
+def request_key(query, mode, limit, filters=None):
+    """
+    Get the coalescing key of a RAG request.
+
+    Returns:
+        tuple: Normalized query, mode, limit and canonical filters
+    """
+    return (normalize_query(query), mode, limit, filters_key(filters))
+
+class _Flight:
+    """One in-flight computation and the events or result it has produced so far."""
+
+    def __init__(self, condition):
+        self.condition = condition
+        self.events = []
+        self.result = None
+        self.error = None
+        self.done = False
+
+class SingleFlight:
+    """
+    Thread- and asyncio-safe registry of in-flight computations by key.
+
+    Threads share flights with threads; asyncio tasks share flights with
+    tasks on the same event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = {
+            "leaders": 0,
+            "followers": 0,
+            "llm_calls_saved": 0
+        }
+
+    def _join(self, key, make_condition):
+        """Get the flight for key, creating it if needed. Returns (flight, is_leader)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats["followers"] += 1
+                self._stats["llm_calls_saved"] += 1
+                return flight, False
+
+            flight = _Flight(make_condition())
+            self._flights[key] = flight
+            self._stats["leaders"] += 1
+            return flight, True
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def do(self, key, fn):
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Hashable request key
+            fn (callable): Computation to share
+
+        Returns:
+            tuple: (fn's result, True if it was computed by another caller)
+        """
+        flight, leader = self._join(("thread", key), threading.Condition)
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with flight.condition:
+                    flight.done = True
+                    flight.condition.notify_all()
+                self._land(("thread", key), flight)
+            return flight.result, False
+
+        with flight.condition:
+            flight.condition.wait_for(lambda: flight.done)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True
+
+    def stream(self, key, make_events):
+        """
+        Share one event stream among all concurrent callers with the same key.
+
+        The events are produced on a background thread, so the stream
+        completes for the followers even if the caller that started it stops
+        reading.
+
+        Args:
+            key: Hashable request key
+            make_events (callable): Returns the event iterator to share
+
+        Yields:
+            tuple: (event, True if the stream was started by another caller)
+        """
+        flight, leader = self._join(("thread-stream", key), threading.Condition)
+        if leader:
+            def produce():
+                try:
+                    for event in make_events():
+                        with flight.condition:
+                            flight.events.append(event)
+                            flight.condition.notify_all()
+                except BaseException as e:
+                    flight.error = e
+                finally:
+                    with flight.condition:
+                        flight.done = True
+                        flight.condition.notify_all()
+                    self._land(("thread-stream", key), flight)
+
+            # Keep the caller's trace context on the producer thread
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(produce,), daemon=True,
+                             name="single-flight-stream").start()
+
+        index = 0
+        while True:
+            with flight.condition:
+                flight.condition.wait_for(lambda: flight.done or len(flight.events) > index)
+                pending = flight.events[index:]
+                done = flight.done
+            for event in pending:
+                yield event, not leader
+            index += len(pending)
+            if done and index == len(flight.events):
+                break
+
+        if flight.error is not None:
+            raise flight.error
+
+    async def do_async(self, key, make_coroutine):
+        """
+        Asyncio variant of do().
+
+        The computation runs as its own task, so cancelling the caller that
+        started it does not cancel it for the followers.
+
+        Args:
+            key: Hashable request key
+            make_coroutine (callable): Returns the coroutine to share
+
+        Returns:
+            tuple: (result, True if it was computed by another caller)
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = ("async", loop, key)
+        flight, leader = self._join(flight_key, lambda: None)
+        if leader:
+            flight.result = asyncio.ensure_future(make_coroutine())
+            flight.result.add_done_callback(lambda _: self._land(flight_key, flight))
+
+        # Followers on this loop can only run once the leader has started the task above
+        return await asyncio.shield(flight.result), not leader
+
+    async def stream_async(self, key, make_events):
+        """
+        Asyncio variant of stream().
+
+        Args:
+            key: Hashable request key
+            make_events (callable): Returns the async event iterator to share
+
+        Yields:
+            tuple: (event, True if the stream was started by another caller)
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = ("async-stream", loop, key)
+        flight, leader = self._join(flight_key, asyncio.Condition)
+        if leader:
+            async def produce():
+                try:
+                    async for event in make_events():
+                        async with flight.condition:
+                            flight.events.append(event)
+                            flight.condition.notify_all()
+                except Exception as e:
+                    flight.error = e
+                finally:
+                    async with flight.condition:
+                        flight.done = True
+                        flight.condition.notify_all()
+                    self._land(flight_key, flight)
+
+            flight.result = asyncio.ensure_future(produce())
+
+        index = 0
+        while True:
+            async with flight.condition:
+                await flight.condition.wait_for(lambda: flight.done or len(flight.events) > index)
+                pending = flight.events[index:]
+                done = flight.done
+            for event in pending:
+                yield event, not leader
+            index += len(pending)
+            if done and index == len(flight.events):
+                break
+
+        if flight.error is not None:
+            raise flight.error
+
+    def get_stats(self):
+        """
+        Get coalescing counters.
+
+        Returns:
+            dict: Leaders (computations run), followers (requests that joined
+            one), LLM calls saved and computations in flight
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._flights)
+        return stats
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight():
+    """
+    Get the process-wide single-flight registry.
+
+    Returns:
+        SingleFlight: Shared registry, or None if disabled in the configuration
+    """
+    global _single_flight
+
+    if not get_config()["single_flight_enabled"]:
+        return None
+
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
+
+def _follower_result(result, query):
+    """A follower's copy of the shared result, with its own query text."""
+    return dict(result, query=query, coalesced=True)
+
+def _log_coalescing_metrics(single_flight, coalesced):
+    log_metrics(single_flight_coalesced=coalesced,
+                single_flight_llm_calls_saved=single_flight.get_stats()["llm_calls_saved"])
+
+def _follower_event(event, query):
+    if event["type"] == "done":
+        return dict(event, result=_follower_result(event["result"], query))
+    return event
+
+def coalesced_independence_rag(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Run independence_rag(), sharing the computation with identical concurrent requests.
+
+    Evaluated requests are never coalesced.
+
+    Args:
+        collection: Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Returns:
+        dict: RAG results; results shared from another request carry "coalesced": True
+    """
+    single_flight = get_single_flight()
+    if single_flight is None or evaluate:
+        return independence_rag(collection, query, mode=mode, limit=limit, evaluate=evaluate, filters=filters)
+
+    result, coalesced = single_flight.do(
+        request_key(query, mode, limit, filters),
+        lambda: independence_rag(collection, query, mode=mode, limit=limit, filters=filters)
+    )
+    _log_coalescing_metrics(single_flight, coalesced)
+    return _follower_result(result, query) if coalesced else result
+
+def coalesced_independence_rag_stream(collection, query, mode="historian", limit=5, evaluate=False, filters=None):
+    """
+    Streaming variant of coalesced_independence_rag().
+
+    Every request with the same key receives the same sources and token
+    events; followers' done results carry "coalesced": True.
+
+    Args:
+        collection: Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Yields:
+        dict: "sources", "token" and "done" events
+    """
+    single_flight = get_single_flight()
+    if single_flight is None or evaluate:
+        yield from independence_rag_stream(collection, query, mode=mode, limit=limit, evaluate=evaluate,
+                                           filters=filters)
+        return
+
+    events = single_flight.stream(
+        request_key(query, mode, limit, filters),
+        lambda: independence_rag_stream(collection, query, mode=mode, limit=limit, filters=filters)
+    )
+    for event, coalesced in events:
+        if event["type"] == "sources":
+            _log_coalescing_metrics(single_flight, coalesced)
+        yield _follower_event(event, query) if coalesced else event
+
+async def coalesced_independence_rag_async(collection, query, mode="historian", limit=5, evaluate=False,
+                                           filters=None):
+    """
+    Asyncio variant of coalesced_independence_rag().
+
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Returns:
+        dict: RAG results; results shared from another request carry "coalesced": True
+    """
+    single_flight = get_single_flight()
+    if single_flight is None or evaluate:
+        return await independence_rag_async(collection, query, mode=mode, limit=limit, evaluate=evaluate,
+                                            filters=filters)
+
+    result, coalesced = await single_flight.do_async(
+        request_key(query, mode, limit, filters),
+        lambda: independence_rag_async(collection, query, mode=mode, limit=limit, filters=filters)
+    )
+    _log_coalescing_metrics(single_flight, coalesced)
+    return _follower_result(result, query) if coalesced else result
+
+async def coalesced_independence_rag_stream_async(collection, query, mode="historian", limit=5, evaluate=False,
+                                                  filters=None):
+    """
+    Asyncio variant of coalesced_independence_rag_stream().
+
+    Args:
+        collection: Async Weaviate collection
+        query (str): User query
+        mode (str): Response mode (historian, founding_father, time_traveler)
+        limit (int): Maximum number of documents to retrieve
+        evaluate (bool): Whether to evaluate the response
+        filters (dict, optional): Date range, document type, author and recipient filters
+
+    Yields:
+        dict: "sources", "token" and "done" events
+    """
+    single_flight = get_single_flight()
+    if single_flight is None or evaluate:
+        async for event in independence_rag_stream_async(collection, query, mode=mode, limit=limit,
+                                                         evaluate=evaluate, filters=filters):
+            yield event
+        return
+
+    events = single_flight.stream_async(
+        request_key(query, mode, limit, filters),
+        lambda: independence_rag_stream_async(collection, query, mode=mode, limit=limit, filters=filters)
+    )
+    async for event, coalesced in events:
+        if event["type"] == "sources":
+            _log_coalescing_metrics(single_flight, coalesced)
+        yield _follower_event(event, query) if coalesced else event
@@ -0,0 +1,29 @@
+"""Tests for chunking documents."""
+
+from data.document_processor import chunk_text
+from utils.tokens import count_tokens
+
+def test_word_longer_than_a_chunk_is_split():
+    chunks = list(chunk_text("a" * 500, 100, 20))
+    assert [len(chunk) for chunk in chunks] == [100] * 5
+    assert "".join(chunks) == "a" * 500
+
+def test_long_word_between_sentences_keeps_the_other_words_whole():
+    url = "https://example.org/" + "x" * 230
+    text = f"The letter is archived at {url} today. It was written in 1776."
+    chunks = list(chunk_text(text, 100, 20))
+
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert chunks[0] == "The letter is archived at"
+    assert "".join(chunks[1:4]).startswith(url)
+    assert chunks[-1].endswith("It was written in 1776.")
+
+def test_word_longer_than_a_chunk_is_split_by_tokens():
+    word = "-".join(["x"] * 200)
+    chunks = list(chunk_text(f"see {word} for details.", 50, 10, "tokens"))
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert word in "".join(chunks).replace(" ", "")
+
+def test_sentences_are_not_split():
+    text = "First sentence here. Second sentence here. Third sentence here."
+    assert list(chunk_text(text, 45, 0)) == ["First sentence here. Second sentence here.", "Third sentence here."]
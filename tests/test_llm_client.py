@@ -0,0 +1,19 @@
+"""Tests for the shared FriendliAI clients."""
+
+import asyncio
+from rag.llm_client import get_shared_async_client, close_shared_async_client
+
+def test_async_client_is_closed_on_its_loop(monkeypatch):
+    monkeypatch.setenv("FRIENDLI_TOKEN", "stub-token")
+
+    async def run():
+        client = get_shared_async_client()
+        assert get_shared_async_client() is client
+        await close_shared_async_client()
+        assert client.is_closed()
+        # The next call on the loop gets a new client
+        replacement = get_shared_async_client()
+        assert replacement is not client
+        await close_shared_async_client()
+
+    asyncio.run(run())
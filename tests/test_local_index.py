@@ -0,0 +1,61 @@
+"""Tests for persisting the local vector index."""
+
+import numpy as np
+from database.local_index import LocalCollection, LocalClient
+from utils.embeddings import get_embedder
+
+def _objects(start, count, dim):
+    vectors = np.random.default_rng(start).standard_normal((count, dim), dtype=np.float32)
+    return [({"text": f"chunk {i}", "chunk_id": i}, None, vectors[i - start]) for i in range(start, start + count)]
+
+def _collection(directory):
+    return LocalCollection("Test", str(directory), get_embedder("hashing"))
+
+def test_writes_are_persisted_immediately(tmp_path):
+    collection = _collection(tmp_path)
+    collection.upsert(_objects(0, 3, collection.embedder.dim))
+    assert len(_collection(tmp_path)) == 3
+
+def test_deferred_writes_are_persisted_once(tmp_path, monkeypatch):
+    collection = _collection(tmp_path)
+    persisted = []
+    persist = collection._persist
+    monkeypatch.setattr(collection, "_persist", lambda: persisted.append(True) or persist())
+
+    with collection.deferred_writes():
+        for i in range(20):
+            collection.data.insert({"text": f"chunk {i}", "chunk_id": i},
+                                   vector=np.ones(collection.embedder.dim, dtype=np.float32))
+        with collection.deferred_writes():
+            collection.upsert(_objects(20, 5, collection.embedder.dim))
+        # Visible to searches before they reach the disk
+        assert collection.count() == 25
+        assert not (tmp_path / "meta.json").exists()
+
+    assert persisted == [True]
+    assert len(_collection(tmp_path)) == 25
+
+def test_batch_persists_its_objects_and_deletes_once(tmp_path, monkeypatch):
+    from weaviate.classes.query import Filter
+
+    collection = _collection(tmp_path)
+    collection.upsert(_objects(0, 10, collection.embedder.dim))
+    persisted = []
+    persist = collection._persist
+    monkeypatch.setattr(collection, "_persist", lambda: persisted.append(True) or persist())
+
+    with collection.batch.dynamic() as batch:
+        for properties, _, vector in _objects(10, 10, collection.embedder.dim):
+            batch.add_object(properties=properties, vector=vector)
+        collection.data.delete_many(where=Filter.by_property("chunk_id").less_than(5))
+
+    assert persisted == [True]
+    assert len(_collection(tmp_path)) == 15
+
+def test_client_close_writes_pending_changes(tmp_path):
+    client = LocalClient(str(tmp_path), get_embedder("hashing"))
+    collection = client.collections.get("Test")
+    with collection.deferred_writes():
+        collection.upsert(_objects(0, 4, collection.embedder.dim))
+        client.close()
+    assert len(_collection(tmp_path / "Test")) == 4
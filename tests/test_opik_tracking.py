@@ -0,0 +1,89 @@
+"""Tests for the tracer's handling of traced generators."""
+
+import asyncio
+from utils.opik_tracking import Tracer
+
+def _tracer(exported):
+    return Tracer(enabled=True, export=exported.extend, flush_interval=0.01)
+
+def test_closing_a_traced_generator_closes_the_inner_one():
+    exported = []
+    tracer = _tracer(exported)
+    cleaned_up = []
+
+    @tracer.track
+    def stream():
+        try:
+            yield from range(10)
+        finally:
+            cleaned_up.append(True)
+
+    generator = stream()
+    assert next(generator) == 0
+    generator.close()
+
+    assert cleaned_up == [True]
+    assert tracer.flush()
+    assert exported[0].error is None
+    assert exported[0].metadata["cancelled"] == "GeneratorExit"
+
+def test_closing_a_traced_async_generator_closes_the_inner_one():
+    exported = []
+    tracer = _tracer(exported)
+    cleaned_up = []
+
+    @tracer.track
+    async def stream():
+        try:
+            for i in range(10):
+                yield i
+        finally:
+            cleaned_up.append(True)
+
+    async def consume():
+        generator = stream()
+        assert await generator.__anext__() == 0
+        await generator.aclose()
+        # Closed before the event loop shuts down
+        assert cleaned_up == [True]
+
+    asyncio.run(consume())
+    assert tracer.flush()
+    assert exported[0].metadata["cancelled"] == "GeneratorExit"
+
+def test_unsampled_async_generator_is_closed():
+    tracer = Tracer(enabled=True, sample_rate=0.0, export=lambda spans: None)
+    cleaned_up = []
+
+    @tracer.track
+    async def stream():
+        try:
+            for i in range(10):
+                yield i
+        finally:
+            cleaned_up.append(True)
+
+    async def consume():
+        generator = stream()
+        await generator.__anext__()
+        await generator.aclose()
+        assert cleaned_up == [True]
+
+    asyncio.run(consume())
+
+def test_errors_keep_their_traceback():
+    exported = []
+    tracer = _tracer(exported)
+
+    @tracer.track
+    def fail():
+        raise ValueError("boom")
+
+    try:
+        fail()
+    except ValueError:
+        pass
+
+    assert tracer.flush()
+    assert isinstance(exported[0].error, ValueError)
+    assert "cancelled" not in exported[0].metadata
@@ -0,0 +1,205 @@
+"""Tests for the LLM rate limiter, against the stub LLM server."""
+
+import time
+import asyncio
+import threading
+from email.utils import formatdate
+import openai
+import pytest
+from benchmarks.stub_llm_server import start_stub_server, DEFAULT_ANSWER
+from rag.rate_limiter import LLMRateLimiter, TokenBucket, _retry_after
+
+MESSAGES = [{"role": "user", "content": "Why did the colonies declare independence?"}]
+COMPLETION_TOKENS = len(DEFAULT_ANSWER.split())
+
+@pytest.fixture(scope="module")
+def server():
+    server = start_stub_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def stub(server):
+    """Reconfigure the shared stub server and reset its counters."""
+    defaults = dict(server.settings)
+
+    def configure(**settings):
+        server.settings.update(settings)
+        server.stats.update({name: 0 for name in server.stats})
+        return server
+
+    yield configure
+    server.settings.update(defaults)
+
+def _client(server):
+    return openai.OpenAI(base_url=server.base_url, api_key="stub", max_retries=0)
+
+def _async_client(server):
+    return openai.AsyncOpenAI(base_url=server.base_url, api_key="stub", max_retries=0)
+
+def _complete(client):
+    """One chat completion; returns a coroutine with an AsyncOpenAI client."""
+    return client.chat.completions.create(model="stub", messages=MESSAGES)
+
+def _throttled_error(server):
+    """The error the OpenAI client raises for the stub's first (429) answer."""
+    with pytest.raises(openai.RateLimitError) as info:
+        _complete(_client(server))
+    return info.value
+
+def test_retry_after_seconds(stub):
+    assert _retry_after(_throttled_error(stub(throttle_first=1, retry_after=2))) == 2.0
+
+def test_retry_after_ms_takes_precedence(stub):
+    assert _retry_after(_throttled_error(stub(throttle_first=1, retry_after=2, retry_after_ms=150))) == 0.15
+
+def test_retry_after_http_date(stub):
+    error = _throttled_error(stub(throttle_first=1, retry_after=formatdate(time.time() + 30, usegmt=True)))
+    assert 28 <= _retry_after(error) <= 30
+
+def test_retry_after_missing_or_invalid(stub):
+    assert _retry_after(_throttled_error(stub(throttle_first=1))) is None
+    assert _retry_after(_throttled_error(stub(throttle_first=1, retry_after="soon"))) is None
+
+def test_call_waits_for_retry_after(stub):
+    server = stub(throttle_first=2, retry_after=0.2)
+    limiter = LLMRateLimiter(max_retries=3, backoff=0)
+    client = _client(server)
+
+    start = time.perf_counter()
+    response = limiter.call(lambda: _complete(client))
+
+    assert response.choices[0].message.content == DEFAULT_ANSWER
+    assert time.perf_counter() - start >= 0.4
+    stats = limiter.stats()
+    assert (stats["throttled"], stats["retries"], stats["succeeded"]) == (2, 2, 1)
+    assert stats["retry_wait_total"] == pytest.approx(0.4)
+    assert stats["in_flight"] == 0
+
+def test_call_gives_up_after_max_retries(stub):
+    server = stub(throttle_first=10, retry_after=0)
+    limiter = LLMRateLimiter(max_retries=2, backoff=0)
+    client = _client(server)
+
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(lambda: _complete(client))
+
+    stats = limiter.stats()
+    assert server.stats["requests"] == 3
+    assert (stats["throttled"], stats["failed"], stats["in_flight"]) == (3, 1, 0)
+
+def test_slots_are_handed_over_in_arrival_order(stub):
+    server = stub()
+    limiter = LLMRateLimiter(max_concurrency=1)
+    client = _client(server)
+    limiter.call(lambda: _complete(client), keep_slot=True)
+
+    order = []
+
+    def request(index):
+        order.append(index)
+        return _complete(client)
+
+    threads = []
+    for index in range(4):
+        thread = threading.Thread(target=limiter.call, args=(lambda index=index: request(index),))
+        thread.start()
+        threads.append(thread)
+        # Queue the next thread only once this one waits
+        while limiter.stats()["queue_depth"] < index + 1:
+            time.sleep(0.001)
+
+    limiter.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == [0, 1, 2, 3]
+    assert server.stats["max_in_flight"] == 1
+    assert limiter.stats()["in_flight"] == 0
+
+def test_cancelled_waiter_leaves_the_queue(stub):
+    server = stub()
+    limiter = LLMRateLimiter(max_concurrency=1)
+
+    async def run():
+        client = _async_client(server)
+        await limiter.call_async(lambda: _complete(client), keep_slot=True)
+        waiter = asyncio.create_task(limiter.call_async(lambda: _complete(client)))
+        while limiter.stats()["queue_depth"] < 1:
+            await asyncio.sleep(0.001)
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert (limiter.stats()["queue_depth"], limiter.stats()["in_flight"]) == (0, 1)
+
+        limiter.release()
+        await limiter.call_async(lambda: _complete(client))
+        await client.close()
+
+    asyncio.run(run())
+    assert limiter.stats()["in_flight"] == 0
+
+def test_slot_handed_to_a_cancelled_waiter_is_released(stub):
+    server = stub()
+    limiter = LLMRateLimiter(max_concurrency=1)
+
+    async def run():
+        client = _async_client(server)
+        await limiter.call_async(lambda: _complete(client), keep_slot=True)
+        waiter = asyncio.create_task(limiter.call_async(lambda: _complete(client)))
+        while limiter.stats()["queue_depth"] < 1:
+            await asyncio.sleep(0.001)
+
+        # The slot goes to the waiter, which is cancelled before it wakes up
+        limiter.release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await client.close()
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert (stats["in_flight"], stats["requests"]) == (0, 1)
+
+def test_cancelled_call_releases_its_slot(stub):
+    server = stub(latency=1.0)
+    limiter = LLMRateLimiter(max_concurrency=1)
+
+    async def run():
+        client = _async_client(server)
+        call = asyncio.create_task(limiter.call_async(lambda: _complete(client)))
+        while server.stats["in_flight"] < 1:
+            await asyncio.sleep(0.001)
+
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        assert limiter.stats()["in_flight"] == 0
+        await client.close()
+        # Let the stub finish the abandoned request before the next test reuses it
+        while server.stats["in_flight"]:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+
+def test_token_bucket_refunds_the_estimate_minus_the_usage(stub):
+    server = stub()
+    limiter = LLMRateLimiter(tokens_per_minute=600)
+    client = _client(server)
+
+    limiter.call(lambda: _complete(client), tokens=500)
+    assert 600 - COMPLETION_TOKENS <= limiter.stats()["tokens_available"] < 600 - COMPLETION_TOKENS + 5
+
+def test_token_bucket_charges_usage_above_the_estimate(stub):
+    server = stub()
+    limiter = LLMRateLimiter(tokens_per_minute=600)
+    client = _client(server)
+
+    limiter.call(lambda: _complete(client), tokens=1)
+    assert 600 - COMPLETION_TOKENS <= limiter.stats()["tokens_available"] < 600 - COMPLETION_TOKENS + 5
+
+def test_token_bucket_overdraw_waits_for_the_refill():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0, abs=0.05)
+    bucket.refund(2)
+    assert bucket.available() == pytest.approx(0.0, abs=0.05)
@@ -0,0 +1,57 @@
+"""Tests for the semantic answer cache's matching of similar queries."""
+
+import pytest
+from utils.embeddings import HashingEmbedder
+from rag.semantic_cache import SemanticCache, query_terms
+
+# Questions that embed almost identically but must not share an answer
+DIFFERENT_QUESTIONS = [
+    ("What did John Adams write to Abigail Adams in 1776?",
+     "What did Abigail Adams write to John Adams in 1776?"),
+    ("What did Thomas Jefferson write in the Declaration of Independence in 1776?",
+     "What did Thomas Jefferson write in the Declaration of Independence in 1775?"),
+    ("What arguments did Thomas Paine make in Common Sense for American independence from Britain?",
+     "What arguments did Thomas Paine make in Common Sense against American independence from Britain?"),
+    ("Did the Continental Congress declare independence?",
+     "Did the Continental Congress not declare independence?"),
+    ("What did Thomas Paine write about King George?",
+     "What did Thomas Jefferson write about King George?")
+]
+
+def _cache():
+    return SemanticCache(HashingEmbedder(), generation_fn=lambda: 0)
+
+def _store(cache, query):
+    cache.store(query, "historian", 5, {"query": query, "response": f"Answer to {query}", "metrics": {}})
+
+@pytest.mark.parametrize("stored, asked", DIFFERENT_QUESTIONS + [(b, a) for a, b in DIFFERENT_QUESTIONS])
+def test_different_questions_miss(stored, asked):
+    cache = _cache()
+    _store(cache, stored)
+
+    result, _ = cache.lookup(asked, "historian", 5)
+
+    assert result is None
+    assert cache.get_stats()["misses"] == 1
+
+def test_same_question_hits():
+    cache = _cache()
+    _store(cache, "What did Thomas Paine argue in Common Sense?")
+
+    result, _ = cache.lookup("what did thomas paine argue in  common sense", "historian", 5)
+
+    assert result is not None
+    assert result["response"] == "Answer to What did Thomas Paine argue in Common Sense?"
+    assert result["cache"]["hit"]
+
+def test_mode_and_limit_are_part_of_the_key():
+    cache = _cache()
+    _store(cache, "What did Thomas Paine argue in Common Sense?")
+
+    assert cache.lookup("What did Thomas Paine argue in Common Sense?", "founding_father", 5)[0] is None
+    assert cache.lookup("What did Thomas Paine argue in Common Sense?", "historian", 3)[0] is None
+
+def test_query_terms_keep_numbers_names_and_negations():
+    assert query_terms("Did the Congress not declare independence in 1776?") == frozenset(
+        ["did", "congress", "not", "declare", "independence", "1776"]
+    )
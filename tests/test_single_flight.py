@@ -0,0 +1,222 @@
+"""Tests for single-flight coalescing of identical in-flight requests."""
+
+import time
+import asyncio
+import threading
+import pytest
+from rag.single_flight import SingleFlight, request_key
+
+def _wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def _follow(single_flight, key, fn):
+    """Start a follower thread once the leader is in flight; returns its thread and outcome."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = single_flight.do(key, fn)
+        except Exception as e:
+            outcome["error"] = e
+
+    followers = single_flight.get_stats()["followers"]
+    thread = threading.Thread(target=run)
+    thread.start()
+    _wait_until(lambda: single_flight.get_stats()["followers"] > followers)
+    return thread, outcome
+
+def test_request_key_normalizes_the_query():
+    assert request_key("  What did  PAINE say? ", "historian", 5) == request_key("what did paine say?", "historian", 5)
+    assert request_key("What did Paine say?", "historian", 5) != request_key("What did Paine say?", "historian", 3)
+
+def test_follower_receives_the_leaders_result():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(True)
+        release.wait(5)
+        return {"response": "shared"}
+
+    leader = {}
+    thread = threading.Thread(target=lambda: leader.update(result=single_flight.do("key", compute)))
+    thread.start()
+    _wait_until(lambda: calls)
+
+    follower_thread, follower = _follow(single_flight, "key", compute)
+    release.set()
+    thread.join(5)
+    follower_thread.join(5)
+
+    assert leader["result"] == ({"response": "shared"}, False)
+    assert follower["result"] == ({"response": "shared"}, True)
+    assert len(calls) == 1
+    assert single_flight.get_stats() == {"leaders": 1, "followers": 1, "llm_calls_saved": 1, "in_flight": 0}
+
+def test_follower_receives_the_leaders_exception():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    started = threading.Event()
+    error = ValueError("generation failed")
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise error
+
+    leader = {}
+
+    def lead():
+        try:
+            single_flight.do("key", compute)
+        except ValueError as e:
+            leader["error"] = e
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    started.wait(5)
+
+    follower_thread, follower = _follow(single_flight, "key", compute)
+    release.set()
+    thread.join(5)
+    follower_thread.join(5)
+
+    assert leader["error"] is error
+    assert follower["error"] is error
+
+def test_key_is_released_after_completion():
+    single_flight = SingleFlight()
+    calls = []
+
+    assert single_flight.do("key", lambda: calls.append(1) or len(calls)) == (1, False)
+    assert single_flight.get_stats()["in_flight"] == 0
+    # A later request runs again instead of reusing the finished result
+    assert single_flight.do("key", lambda: calls.append(1) or len(calls)) == (2, False)
+
+    with pytest.raises(ValueError):
+        single_flight.do("failing", lambda: int("x"))
+    assert single_flight.get_stats()["in_flight"] == 0
+
+def test_late_stream_follower_replays_earlier_events():
+    single_flight = SingleFlight()
+    gate = threading.Event()
+
+    def make_events():
+        yield "sources"
+        yield "token"
+        gate.wait(5)
+        yield "done"
+
+    leader = single_flight.stream("key", make_events)
+    assert next(leader) == ("sources", False)
+    assert next(leader) == ("token", False)
+
+    follower = single_flight.stream("key", make_events)
+    assert next(follower) == ("sources", True)
+    gate.set()
+
+    assert list(leader) == [("done", False)]
+    assert list(follower) == [("token", True), ("done", True)]
+    _wait_until(lambda: single_flight.get_stats()["in_flight"] == 0)
+
+def test_stream_error_reaches_every_reader():
+    single_flight = SingleFlight()
+    gate = threading.Event()
+
+    def make_events():
+        yield "sources"
+        gate.wait(5)
+        raise ValueError("stream failed")
+
+    leader = single_flight.stream("key", make_events)
+    assert next(leader) == ("sources", False)
+    follower = single_flight.stream("key", make_events)
+    gate.set()
+
+    with pytest.raises(ValueError):
+        list(leader)
+    with pytest.raises(ValueError):
+        list(follower)
+
+def test_async_followers_share_one_computation():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(True)
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def run():
+        results = await asyncio.gather(*(single_flight.do_async("key", compute) for _ in range(5)))
+        assert single_flight.get_stats()["in_flight"] == 0
+        return results
+
+    results = asyncio.run(run())
+    assert results == [("shared", False)] + [("shared", True)] * 4
+    assert len(calls) == 1
+
+def test_async_followers_receive_the_leaders_exception():
+    single_flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("generation failed")
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do_async("key", compute) for _ in range(3)),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert errors[0] is errors[1] is errors[2]
+    assert single_flight.get_stats()["in_flight"] == 0
+
+def test_cancelling_the_async_leader_does_not_cancel_followers():
+    single_flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def run():
+        leader = asyncio.create_task(single_flight.do_async("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.do_async("key", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == ("shared", True)
+
+def test_late_async_stream_follower_replays_earlier_events():
+    single_flight = SingleFlight()
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def make_events():
+            yield "sources"
+            yield "token"
+            await gate.wait()
+            yield "done"
+
+        leader = single_flight.stream_async("key", make_events)
+        assert await leader.__anext__() == ("sources", False)
+        assert await leader.__anext__() == ("token", False)
+
+        follower = single_flight.stream_async("key", make_events)
+        assert await follower.__anext__() == ("sources", True)
+        gate.set()
+
+        assert [event async for event in leader] == [("done", False)]
+        assert [event async for event in follower] == [("token", True), ("done", True)]
+        assert single_flight.get_stats()["in_flight"] == 0
+
+    asyncio.run(run())
@@ -6,9 +6,12 @@ import os
 import logging
 import gradio as gr
 from utils.config import get_config, configure_logging
-from database.weaviate_client import connect_to_weaviate
-from database.schema import get_collection
-from rag.independence_rag import independence_rag
+from database.connection_manager import get_connection_manager
+from data.sources import get_all_sources
+from rag.filters import build_filters
+from rag.semantic_cache import cached_independence_rag, cached_independence_rag_stream
+from rag.metrics import track_request
+from rag.retriever import preload_query_vectorizer
 
 # Configure logging
 configure_logging()
@@ -22,7 +25,44 @@ def format_sources(sources):
     """Format sources for display."""
     return "\n".join([f"- {source}" for source in sources])
 
-def process_query(query, mode, limit):
+def get_filter_choices():
+    """
+    Get the values offered by the filter controls.
+    
+    Returns:
+        dict: Sorted document types, authors and recipients of the known sources
+    """
+    sources = get_all_sources()
+    return {
+        "document_types": sorted({source["type"] for source in sources}),
+        "authors": sorted({author for source in sources for author in source["authors"]}),
+        "recipients": sorted({source["recipient"] for source in sources if source.get("recipient")})
+    }
+
+def build_filter_args(date_from, date_to, document_types, authors, recipient):
+    """Collect the filter control values into the filters dict used by the RAG pipeline."""
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "document_types": document_types,
+        "authors": authors,
+        "recipient": recipient
+    }
+
+def validate_filters(filters):
+    """
+    Check that the filters compile, such as dates being well formed.
+    
+    Returns:
+        str: Message for the user, or None if the filters are valid
+    """
+    try:
+        build_filters(filters)
+    except ValueError as e:
+        return f"Invalid filter: {str(e)}"
+    return None
+
+def process_query(query, mode, limit, filters=None):
     """
     Process a user query and return formatted results.
     
@@ -30,6 +70,7 @@ def process_query(query, mode, limit):
         query (str): User query
         mode (str): Response mode
         limit (int): Number of documents to retrieve
+        filters (dict, optional): Date range, document type, author and recipient filters
         
     Returns:
         tuple: (response, sources)
@@ -37,31 +78,90 @@ def process_query(query, mode, limit):
     if not query.strip():
         return "Please enter a question about American Independence.", ""
     
+    error = validate_filters(filters)
+    if error:
+        return error, ""
+    
     try:
-        # Connect to Weaviate
-        client = connect_to_weaviate()
-        collection = get_collection(client)
-        
-        if not collection:
-            return "Error: Could not connect to document database.", ""
-        
-        # Process the query
-        result = independence_rag(
-            collection=collection,
-            query=query,
-            mode=mode,
-            limit=int(limit)
-        )
+        # Check out a pooled Weaviate connection and process the query
+        with track_request("gradio", mode, int(limit)) as request_metrics, \
+                get_connection_manager().collection() as collection:
+            result = cached_independence_rag(
+                collection=collection,
+                query=query,
+                mode=mode,
+                limit=int(limit),
+                filters=filters
+            )
+            request_metrics.set_result(result)
         
         response = result["response"]
         sources = format_sources(result["sources"])
         
         return response, sources
     
+    except ConnectionError as e:
+        logger.error(f"Error connecting to document database: {str(e)}")
+        return "Error: Could not connect to document database.", ""
+    
     except Exception as e:
         logger.exception(f"Error processing query: {str(e)}")
         return f"An error occurred: {str(e)}", ""
 
+def process_query_stream(query, mode, limit, filters=None):
+    """
+    Process a user query and stream the response as it is generated.
+    
+    Args:
+        query (str): User query
+        mode (str): Response mode
+        limit (int): Number of documents to retrieve
+        filters (dict, optional): Date range, document type, author and recipient filters
+        
+    Yields:
+        tuple: (response so far, sources)
+    """
+    if not query.strip():
+        yield "Please enter a question about American Independence.", ""
+        return
+    
+    error = validate_filters(filters)
+    if error:
+        yield error, ""
+        return
+    
+    try:
+        with track_request("gradio-stream", mode, int(limit)) as request_metrics:
+            # The pooled connection is only needed until retrieval has finished
+            with get_connection_manager().collection() as collection:
+                events = cached_independence_rag_stream(
+                    collection=collection,
+                    query=query,
+                    mode=mode,
+                    limit=int(limit),
+                    filters=filters
+                )
+                sources_event = next(events)
+            
+            sources = format_sources(sources_event["sources"])
+            yield "", sources
+            
+            response = ""
+            for event in events:
+                if event["type"] == "token":
+                    response += event["text"]
+                    yield response, sources
+                elif event["type"] == "done":
+                    request_metrics.set_result(event["result"])
+    
+    except ConnectionError as e:
+        logger.error(f"Error connecting to document database: {str(e)}")
+        yield "Error: Could not connect to document database.", ""
+    
+    except Exception as e:
+        logger.exception(f"Error processing query: {str(e)}")
+        yield f"An error occurred: {str(e)}", ""
+
 def create_gradio_interface():
     """Create and configure the Gradio interface."""
     # Create the interface
@@ -97,6 +197,27 @@ def create_gradio_interface():
                     step=1
                 )
         
+        filter_choices = get_filter_choices()
+        with gr.Accordion("Filter Documents", open=False):
+            with gr.Row():
+                date_from_input = gr.Textbox(label="From Date", placeholder="1776 or 1776-03-31")
+                date_to_input = gr.Textbox(label="To Date", placeholder="1776 or 1776-12-31")
+                recipient_dropdown = gr.Dropdown(
+                    label="Recipient",
+                    choices=filter_choices["recipients"],
+                    value=None
+                )
+            with gr.Row():
+                type_checkboxes = gr.CheckboxGroup(
+                    label="Document Types",
+                    choices=filter_choices["document_types"]
+                )
+                author_dropdown = gr.Dropdown(
+                    label="Authors",
+                    choices=filter_choices["authors"],
+                    multiselect=True
+                )
+        
         submit_btn = gr.Button("Ask About Independence")
         
         with gr.Row():
@@ -122,10 +243,16 @@ def create_gradio_interface():
                     return k
             return config["default_mode"]
         
+        def handle_submit(query, mode_value, limit, date_from, date_to, document_types, authors, recipient):
+            """Stream the answer into the response textbox."""
+            filters = build_filter_args(date_from, date_to, document_types, authors, recipient)
+            yield from process_query_stream(query, get_mode_key(mode_value), limit, filters=filters)
+        
         # Handle form submission
         submit_btn.click(
-            fn=lambda q, m, l: process_query(q, get_mode_key(m), l),
-            inputs=[query_input, mode_dropdown, limit_slider],
+            fn=handle_submit,
+            inputs=[query_input, mode_dropdown, limit_slider, date_from_input, date_to_input,
+                    type_checkboxes, author_dropdown, recipient_dropdown],
             outputs=[response_output, sources_output]
         )
     
@@ -133,7 +260,10 @@ def create_gradio_interface():
 
 def run_app():
     """Run the Gradio app."""
+    preload_query_vectorizer()
     demo = create_gradio_interface()
+    # Queuing is required for streaming (generator) event handlers
+    demo.queue()
     demo.launch(share=True)
 
 if __name__ == "__main__":
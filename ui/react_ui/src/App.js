@@ -4,6 +4,7 @@ import './styles/App.css';
 import Chat from './components/Chat';
 import Documents from './components/Documents';
 import Timeline from './components/Timeline';
+import Filters from './components/Filters';
 
 function App() {
   const [query, setQuery] = useState('');
@@ -12,6 +13,7 @@ function App() {
   const [response, setResponse] = useState('');
   const [sources, setSources] = useState([]);
   const [selectedTab, setSelectedTab] = useState('chat');
+  const [filters, setFilters] = useState({});
 
   // Mock API call - in real app, this would call your backend
   const handleSubmit = async (e) => {
@@ -30,7 +32,9 @@ function App() {
         body: JSON.stringify({
           query,
           mode,
-          limit: 5
+          limit: 5,
+          // Evaluated by Weaviate together with the vector search
+          filters
         }),
       });
       
@@ -106,6 +110,8 @@ function App() {
             </div>
           </div>
           
+          <Filters filters={filters} setFilters={setFilters} />
+
           <div className="p-4 border-t border-gray-200">
             <h2 className="font-semibold text-gray-600 mb-2">Example Questions</h2>
             <ul className="text-sm space-y-1 text-gray-600">
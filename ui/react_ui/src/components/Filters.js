@@ -0,0 +1,122 @@
+import React from 'react';
+import { Calendar, FileText, User } from 'lucide-react';
+
+// Values of the metadata stored with each chunk (see data/sources.py)
+const documentTypes = [
+  { value: 'founding_document', label: 'Founding Documents' },
+  { value: 'pamphlet', label: 'Pamphlets' },
+  { value: 'letter', label: 'Letters' },
+  { value: 'speech', label: 'Speeches' },
+  { value: 'essay', label: 'Essays' }
+];
+
+const authors = [
+  'Abigail Adams',
+  'Alexander Hamilton',
+  'Constitutional Convention',
+  'Continental Congress',
+  'First Congress',
+  'James Madison',
+  'Patrick Henry',
+  'Thomas Jefferson',
+  'Thomas Paine'
+];
+
+const recipients = ['John Adams'];
+
+function Filters({ filters, setFilters }) {
+  const update = (key, value) => {
+    setFilters({ ...filters, [key]: value });
+  };
+
+  const toggle = (key, value) => {
+    const current = filters[key] || [];
+    update(key, current.includes(value) ? current.filter(v => v !== value) : [...current, value]);
+  };
+
+  const hasFilters = Object.values(filters).some(v => (Array.isArray(v) ? v.length > 0 : Boolean(v)));
+
+  return (
+    <div className="p-4 border-t border-gray-200">
+      <div className="flex items-center justify-between mb-2">
+        <h2 className="font-semibold text-gray-600">Filter Documents</h2>
+        {hasFilters && (
+          <button
+            className="text-xs text-blue-600 hover:text-blue-800"
+            onClick={() => setFilters({})}
+          >
+            Clear
+          </button>
+        )}
+      </div>
+
+      <div className="flex items-center text-xs font-medium text-gray-600 mb-1">
+        <Calendar className="w-3 h-3 mr-1" />
+        <span>Date range</span>
+      </div>
+      <div className="flex space-x-2 mb-3">
+        <input
+          type="text"
+          placeholder="From (1776)"
+          className="w-1/2 py-1 px-2 text-sm border border-gray-300 rounded-md"
+          value={filters.date_from || ''}
+          onChange={(e) => update('date_from', e.target.value)}
+        />
+        <input
+          type="text"
+          placeholder="To (1776-12)"
+          className="w-1/2 py-1 px-2 text-sm border border-gray-300 rounded-md"
+          value={filters.date_to || ''}
+          onChange={(e) => update('date_to', e.target.value)}
+        />
+      </div>
+
+      <div className="flex items-center text-xs font-medium text-gray-600 mb-1">
+        <FileText className="w-3 h-3 mr-1" />
+        <span>Document type</span>
+      </div>
+      <div className="space-y-1 mb-3">
+        {documentTypes.map(type => (
+          <label key={type.value} className="flex items-center text-sm text-gray-600">
+            <input
+              type="checkbox"
+              className="mr-2"
+              checked={(filters.document_types || []).includes(type.value)}
+              onChange={() => toggle('document_types', type.value)}
+            />
+            {type.label}
+          </label>
+        ))}
+      </div>
+
+      <div className="flex items-center text-xs font-medium text-gray-600 mb-1">
+        <User className="w-3 h-3 mr-1" />
+        <span>Author</span>
+      </div>
+      <select
+        multiple
+        className="w-full py-1 px-2 text-sm border border-gray-300 rounded-md mb-3"
+        value={filters.authors || []}
+        onChange={(e) => update('authors', Array.from(e.target.selectedOptions, option => option.value))}
+      >
+        {authors.map(author => (
+          <option key={author} value={author}>{author}</option>
+        ))}
+      </select>
+
+      <div className="text-xs font-medium text-gray-600 mb-1">Recipient</div>
+      <select
+        className="w-full py-1 px-2 text-sm border border-gray-300 rounded-md"
+        value={filters.recipient || ''}
+        onChange={(e) => update('recipient', e.target.value)}
+      >
+        <option value="">Any</option>
+        {recipients.map(recipient => (
+          <option key={recipient} value={recipient}>{recipient}</option>
+        ))}
+      </select>
+    </div>
+  );
+}
+
+export default Filters;
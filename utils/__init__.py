@@ -2,14 +2,78 @@
 Utility functions for the Voices of Independence project.
 """
 
-from .opik_tracking import opik, setup_openai_tracking
-from .config import get_config, configure_logging
-from .visualization import create_timeline_visualization
+from .lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    ".opik_tracking": [
+        'opik',
+        'Tracer',
+        'setup_openai_tracking',
+        'log_metrics'
+    ],
+    ".config": [
+        'get_config',
+        'reload_config',
+        'configure_logging'
+    ],
+    ".cache": [
+        'stable_hash',
+        'JSONDiskCache',
+        'LRUCache'
+    ],
+    ".tokens": [
+        'count_tokens'
+    ],
+    ".embeddings": [
+        'get_embedder',
+        'get_client_embedder'
+    ],
+    ".embedding_cache": [
+        'EmbeddingCache',
+        'get_embedding_cache',
+        'embed_texts'
+    ],
+    ".metrics": [
+        'Counter',
+        'Gauge',
+        'Histogram',
+        'MetricsRegistry',
+        'get_registry',
+        'merge_snapshots',
+        'render_prometheus',
+        'write_prometheus'
+    ],
+    ".visualization": [
+        'render_timeline',
+        'create_timeline_visualization'
+    ]
+})
 
 __all__ = [
     'opik',
+    'Tracer',
     'setup_openai_tracking',
+    'log_metrics',
     'get_config',
+    'reload_config',
     'configure_logging',
+    'stable_hash',
+    'JSONDiskCache',
+    'LRUCache',
+    'count_tokens',
+    'get_embedder',
+    'get_client_embedder',
+    'EmbeddingCache',
+    'get_embedding_cache',
+    'embed_texts',
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'MetricsRegistry',
+    'get_registry',
+    'merge_snapshots',
+    'render_prometheus',
+    'write_prometheus',
+    'render_timeline',
     'create_timeline_visualization'
-]
\ No newline at end of file
+]
@@ -0,0 +1,160 @@
+"""
+Caching helpers shared across the project.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def stable_hash(*parts):
+    """
+    Hash arbitrary JSON-serializable values into a stable hex digest.
+
+    Args:
+        *parts: Values to hash; dict keys are sorted so ordering does not matter
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class JSONDiskCache:
+    """
+    On-disk cache of JSON values keyed by hex digest.
+
+    Writes are atomic (write to a temporary file, then rename), so concurrent
+    threads and processes can share one cache directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {str(e)}")
+            return None
+
+    def set(self, key, value):
+        """
+        Store a value.
+
+        Args:
+            key (str): Cache key
+            value: JSON-serializable value
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with an optional TTL.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key, default=None):
+        """
+        Look up a value and mark it as recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            item = self._data.get(key, self._MISSING)
+            if item is not self._MISSING and self.ttl is not None and time.monotonic() - item[1] > self.ttl:
+                del self._data[key]
+                item = self._MISSING
+
+            if item is self._MISSING:
+                self._stats["misses"] += 1
+                return default
+
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return item[0]
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def get_stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hits, misses, evictions and current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._data)
+        return stats
@@ -4,11 +4,23 @@ Configuration management for the application.
 
 import os
 import logging
-from dotenv import load_dotenv
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
+_environment_loaded = False
+
+def load_environment():
+    """Load variables from the .env file into the environment, once per process."""
+    global _environment_loaded
+
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
+
+# Every module reads its settings through this one, so .env is loaded on first import
+load_environment()
+
 # Default configuration
 DEFAULT_CONFIG = {
     "response_modes": {
@@ -18,23 +30,259 @@ DEFAULT_CONFIG = {
     },
     "default_mode": "historian",
     "default_search_limit": 5,
+    # "vector" (near_text / near_vector) or "hybrid" (BM25 + vector, fused)
+    "search_mode": "vector",
+    "hybrid_alpha": 0.5,  # 1 is pure vector search, 0 pure keyword search
+    "hybrid_fusion": "relative_score",  # or "ranked"
+    "hybrid_query_properties": ["text", "title"],
     "chunk_size": 1000,
     "chunk_overlap": 200,
-    "batch_size": 10
+    "chunk_unit": "chars",  # "chars" or "tokens"
+    # Maximum tokens of retrieved documents in the prompt, per response mode (None: no limit)
+    "context_token_budgets": {
+        "historian": 2000,
+        "founding_father": 1200,
+        "time_traveler": 1500
+    },
+    "batch_size": 10,
+    # "weaviate" (Weaviate Cloud) or "local" (in-process NumPy index, see database/local_index.py)
+    "vector_backend": "weaviate",
+    "local_index_dir": None,  # defaults to <cache_dir>/local_index
+    "weaviate_pool_size": 4,
+    "weaviate_pool_timeout": 30.0,
+    "weaviate_health_check_interval": 30.0,
+    "friendli_base_url": "https://api.friendli.ai/serverless/v1",
+    "llm_max_connections": 20,
+    "llm_max_keepalive_connections": 10,
+    "llm_keepalive_expiry": 30.0,
+    "llm_timeout": 120.0,
+    "llm_connect_timeout": 10.0,
+    # Shared limiter in front of every LLM call (rag/rate_limiter.py); 0 disables a rate limit
+    "llm_requests_per_minute": 0,
+    "llm_tokens_per_minute": 0,
+    "llm_expected_completion_tokens": 512,  # charged to the token budget until usage is known
+    "llm_max_concurrency": 16,  # starting and highest concurrency limit
+    "llm_min_concurrency": 1,
+    "llm_max_retries": 4,
+    "llm_retry_backoff": 0.5,
+    "llm_retry_max_delay": 30.0,
+    "llm_latency_tolerance": 2.0,
+    "cache_dir": ".cache",
+    "evaluation_max_concurrency": 4,
+    "api_host": "127.0.0.1",
+    "api_port": 8000,
+    "api_workers": 1,
+    "api_max_concurrency": 32,  # requests answered at once per worker
+    "api_max_queue": 64,  # requests waiting per worker before 503s
+    "api_queue_timeout": 10.0,
+    "api_retry_after": 1,
+    "api_max_query_chars": 2000,
+    "api_static_dir": None,  # built React app served at /
+    "api_allow_evaluate": False,  # "evaluate": true adds two judge LLM calls and skips the semantic cache
+    "batch_max_concurrency": 8,  # LLM calls in flight in independence_rag_batch
+    "batch_retrieval_size": 32,  # distinct questions retrieved per group
+    "semantic_cache_enabled": True,
+    "semantic_cache_embedder": "hashing",
+    "semantic_cache_threshold": 0.98,
+    "semantic_cache_max_entries": 1024,
+    "semantic_cache_ttl": 3600.0,
+    "single_flight_enabled": True,  # answer identical concurrent requests once
+    # Tracing (utils/opik_tracking.py); read when the tracer is created at import
+    "tracing_enabled": True,
+    "tracing_sample_rate": 1.0,  # share of requests traced
+    "tracing_sample_rates": {},  # per entry point span name, e.g. {"cached-independence-rag": 0.05}
+    "tracing_max_depth": 4,  # spans nested deeper than this are not recorded
+    "tracing_trace_helpers": False,  # also record trivial helpers such as get_system_prompt
+    "tracing_buffer_size": 10000,  # finished spans waiting for export before new ones are dropped
+    "tracing_flush_interval": 1.0,
+    # Metrics (utils/metrics.py, rag/metrics.py)
+    "metrics_enabled": True,
+    "metrics_file": None,  # Prometheus text file rewritten every metrics_export_interval
+    "metrics_dir": None,  # API workers write snapshots here and /metrics merges them
+    "metrics_export_interval": 15.0,
+    # Timeline images (utils/visualization.py)
+    "timeline_max_labels": 40,  # denser timelines label one document per stretch of time
+    "timeline_cache_size": 32,  # rendered images kept in memory
+    "timeline_cache_dir": None,  # defaults to <cache_dir>/timeline
+    # Local model matching the collection's vectorizer, e.g.
+    # "sentence-transformers/multi-qa-MiniLM-L6-cos-v1"; None disables query-vector caching
+    "query_vectorizer": None,
+    # "server": Weaviate's text2vec-transformers module embeds chunks and queries.
+    # "client": chunks and queries are embedded locally with embedding_model
+    # and imported with their vectors (the collection has no vectorizer).
+    "embedding_mode": "server",
+    "embedding_model": "sentence-transformers/multi-qa-MiniLM-L6-cos-v1",
+    "embedding_batch_size": 256,
+    "embedding_cache_enabled": True,
+    "embedding_cache_path": None,  # defaults to <cache_dir>/embeddings.sqlite3
+    "query_vector_cache_size": 4096,
+    "fetch_max_workers": 8,
+    "fetch_per_host_limit": 2,
+    "fetch_retries": 3,
+    "fetch_backoff": 0.5,
+    "fetch_timeout": 30.0,
+    "fetch_cache_enabled": True,
+    "fetch_cache_dir": None,  # defaults to <cache_dir>/fetch
+    "fetch_cache_max_age": 7 * 24 * 3600.0,
+    "fetch_offline": False
 }
 
+_config = None
+
 def get_config():
     """
     Get application configuration from environment variables.
     
+    The environment is read on the first call and the result is shared, since
+    settings are looked up on every request; call reload_config() after
+    changing the environment.
+    
+    Returns:
+        dict: Configuration dictionary, shared by all callers (do not modify it)
+    """
+    config = _config
+    if config is None:
+        config = reload_config()
+    return config
+
+def reload_config():
+    """
+    Read the configuration from the environment again.
+    
+    Singletons already created from the old configuration (clients, caches,
+    limiters) keep their settings.
+    
     Returns:
-        dict: Configuration dictionary
+        dict: New configuration dictionary
     """
+    global _config
+
+    _config = _read_config()
+    return _config
+
+def _read_config():
     config = DEFAULT_CONFIG.copy()
     
     # Override defaults with environment variables
     config["default_mode"] = os.getenv('DEFAULT_RESPONSE_MODE', config["default_mode"])
     config["default_search_limit"] = int(os.getenv('DEFAULT_SEARCH_LIMIT', config["default_search_limit"]))
+    config["search_mode"] = os.getenv('SEARCH_MODE', config["search_mode"])
+    config["hybrid_alpha"] = float(os.getenv('HYBRID_ALPHA', config["hybrid_alpha"]))
+    config["hybrid_fusion"] = os.getenv('HYBRID_FUSION', config["hybrid_fusion"])
+    if os.getenv('HYBRID_QUERY_PROPERTIES'):
+        config["hybrid_query_properties"] = os.getenv('HYBRID_QUERY_PROPERTIES').split(",")
+    config["chunk_size"] = int(os.getenv('CHUNK_SIZE', config["chunk_size"]))
+    config["chunk_overlap"] = int(os.getenv('CHUNK_OVERLAP', config["chunk_overlap"]))
+    config["chunk_unit"] = os.getenv('CHUNK_UNIT', config["chunk_unit"])
+    if os.getenv('CONTEXT_TOKEN_BUDGET'):
+        # One budget for every mode
+        config["context_token_budgets"] = {
+            mode: int(os.getenv('CONTEXT_TOKEN_BUDGET')) for mode in config["response_modes"]
+        }
+    config["vector_backend"] = os.getenv('VECTOR_BACKEND', config["vector_backend"])
+    config["local_index_dir"] = os.getenv('LOCAL_INDEX_DIR', config["local_index_dir"])
+    config["weaviate_pool_size"] = int(os.getenv('WEAVIATE_POOL_SIZE', config["weaviate_pool_size"]))
+    config["weaviate_pool_timeout"] = float(os.getenv('WEAVIATE_POOL_TIMEOUT', config["weaviate_pool_timeout"]))
+    config["weaviate_health_check_interval"] = float(
+        os.getenv('WEAVIATE_HEALTH_CHECK_INTERVAL', config["weaviate_health_check_interval"])
+    )
+    config["friendli_base_url"] = os.getenv('FRIENDLI_BASE_URL', config["friendli_base_url"])
+    config["llm_max_connections"] = int(os.getenv('LLM_MAX_CONNECTIONS', config["llm_max_connections"]))
+    config["llm_max_keepalive_connections"] = int(
+        os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', config["llm_max_keepalive_connections"])
+    )
+    config["llm_keepalive_expiry"] = float(os.getenv('LLM_KEEPALIVE_EXPIRY', config["llm_keepalive_expiry"]))
+    config["llm_timeout"] = float(os.getenv('LLM_TIMEOUT', config["llm_timeout"]))
+    config["llm_connect_timeout"] = float(os.getenv('LLM_CONNECT_TIMEOUT', config["llm_connect_timeout"]))
+    config["llm_requests_per_minute"] = float(os.getenv('LLM_REQUESTS_PER_MINUTE', config["llm_requests_per_minute"]))
+    config["llm_tokens_per_minute"] = float(os.getenv('LLM_TOKENS_PER_MINUTE', config["llm_tokens_per_minute"]))
+    config["llm_expected_completion_tokens"] = int(
+        os.getenv('LLM_EXPECTED_COMPLETION_TOKENS', config["llm_expected_completion_tokens"])
+    )
+    config["llm_max_concurrency"] = int(os.getenv('LLM_MAX_CONCURRENCY', config["llm_max_concurrency"]))
+    config["llm_min_concurrency"] = int(os.getenv('LLM_MIN_CONCURRENCY', config["llm_min_concurrency"]))
+    config["llm_max_retries"] = int(os.getenv('LLM_MAX_RETRIES', config["llm_max_retries"]))
+    config["llm_retry_backoff"] = float(os.getenv('LLM_RETRY_BACKOFF', config["llm_retry_backoff"]))
+    config["llm_retry_max_delay"] = float(os.getenv('LLM_RETRY_MAX_DELAY', config["llm_retry_max_delay"]))
+    config["llm_latency_tolerance"] = float(os.getenv('LLM_LATENCY_TOLERANCE', config["llm_latency_tolerance"]))
+    config["cache_dir"] = os.getenv('CACHE_DIR', config["cache_dir"])
+    config["evaluation_max_concurrency"] = int(
+        os.getenv('EVALUATION_MAX_CONCURRENCY', config["evaluation_max_concurrency"])
+    )
+    config["api_host"] = os.getenv('API_HOST', config["api_host"])
+    config["api_port"] = int(os.getenv('API_PORT', config["api_port"]))
+    config["api_workers"] = int(os.getenv('API_WORKERS', config["api_workers"]))
+    config["api_max_concurrency"] = int(os.getenv('API_MAX_CONCURRENCY', config["api_max_concurrency"]))
+    config["api_max_queue"] = int(os.getenv('API_MAX_QUEUE', config["api_max_queue"]))
+    config["api_queue_timeout"] = float(os.getenv('API_QUEUE_TIMEOUT', config["api_queue_timeout"]))
+    config["api_retry_after"] = int(os.getenv('API_RETRY_AFTER', config["api_retry_after"]))
+    config["api_max_query_chars"] = int(os.getenv('API_MAX_QUERY_CHARS', config["api_max_query_chars"]))
+    config["api_static_dir"] = os.getenv('API_STATIC_DIR', config["api_static_dir"])
+    config["api_allow_evaluate"] = os.getenv(
+        'API_ALLOW_EVALUATE', str(config["api_allow_evaluate"])
+    ).lower() in ("1", "true", "yes")
+    config["batch_max_concurrency"] = int(os.getenv('BATCH_MAX_CONCURRENCY', config["batch_max_concurrency"]))
+    config["batch_retrieval_size"] = int(os.getenv('BATCH_RETRIEVAL_SIZE', config["batch_retrieval_size"]))
+    config["semantic_cache_enabled"] = os.getenv(
+        'SEMANTIC_CACHE_ENABLED', str(config["semantic_cache_enabled"])
+    ).lower() in ("1", "true", "yes")
+    config["semantic_cache_embedder"] = os.getenv('SEMANTIC_CACHE_EMBEDDER', config["semantic_cache_embedder"])
+    config["semantic_cache_threshold"] = float(
+        os.getenv('SEMANTIC_CACHE_THRESHOLD', config["semantic_cache_threshold"])
+    )
+    config["semantic_cache_max_entries"] = int(
+        os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', config["semantic_cache_max_entries"])
+    )
+    config["semantic_cache_ttl"] = float(os.getenv('SEMANTIC_CACHE_TTL', config["semantic_cache_ttl"]))
+    config["single_flight_enabled"] = os.getenv(
+        'SINGLE_FLIGHT_ENABLED', str(config["single_flight_enabled"])
+    ).lower() in ("1", "true", "yes")
+    # OPIK_TRACK_DISABLE is the Opik SDK's own switch
+    config["tracing_enabled"] = os.getenv(
+        'TRACING_ENABLED', str(config["tracing_enabled"])
+    ).lower() in ("1", "true", "yes") and os.getenv('OPIK_TRACK_DISABLE', '').lower() not in ("1", "true", "yes")
+    config["tracing_sample_rate"] = float(os.getenv('TRACING_SAMPLE_RATE', config["tracing_sample_rate"]))
+    if os.getenv('TRACING_SAMPLE_RATES'):
+        # name=rate pairs, e.g. "cached-independence-rag=0.05,evaluate-rag-system=1"
+        config["tracing_sample_rates"] = {
+            name.strip(): float(rate) for name, rate in
+            (pair.split("=") for pair in os.getenv('TRACING_SAMPLE_RATES').split(",") if pair.strip())
+        }
+    config["tracing_max_depth"] = int(os.getenv('TRACING_MAX_DEPTH', config["tracing_max_depth"]))
+    config["tracing_trace_helpers"] = os.getenv(
+        'TRACING_TRACE_HELPERS', str(config["tracing_trace_helpers"])
+    ).lower() in ("1", "true", "yes")
+    config["tracing_buffer_size"] = int(os.getenv('TRACING_BUFFER_SIZE', config["tracing_buffer_size"]))
+    config["tracing_flush_interval"] = float(os.getenv('TRACING_FLUSH_INTERVAL', config["tracing_flush_interval"]))
+    config["metrics_enabled"] = os.getenv(
+        'METRICS_ENABLED', str(config["metrics_enabled"])
+    ).lower() in ("1", "true", "yes")
+    config["metrics_file"] = os.getenv('METRICS_FILE', config["metrics_file"])
+    config["metrics_dir"] = os.getenv('METRICS_DIR', config["metrics_dir"])
+    config["metrics_export_interval"] = float(os.getenv('METRICS_EXPORT_INTERVAL', config["metrics_export_interval"]))
+    config["timeline_max_labels"] = int(os.getenv('TIMELINE_MAX_LABELS', config["timeline_max_labels"]))
+    config["timeline_cache_size"] = int(os.getenv('TIMELINE_CACHE_SIZE', config["timeline_cache_size"]))
+    config["timeline_cache_dir"] = os.getenv('TIMELINE_CACHE_DIR', config["timeline_cache_dir"])
+    config["query_vectorizer"] = os.getenv('QUERY_VECTORIZER', config["query_vectorizer"])
+    config["embedding_mode"] = os.getenv('EMBEDDING_MODE', config["embedding_mode"])
+    config["embedding_model"] = os.getenv('EMBEDDING_MODEL', config["embedding_model"])
+    config["embedding_batch_size"] = int(os.getenv('EMBEDDING_BATCH_SIZE', config["embedding_batch_size"]))
+    config["embedding_cache_enabled"] = os.getenv(
+        'EMBEDDING_CACHE_ENABLED', str(config["embedding_cache_enabled"])
+    ).lower() in ("1", "true", "yes")
+    config["embedding_cache_path"] = os.getenv('EMBEDDING_CACHE_PATH', config["embedding_cache_path"])
+    config["query_vector_cache_size"] = int(os.getenv('QUERY_VECTOR_CACHE_SIZE', config["query_vector_cache_size"]))
+    config["fetch_max_workers"] = int(os.getenv('FETCH_MAX_WORKERS', config["fetch_max_workers"]))
+    config["fetch_per_host_limit"] = int(os.getenv('FETCH_PER_HOST_LIMIT', config["fetch_per_host_limit"]))
+    config["fetch_retries"] = int(os.getenv('FETCH_RETRIES', config["fetch_retries"]))
+    config["fetch_backoff"] = float(os.getenv('FETCH_BACKOFF', config["fetch_backoff"]))
+    config["fetch_timeout"] = float(os.getenv('FETCH_TIMEOUT', config["fetch_timeout"]))
+    config["fetch_cache_enabled"] = os.getenv(
+        'FETCH_CACHE_ENABLED', str(config["fetch_cache_enabled"])
+    ).lower() in ("1", "true", "yes")
+    config["fetch_cache_dir"] = os.getenv('FETCH_CACHE_DIR', config["fetch_cache_dir"])
+    config["fetch_cache_max_age"] = float(os.getenv('FETCH_CACHE_MAX_AGE', config["fetch_cache_max_age"]))
+    config["fetch_offline"] = os.getenv('FETCH_OFFLINE', str(config["fetch_offline"])).lower() in ("1", "true", "yes")
     
     return config
 
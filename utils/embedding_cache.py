@@ -0,0 +1,156 @@
+"""
+Persistent cache of text embeddings.
+
+Vectors are stored in SQLite keyed by (text hash, model id), so re-importing
+or migrating the collection never embeds unchanged text twice.
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+import numpy as np
+from .config import get_config
+from .cache import stable_hash
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    Thread-safe SQLite store of float32 vectors keyed by text hash and model id.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "text_hash TEXT NOT NULL, model_id TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (text_hash, model_id))"
+        )
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get_many(self, text_hashes, model_id):
+        """
+        Look up cached vectors.
+
+        Args:
+            text_hashes (list): Hashes of the texts
+            model_id (str): Embedding model id
+
+        Returns:
+            dict: Text hash -> numpy.ndarray for the hashes found
+        """
+        found = {}
+        unique = list(dict.fromkeys(text_hashes))
+
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model_id = ? AND text_hash IN ({placeholders})",
+                    [model_id, *batch]
+                )
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(unique) - len(found)
+
+        return found
+
+    def set_many(self, items, model_id):
+        """
+        Store vectors.
+
+        Args:
+            items (iterable): (text hash, vector) pairs
+            model_id (str): Embedding model id
+        """
+        rows = [(text_hash, model_id, np.asarray(vector, dtype=np.float32).tobytes()) for text_hash, vector in items]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def get_stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hits and misses since the cache was opened
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache():
+    """
+    Get the process-wide embedding cache.
+
+    Returns:
+        EmbeddingCache: Shared cache, or None if disabled in the configuration
+    """
+    global _cache
+
+    config = get_config()
+    if not config["embedding_cache_enabled"]:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            path = config["embedding_cache_path"] or os.path.join(config["cache_dir"], "embeddings.sqlite3")
+            _cache = EmbeddingCache(path)
+            logger.info(f"Using embedding cache at {path}")
+        return _cache
+
+def embed_texts(texts, embedder, cache=None, batch_size=256):
+    """
+    Embed texts in batches, reusing cached vectors.
+
+    Args:
+        texts (list): Texts to embed
+        embedder: Embedder with model_id and embed()
+        cache (EmbeddingCache, optional): Vector cache
+        batch_size (int): Texts per embedder call
+
+    Returns:
+        numpy.ndarray: Array of shape (len(texts), dim)
+    """
+    hashes = [stable_hash(text) for text in texts]
+    cached = cache.get_many(hashes, embedder.model_id) if cache is not None else {}
+
+    missing = {}
+    for text_hash, text in zip(hashes, texts):
+        if text_hash not in cached:
+            missing.setdefault(text_hash, text)
+
+    if missing:
+        missing_hashes = list(missing)
+        computed = {}
+        for start in range(0, len(missing_hashes), batch_size):
+            batch = missing_hashes[start:start + batch_size]
+            vectors = embedder.embed([missing[text_hash] for text_hash in batch])
+            computed.update(zip(batch, vectors))
+
+        if cache is not None:
+            cache.set_many(computed.items(), embedder.model_id)
+        cached.update(computed)
+
+    logger.debug(f"Embedded {len(missing)} of {len(texts)} texts with {embedder.model_id}")
+    return np.stack([cached[text_hash] for text_hash in hashes]) if texts else np.zeros((0, embedder.dim), dtype=np.float32)
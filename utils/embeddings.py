@@ -0,0 +1,157 @@
+"""
+Local text embedders.
+
+Embedders expose a ``model_id`` and an ``embed(texts)`` method returning an
+L2-normalized float32 NumPy array with one row per text.
+"""
+
+import re
+import zlib
+import logging
+import threading
+import numpy as np
+from .config import get_config
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder that hashes words, word bigrams and character trigrams.
+
+    Captures lexical similarity only, which is what near-duplicate detection
+    needs; it does not share a vector space with Weaviate's vectorizer. The
+    bigrams make word order count, so "John wrote to Abigail" and "Abigail
+    wrote to John" are not the same vector.
+    """
+
+    MAX_MEMOIZED_FEATURES = 200000
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        # Changes with the features, so cached and indexed vectors of older versions are not reused
+        self.model_id = f"hashing-bigram-{dim}"
+        self._slots = {}
+
+    def _features(self, text):
+        words = _TOKEN_PATTERN.findall(text.lower())
+        features = list(words)
+        features.extend(f"{first} {second}" for first, second in zip(words, words[1:]))
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _feature_slot(self, feature):
+        """Map a feature to its (dimension, sign), memoized since features repeat heavily."""
+        slot = self._slots.get(feature)
+        if slot is None:
+            h = zlib.crc32(feature.encode("utf-8"))
+            # Use one hash bit as the sign to reduce collision bias
+            slot = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+            if len(self._slots) < self.MAX_MEMOIZED_FEATURES:
+                self._slots[feature] = slot
+        return slot
+
+    def embed(self, texts):
+        """
+        Embed a batch of texts.
+
+        Features of the whole batch are scattered into one array at once.
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            numpy.ndarray: Array of shape (len(texts), dim)
+        """
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = self._feature_slot(feature)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                  np.array(signs, dtype=np.float32))
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class SentenceTransformerEmbedder:
+    """
+    Embedder backed by a sentence-transformers model.
+
+    Requires the optional ``sentence-transformers`` package. Use the same model
+    as the Weaviate text2vec-transformers module to produce compatible vectors.
+    """
+
+    def __init__(self, model_id):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers is required for local model embeddings: pip install sentence-transformers")
+
+        self.model_id = model_id
+        self._model = SentenceTransformer(model_id)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        logger.info(f"Loaded embedding model {model_id}")
+
+    def embed(self, texts):
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            numpy.ndarray: Array of shape (len(texts), dim)
+        """
+        vectors = self._model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32, copy=False)
+
+_EMBEDDERS = {}
+_EMBEDDERS_LOCK = threading.Lock()
+# One lock per name, so loading a model does not hold up getting other embedders
+_EMBEDDER_LOCKS = {}
+
+def get_embedder(name="hashing"):
+    """
+    Get a shared embedder instance by name.
+
+    Args:
+        name (str): "hashing", or a sentence-transformers model id
+
+    Returns:
+        Embedder instance
+    """
+    embedder = _EMBEDDERS.get(name)
+    if embedder is not None:
+        return embedder
+
+    with _EMBEDDERS_LOCK:
+        lock = _EMBEDDER_LOCKS.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _EMBEDDERS:
+            if name == "hashing":
+                _EMBEDDERS[name] = HashingEmbedder()
+            else:
+                _EMBEDDERS[name] = SentenceTransformerEmbedder(name)
+
+        return _EMBEDDERS[name]
+
+def get_client_embedder():
+    """
+    Get the embedder used for chunks and queries in client-side embedding mode.
+
+    Returns:
+        Embedder instance, or None if Weaviate embeds on the server
+    """
+    config = get_config()
+    if config["embedding_mode"] != "client":
+        return None
+    return get_embedder(config["embedding_model"])
@@ -0,0 +1,40 @@
+"""
+Lazy re-exports for package __init__ modules.
+
+Packages list their public names by submodule, and a submodule is only
+imported when one of its names is first used, so that importing a package
+for one function does not import every dependency of its siblings.
+"""
+
+import importlib
+
+def lazy_exports(package, exports):
+    """
+    Build the module __getattr__ and __dir__ for lazily re-exported names.
+
+    Args:
+        package (str): The package's __name__
+        exports (dict): Relative submodule name (e.g. ".config") to the names it provides
+
+    Returns:
+        tuple: (__getattr__, __dir__) functions for the package module
+    """
+    modules = {name: module for module, names in exports.items() for name in names}
+    for name, module in modules.items():
+        # Importing the submodule binds its name on the package, which would shadow the export
+        if name == module.lstrip("."):
+            raise ValueError(f"{package}.{name} shares its submodule's name; import it eagerly")
+
+    def __getattr__(name):
+        module = modules.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        # Cache it on the package so later lookups skip __getattr__
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(importlib.import_module(package))) | set(modules))
+
+    return __getattr__, __dir__
@@ -0,0 +1,395 @@
+"""
+In-process metrics registry with Prometheus text export.
+
+Counters, gauges and histograms are kept per label combination in memory;
+recording a value is a dictionary lookup and an update under a lock. The
+registry renders the Prometheus text exposition format, and can write it
+(or a JSON snapshot that other processes merge) to a file periodically, for
+processes without an HTTP endpoint or with several worker processes.
+"""
+
+import os
+import json
+import atexit
+import bisect
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a cached lookup (milliseconds) up to a slow LLM answer
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _Metric:
+    """A metric family: one value per combination of label values."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple([str(labels[name]) for name in self.labelnames])
+
+    def samples(self):
+        """Current values by label values, as JSON-compatible data."""
+        with self._lock:
+            return [[list(key), self._export(value)] for key, value in self._values.items()]
+
+    def _export(self, value):
+        return value
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the count for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        """Set the value for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the value for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """Subtract amount from the value for the given label values."""
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets, with their count and sum."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """Record one value for the given label values."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, the last one for +Inf, then the sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _export(self, value):
+        return {"counts": value[:-1], "sum": value[-1]}
+
+    def bucket_counts(self, **labels):
+        """
+        Add up the per-bucket counts of the matching label values.
+
+        Args:
+            **labels: Values of some or all labels; all observations are used when omitted
+
+        Returns:
+            list: Count per bucket, the last one for values above every bound
+        """
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"{self.name} has no labels {sorted(unknown)}")
+        wanted = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        counts = [0] * (len(self.buckets) + 1)
+        with self._lock:
+            for key, state in self._values.items():
+                if all(key[index] == value for index, value in wanted):
+                    counts = [a + b for a, b in zip(counts, state[:-1])]
+        return counts
+
+    def summary(self, quantiles=(0.5, 0.95, 0.99), **labels):
+        """
+        Get the count and estimated percentiles of observations.
+
+        Args:
+            quantiles (tuple): Quantiles between 0 and 1
+            **labels: Values of some or all labels; all observations are used when omitted
+
+        Returns:
+            dict: "count", and e.g. "p50", "p95" and "p99" (None without observations)
+        """
+        counts = self.bucket_counts(**labels)
+        summary = {"count": sum(counts)}
+        for quantile in quantiles:
+            summary[f"p{quantile * 100:g}"] = bucket_quantile(self.buckets, counts, quantile)
+        return summary
+
+def bucket_quantile(buckets, counts, quantile):
+    """
+    Estimate a quantile from per-bucket counts, like Prometheus' histogram_quantile().
+
+    Args:
+        buckets (tuple): Upper bounds of the finite buckets
+        counts (list): Count per bucket, the last one for values above every bound
+        quantile (float): Quantile between 0 and 1
+
+    Returns:
+        float: Estimated value, or None without observations
+    """
+    total = sum(counts)
+    if not total:
+        return None
+
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if seen + count >= rank and count:
+            if index == len(buckets):
+                # Above the highest bound: report that bound, as Prometheus does
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (buckets[index] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+class MetricsRegistry:
+    """Named metric families of one process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Get or create a gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        """Get a registered metric by name, or None."""
+        return self._metrics.get(name)
+
+    def snapshot(self):
+        """
+        Get every metric's current values.
+
+        Returns:
+            dict: Metric name -> type, help, label names, buckets and samples;
+            JSON-compatible, see merge_snapshots() and render_prometheus()
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", [])),
+                "samples": metric.samples()
+            }
+            for metric in metrics
+        }
+
+def merge_snapshots(snapshots):
+    """
+    Add up snapshots of several processes.
+
+    Counters, gauges and histograms with the same name and label values are
+    summed, so gauges such as requests in flight add up across workers.
+
+    Args:
+        snapshots (list): Results of MetricsRegistry.snapshot()
+
+    Returns:
+        dict: Merged snapshot
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif isinstance(value, dict):
+                    target["samples"][key] = {
+                        "counts": [a + b for a, b in zip(current["counts"], value["counts"])],
+                        "sum": current["sum"] + value["sum"]
+                    }
+                else:
+                    target["samples"][key] = current + value
+
+    for metric in merged.values():
+        metric["samples"] = [[list(key), value] for key, value in metric["samples"].items()]
+    return merged
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_prometheus(snapshot):
+    """
+    Render a snapshot in the Prometheus text exposition format (version 0.0.4).
+
+    Args:
+        snapshot (dict): Result of MetricsRegistry.snapshot() or merge_snapshots()
+
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for labels, value in sorted(metric["samples"]):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_label_text(names, labels)} {_number(value)}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + [float("inf")], value["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_label_text(names, labels, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(names, labels)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_label_text(names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def write_prometheus(path, registry=None):
+    """Write the registry in the Prometheus text format to path, atomically."""
+    _atomic_write(path, render_prometheus((registry or get_registry()).snapshot()))
+
+def write_snapshot(path, registry=None):
+    """Write a JSON snapshot of the registry to path, atomically."""
+    _atomic_write(path, json.dumps((registry or get_registry()).snapshot()))
+
+def read_snapshots(directory, exclude=None):
+    """
+    Read the JSON snapshots written to a directory by write_snapshot().
+
+    Args:
+        directory (str): Directory of snapshot files
+        exclude (str, optional): File name to leave out, e.g. this process's own
+
+    Returns:
+        list: Snapshots; unreadable files are skipped
+    """
+    snapshots = []
+    for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if not filename.endswith(".json") or filename == exclude:
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.debug(f"Skipping metrics snapshot {filename}: {str(e)}")
+    return snapshots
+
+def start_periodic_export(write, interval):
+    """
+    Call write() every interval seconds on a daemon thread, and once more at exit.
+
+    Args:
+        write (callable): Export function, e.g. lambda: write_prometheus(path)
+        interval (float): Seconds between exports
+
+    Returns:
+        threading.Event: Set it to stop exporting
+    """
+    stopped = threading.Event()
+
+    def export():
+        try:
+            write()
+        except Exception as e:
+            logger.warning(f"Could not export metrics: {str(e)}")
+
+    def run():
+        while not stopped.wait(interval):
+            export()
+
+    threading.Thread(target=run, daemon=True, name="metrics-export").start()
+    atexit.register(export)
+    return stopped
+
+_registry = MetricsRegistry()
+_file_export_started = False
+_file_export_lock = threading.Lock()
+
+def get_registry():
+    """
+    Get the process-wide metrics registry.
+
+    The first call also starts writing it to metrics_file, if configured.
+
+    Returns:
+        MetricsRegistry: Shared registry
+    """
+    global _file_export_started
+
+    if not _file_export_started:
+        with _file_export_lock:
+            if not _file_export_started:
+                _file_export_started = True
+                from .config import get_config
+                config = get_config()
+                if config["metrics_file"]:
+                    start_periodic_export(lambda: write_prometheus(config["metrics_file"], _registry),
+                                          config["metrics_export_interval"])
+                    logger.info(f"Writing metrics to {config['metrics_file']}")
+    return _registry
@@ -0,0 +1,473 @@
+"""
+Opik integration for tracing and observability.
+
+`opik` here is a lightweight tracing facade rather than the Opik SDK itself:
+its `track` decorator records spans in memory and a background thread
+exports them to Opik, so a request only pays for taking two timestamps and
+enqueueing a record. Whole traces are sampled when their entry point starts
+(per entry point rates in `tracing_sample_rates`), spans deeper than
+`tracing_max_depth` and trivial helpers are not recorded, and with tracing
+disabled `track` returns the function undecorated. The Opik SDK is imported
+and configured on the first export, not at import time.
+"""
+
+import os
+import time
+import atexit
+import random
+import inspect
+import logging
+import threading
+import functools
+import contextvars
+import traceback
+import collections
+from datetime import datetime, timezone
+from .config import get_config
+
+logger = logging.getLogger(__name__)
+
+def setup_opik():
+    """
+    Configure Opik for tracing.
+
+    Returns:
+        opik object: Configured Opik instance
+    """
+    import opik
+
+    api_key = os.getenv('OPIK_API_KEY')
+    project_name = os.getenv('OPIK_PROJECT_NAME', 'voices-of-independence')
+
+    if not api_key:
+        logger.warning("Opik API key not found, using local mode")
+        opik.configure(use_local=True)
+    else:
+        try:
+            opik.configure(
+                api_key=api_key,
+                project_name=project_name,
+                use_local=False
+            )
+            logger.info(f"Opik configured with project: {project_name}")
+        except Exception as e:
+            logger.error(f"Error configuring Opik: {str(e)}")
+            logger.warning("Falling back to local mode")
+            opik.configure(use_local=True)
+
+    return opik
+
+# Marks the context of a trace that was not sampled, so nested calls skip recording
+_UNSAMPLED = object()
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One finished or running call recorded by the tracer."""
+
+    __slots__ = ("name", "parent", "depth", "start", "end", "arguments", "output", "error", "metadata",
+                 "span_id", "trace_id")
+
+    def __init__(self, name, parent, arguments):
+        self.name = name
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.start = time.time()
+        self.end = None
+        self.arguments = arguments
+        self.output = None
+        self.error = None
+        self.metadata = {}
+        # Assigned by the exporter
+        self.span_id = None
+        self.trace_id = None
+
+    @property
+    def root(self):
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+def _jsonable(value, depth=0):
+    """A small JSON-compatible summary of value for span inputs and outputs."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= 2000 else value[:2000] + "..."
+    if depth < 3 and isinstance(value, dict):
+        return {str(key): _jsonable(item, depth + 1) for key, item in list(value.items())[:50]}
+    if depth < 3 and isinstance(value, (list, tuple)):
+        return [_jsonable(item, depth + 1) for item in value[:50]]
+    return f"<{type(value).__name__}>"
+
+def _span_input(span):
+    parameters, args, kwargs = span.arguments
+    inputs = dict(zip(parameters, args))
+    inputs.update(kwargs)
+    return {key: _jsonable(value) for key, value in inputs.items()}
+
+def _span_output(span):
+    output = span.output
+    return _jsonable(output) if isinstance(output, dict) else {"output": _jsonable(output)}
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+def _error_info(error):
+    return {
+        "exception_type": type(error).__name__,
+        "message": str(error),
+        "traceback": "".join(traceback.format_exception(type(error), error, error.__traceback__))
+    }
+
+class _OpikExport:
+    """Sends finished spans to Opik; runs on the exporter thread only."""
+
+    def __init__(self):
+        self._client = None
+
+    def __call__(self, spans):
+        if self._client is None:
+            from opik.id_helpers import generate_id
+            self._generate_id = generate_id
+            self._client = setup_opik().Opik(project_name=os.getenv('OPIK_PROJECT_NAME', 'voices-of-independence'))
+
+        for span in spans:
+            root = span.root
+            if root.trace_id is None:
+                root.trace_id = self._generate_id()
+            for ancestor in (span, span.parent):
+                if ancestor is not None and ancestor.span_id is None:
+                    ancestor.span_id = self._generate_id()
+
+            fields = {
+                "name": span.name,
+                "start_time": _timestamp(span.start),
+                "end_time": _timestamp(span.end),
+                "input": _span_input(span),
+                "output": _span_output(span),
+                "metadata": _jsonable(span.metadata) or None,
+                "error_info": _error_info(span.error) if span.error is not None else None
+            }
+            self._client.span(trace_id=root.trace_id, id=span.span_id,
+                              parent_span_id=span.parent.span_id if span.parent is not None else None, **fields)
+            if span.parent is None:
+                self._client.trace(id=span.trace_id, **fields)
+
+    def flush(self):
+        if self._client is not None:
+            self._client.flush()
+
+class Tracer:
+    """
+    Sampling tracer with a background exporter.
+
+    Args:
+        enabled (bool): Record spans at all; when False, track() returns functions undecorated
+        sample_rate (float): Share of traces recorded
+        sample_rates (dict, optional): Sample rate per entry point name, overriding sample_rate
+        max_depth (int): Deepest span recorded; the entry point has depth 0
+        trace_helpers (bool): Also record functions tracked with trivial=True
+        buffer_size (int): Finished spans held for export; further spans are dropped
+        flush_interval (float): Seconds the exporter waits to fill a batch
+        export (callable, optional): Called on the exporter thread with each batch of
+            finished spans; defaults to sending them to Opik
+    """
+
+    def __init__(self, enabled=True, sample_rate=1.0, sample_rates=None, max_depth=4, trace_helpers=False,
+                 buffer_size=10000, flush_interval=1.0, export=None):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.sample_rates = dict(sample_rates or {})
+        self.max_depth = max_depth
+        self.trace_helpers = trace_helpers
+        self.flush_interval = flush_interval
+        self._export = export or _OpikExport()
+        self.buffer_size = buffer_size
+        self._buffer = collections.deque()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flushes = []
+        self._stats = {
+            "traces_sampled": 0,
+            "traces_skipped": 0,
+            "spans_recorded": 0,
+            "spans_exported": 0,
+            "spans_dropped": 0,
+            "export_errors": 0
+        }
+
+    @classmethod
+    def from_config(cls, config=None):
+        """
+        Create a tracer from the tracing_* configuration.
+
+        Returns:
+            Tracer: New tracer
+        """
+        config = config or get_config()
+        return cls(
+            enabled=config["tracing_enabled"],
+            sample_rate=config["tracing_sample_rate"],
+            sample_rates=config["tracing_sample_rates"],
+            max_depth=config["tracing_max_depth"],
+            trace_helpers=config["tracing_trace_helpers"],
+            buffer_size=config["tracing_buffer_size"],
+            flush_interval=config["tracing_flush_interval"]
+        )
+
+    def track(self, func=None, name=None, trivial=False):
+        """
+        Decorate a function, coroutine function, generator or async generator to record it as a span.
+
+        Usable as @track, @track(name="...") or @track(trivial=True).
+
+        Args:
+            func (callable, optional): Function to decorate
+            name (str, optional): Span name; defaults to the function name
+            trivial (bool): Cheap helper that is only recorded when trace_helpers is set
+
+        Returns:
+            callable: Decorated function, or a decorator if func is not given
+        """
+        if func is None:
+            return functools.partial(self.track, name=name, trivial=trivial)
+        if not self.enabled or (trivial and not self.trace_helpers):
+            return func
+
+        name = name or func.__name__
+        parameters = tuple(inspect.signature(func).parameters)
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def async_generator_wrapper(*args, **kwargs):
+                span = self._start(name, parameters, args, kwargs)
+                generator = func(*args, **kwargs)
+                if span is None:
+                    try:
+                        async for item in generator:
+                            yield item
+                    finally:
+                        # async for does not close the generator when the consumer stops early
+                        await generator.aclose()
+                    return
+
+                items = 0
+                try:
+                    while True:
+                        # Entered per step, as the generator may be resumed from different contexts
+                        token = _current_span.set(span)
+                        try:
+                            item = await generator.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            _current_span.reset(token)
+                        items += 1
+                        yield item
+                except BaseException as e:
+                    self._finish(span, error=e)
+                    raise
+                else:
+                    self._finish(span, {"items": items})
+                finally:
+                    # Runs the generator's own cleanup now when the consumer closes this one early
+                    await generator.aclose()
+            return async_generator_wrapper
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                span = self._start(name, parameters, args, kwargs)
+                if span is None:
+                    yield from func(*args, **kwargs)
+                    return
+
+                items = 0
+                generator = func(*args, **kwargs)
+                try:
+                    while True:
+                        token = _current_span.set(span)
+                        try:
+                            item = next(generator)
+                        except StopIteration:
+                            break
+                        finally:
+                            _current_span.reset(token)
+                        items += 1
+                        yield item
+                except BaseException as e:
+                    self._finish(span, error=e)
+                    raise
+                else:
+                    self._finish(span, {"items": items})
+                finally:
+                    generator.close()
+            return generator_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def coroutine_wrapper(*args, **kwargs):
+                span = self._start(name, parameters, args, kwargs)
+                if span is None:
+                    return await func(*args, **kwargs)
+
+                token = _current_span.set(span)
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    self._finish(span, error=e)
+                    raise
+                finally:
+                    _current_span.reset(token)
+                self._finish(span, result)
+                return result
+            return coroutine_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            span = self._start(name, parameters, args, kwargs)
+            if span is None:
+                return func(*args, **kwargs)
+
+            token = _current_span.set(span)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                self._finish(span, error=e)
+                raise
+            finally:
+                _current_span.reset(token)
+            self._finish(span, result)
+            return result
+        return wrapper
+
+    def _start(self, name, parameters, args, kwargs):
+        """Begin a span; returns None if this call is not recorded, or _UNSAMPLED for a skipped trace."""
+        parent = _current_span.get()
+        if parent is _UNSAMPLED:
+            return None
+
+        if parent is None:
+            rate = self.sample_rates.get(name, self.sample_rate)
+            if rate < 1.0 and random.random() >= rate:
+                self._stats["traces_skipped"] += 1
+                # Entered like a span so that nested calls see the mark and skip recording
+                return _UNSAMPLED
+            self._stats["traces_sampled"] += 1
+        elif parent.depth + 1 >= self.max_depth:
+            return None
+
+        return Span(name, parent, (parameters, args, kwargs))
+
+    def _finish(self, span, output=None, error=None):
+        if span is _UNSAMPLED:
+            return
+        span.end = time.time()
+        span.output = output
+        if error is not None and not isinstance(error, Exception):
+            # GeneratorExit, CancelledError: the caller went away. Only the type is kept, since the
+            # traceback would keep the abandoned frames (and what they hold) alive until export.
+            span.metadata["cancelled"] = type(error).__name__
+            error = None
+        span.error = error
+        self._stats["spans_recorded"] += 1
+        if self._thread is None:
+            self._start_exporter()
+        # deque.append is atomic; the exporter drains the buffer without waking per span
+        if len(self._buffer) < self.buffer_size:
+            self._buffer.append(span)
+        else:
+            self._stats["spans_dropped"] += 1
+
+    def _start_exporter(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_exporter, daemon=True, name="span-exporter")
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run_exporter(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                flushes, self._flushes = self._flushes, []
+
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), 100))]
+                try:
+                    self._export(batch)
+                    self._stats["spans_exported"] += len(batch)
+                except Exception as e:
+                    self._stats["export_errors"] += 1
+                    logger.warning(f"Could not export {len(batch)} spans: {str(e)}")
+            # Exported spans (and the arguments and errors they hold) are not kept until the next wake
+            batch = None
+
+            if flushes:
+                try:
+                    if hasattr(self._export, "flush"):
+                        self._export.flush()
+                except Exception as e:
+                    logger.warning(f"Could not flush exported spans: {str(e)}")
+                for flushed in flushes:
+                    flushed.set()
+
+    def flush(self, timeout=5.0):
+        """
+        Export all finished spans.
+
+        Args:
+            timeout (float): Seconds to wait for the exporter
+
+        Returns:
+            bool: True if every span was exported in time
+        """
+        if self._thread is None:
+            return True
+        flushed = threading.Event()
+        with self._lock:
+            self._flushes.append(flushed)
+        self._wake.set()
+        return flushed.wait(timeout)
+
+    def get_stats(self):
+        """
+        Get tracing counters.
+
+        Returns:
+            dict: Traces sampled and skipped, and spans recorded, exported and dropped
+        """
+        stats = dict(self._stats)
+        stats["buffered"] = len(self._buffer)
+        return stats
+
+# Tracing facade used as @opik.track throughout the project
+opik = Tracer.from_config()
+
+def setup_openai_tracking():
+    """Set up OpenAI client tracking with Opik."""
+    try:
+        from opik.integrations.openai import track_openai
+        track_openai()
+        logger.info("OpenAI tracking configured")
+        return True
+    except ImportError:
+        logger.warning("opik.integrations.openai not available")
+        return False
+    except Exception as e:
+        logger.error(f"Error setting up OpenAI tracking: {str(e)}")
+        return False
+
+def log_metrics(**metrics):
+    """
+    Attach metrics to the current span as metadata.
+
+    Args:
+        **metrics: Metric names and values, e.g. time_to_first_token=0.42
+    """
+    span = _current_span.get()
+    if span is not None and span is not _UNSAMPLED:
+        span.metadata.update(metrics)
@@ -0,0 +1,50 @@
+"""
+Token counting for sizing text chunks and prompts.
+
+Uses tiktoken when it is installed; otherwise falls back to a word and
+punctuation count, which tracks BPE token counts closely for English prose.
+"""
+
+import re
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """Load the tiktoken encoding once, or None if tiktoken is unavailable."""
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    logger.debug(f"tiktoken unavailable, approximating token counts: {str(e)}")
+                    _encoding = None
+                _encoding_loaded = True
+
+    return _encoding
+
+def count_tokens(text):
+    """
+    Count the tokens in a text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Number of tokens (approximate if tiktoken is not installed)
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN_PATTERN.findall(text))
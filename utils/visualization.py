@@ -1,85 +1,262 @@
 """
 Visualization functions for the Voices of Independence project.
+
+Timelines are drawn on their own matplotlib Figure instead of through
+pyplot's global state, so concurrent requests can render at the same time.
+Rendered PNG and SVG images are cached, in memory and on disk, by the set of
+documents they show.
 """
 
+import io
+import os
 import logging
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from datetime import datetime
-import pandas as pd
+import tempfile
+import threading
 from utils.opik_tracking import opik
+from utils.config import get_config
+from utils.cache import LRUCache, stable_hash
 
 logger = logging.getLogger(__name__)
 
+COLORS = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#ffff33']
+FIGURE_SIZE = (15, 8)
+IMAGE_FORMATS = ("png", "svg")
+# Part of the cache key; bump it when the drawing changes so old images are not served
+RENDER_VERSION = 2
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+def get_timeline_cache():
+    """
+    Get the process-wide cache of rendered timeline images.
+
+    Returns:
+        LRUCache: Image bytes by timeline_key()
+    """
+    global _image_cache
+
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = LRUCache(maxsize=get_config()["timeline_cache_size"])
+        return _image_cache
+
+def timeline_key(docs_list, image_format, max_labels):
+    """
+    Cache key of a timeline image: a hash of the document set and the rendering options.
+
+    The order of docs_list does not matter; repeated documents (e.g. several
+    chunks of one document) do.
+
+    Args:
+        docs_list (list): Document dictionaries with title, date and document_type
+        image_format (str): "png" or "svg"
+        max_labels (int): Label limit the image was drawn with
+
+    Returns:
+        str: Hex digest
+    """
+    documents = sorted([str(doc.get("date")), str(doc.get("document_type")), str(doc.get("title"))]
+                       for doc in docs_list)
+    return stable_hash(RENDER_VERSION, image_format, max_labels, documents)
+
+def _disk_path(key, image_format):
+    config = get_config()
+    directory = config["timeline_cache_dir"] or os.path.join(config["cache_dir"], "timeline")
+    return os.path.join(directory, f"{key}.{image_format}")
+
+def _cached_image(key, image_format):
+    """Image bytes from the memory or disk cache, or None."""
+    cache = get_timeline_cache()
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    try:
+        with open(_disk_path(key, image_format), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    cache.set(key, data)
+    return data
+
+def _store_image(key, image_format, data):
+    """Keep image bytes in memory and write them to the disk cache atomically."""
+    get_timeline_cache().set(key, data)
+    path = _disk_path(key, image_format)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not cache timeline image at {path}: {str(e)}")
+
+def _documents_frame(docs_list):
+    """
+    One row per distinct document, with the number of entries (chunks) it had, sorted by date.
+
+    Returns:
+        pandas.DataFrame: title, document_type, datetime and chunks columns
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(docs_list, columns=["title", "date", "document_type"])
+    df["datetime"] = pd.to_datetime(df["date"], errors="coerce")
+    undated = int(df["datetime"].isna().sum())
+    if undated:
+        logger.warning(f"Leaving {undated} documents without a valid date off the timeline")
+    df["document_type"] = df["document_type"].fillna("unknown")
+    documents = (df.dropna(subset=["datetime"])
+                 .groupby(["title", "document_type", "datetime"], sort=False)
+                 .size()
+                 .rename("chunks")
+                 .reset_index())
+    return documents.sort_values("datetime", kind="stable").reset_index(drop=True)
+
+def _labels(documents, x, max_labels):
+    """
+    Titles to annotate, at most max_labels.
+
+    Beyond max_labels documents, the time axis is split into max_labels
+    stretches and each stretch is labelled with its document with the most
+    chunks, followed by how many other documents it stands for.
+
+    Returns:
+        list: (x, row, text) tuples
+    """
+    if len(documents) <= max_labels:
+        return list(zip(x, documents["row"], documents["title"]))
+
+    span = max(x.max() - x.min(), 1e-9)
+    stretches = ((x - x.min()) / span * (max_labels - 1)).round()
+    grouped = documents.groupby(stretches)
+    labels = []
+    for index, count in zip(grouped["chunks"].idxmax(), grouped.size()):
+        title = documents.at[index, "title"]
+        text = f"{title} (+{count - 1})" if count > 1 else title
+        labels.append((x[index], documents.at[index, "row"], text))
+    return labels
+
+def _draw_timeline(fig, docs_list, max_labels):
+    """Draw the timeline of docs_list on fig: one row and color per document type."""
+    import numpy as np
+    import matplotlib.dates as mdates
+
+    documents = _documents_frame(docs_list)
+    doc_types = list(documents["document_type"].unique())
+    documents["row"] = documents["document_type"].map({doc_type: i for i, doc_type in enumerate(doc_types)})
+    x = mdates.date2num(documents["datetime"].to_numpy())
+    sizes = 40 + 60 * np.sqrt(documents["chunks"].to_numpy())
+
+    ax = fig.add_subplot()
+    # One scatter call per document type, whatever the number of documents
+    for i, doc_type in enumerate(doc_types):
+        mask = (documents["row"] == i).to_numpy()
+        ax.scatter(x[mask], documents["row"].to_numpy()[mask], s=sizes[mask], color=COLORS[i % len(COLORS)],
+                   alpha=0.8, edgecolors="none", label=doc_type)
+
+    labels = _labels(documents, x, max_labels)
+    for label_x, row, text in labels:
+        ax.annotate(text, (label_x, row), xytext=(4, 6), textcoords="offset points",
+                    rotation=30, ha="left", va="bottom", fontsize=8)
+
+    title = "Timeline of Historical Documents"
+    if len(labels) < len(documents):
+        title += f" ({len(documents)} documents, {len(labels)} labelled)"
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel("Date", fontsize=14)
+    ax.set_yticks(range(len(doc_types)), labels=doc_types)
+    ax.set_ylim(-0.5, len(doc_types) - 0.2)
+
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.grid(True, axis="x", alpha=0.3)
+    fig.autofmt_xdate()
+
+def _new_figure(interactive=False):
+    """A Figure for the timeline; only interactive display goes through pyplot."""
+    if interactive:
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=FIGURE_SIZE, layout="tight")
+
+    from matplotlib.figure import Figure
+    return Figure(figsize=FIGURE_SIZE, layout="tight")
+
+def _image_bytes(fig, image_format):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=image_format)
+    return buffer.getvalue()
+
+@opik.track
+def render_timeline(docs_list, image_format="png", max_labels=None):
+    """
+    Render the timeline of historical documents as an image, using the cache.
+
+    Args:
+        docs_list (list): Document dictionaries with title, date and document_type
+        image_format (str): "png" or "svg"
+        max_labels (int, optional): Most titles to annotate; defaults to timeline_max_labels
+
+    Returns:
+        bytes: PNG or SVG image
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported timeline image format {image_format!r}; use one of {IMAGE_FORMATS}")
+    max_labels = max_labels or get_config()["timeline_max_labels"]
+
+    key = timeline_key(docs_list, image_format, max_labels)
+    data = _cached_image(key, image_format)
+    if data is not None:
+        return data
+
+    logger.info(f"Rendering timeline of {len(docs_list)} documents as {image_format}")
+    fig = _new_figure()
+    _draw_timeline(fig, docs_list, max_labels)
+    data = _image_bytes(fig, image_format)
+    _store_image(key, image_format, data)
+    return data
+
 @opik.track
-def create_timeline_visualization(docs_list, save_path=None, show=False):
+def create_timeline_visualization(docs_list, save_path=None, show=False, max_labels=None):
     """
     Create a timeline visualization of historical documents.
-    
+
     Args:
         docs_list (list): List of document dictionaries with metadata
-        save_path (str, optional): Path to save the visualization
+        save_path (str, optional): Path to save the visualization; .png and .svg use the image cache
         show (bool): Whether to display the visualization
-        
+        max_labels (int, optional): Most titles to annotate; defaults to timeline_max_labels
+
     Returns:
-        plt: Matplotlib figure
+        matplotlib.figure.Figure: The timeline figure
     """
+    max_labels = max_labels or get_config()["timeline_max_labels"]
     logger.info(f"Creating timeline visualization with {len(docs_list)} documents")
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(docs_list)
-    
-    # Convert date strings to datetime objects
-    df['datetime'] = pd.to_datetime(df['date'])
-    df = df.sort_values('datetime')
-    
-    # Create color mapping for document types
-    doc_types = df['document_type'].unique()
-    color_map = {}
-    colors = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#ffff33']
-    for i, doc_type in enumerate(doc_types):
-        color_map[doc_type] = colors[i % len(colors)]
-    
-    # Create the figure
-    plt.figure(figsize=(15, 8))
-    
-    # Plot each document as a point
-    for doc_type in doc_types:
-        subset = df[df['document_type'] == doc_type]
-        plt.scatter(subset['datetime'], [1] * len(subset), 
-                   color=color_map[doc_type], s=100, label=doc_type)
-    
-    # Add document titles as annotations
-    for _, row in df.iterrows():
-        plt.annotate(row['title'], 
-                    (row['datetime'], 1), 
-                    rotation=45, 
-                    ha='right', 
-                    va='bottom')
-    
-    # Format the chart
-    plt.yticks([])
-    plt.xlabel('Date', fontsize=14)
-    plt.title('Timeline of Historical Documents', fontsize=16)
-    plt.legend(title='Document Type')
-    
-    # Format the x-axis
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    plt.gca().xaxis.set_major_locator(mdates.YearLocator(5))
-    plt.gcf().autofmt_xdate()
-    
-    # Set grid
-    plt.grid(True, axis='x', alpha=0.3)
-    
-    plt.tight_layout()
-    
+
+    fig = _new_figure(interactive=show)
+    _draw_timeline(fig, docs_list, max_labels)
+
     # Save if path provided
     if save_path:
-        plt.savefig(save_path)
+        image_format = os.path.splitext(save_path)[1].lstrip(".").lower()
+        if image_format in IMAGE_FORMATS:
+            key = timeline_key(docs_list, image_format, max_labels)
+            data = _cached_image(key, image_format)
+            if data is None:
+                data = _image_bytes(fig, image_format)
+                _store_image(key, image_format, data)
+            with open(save_path, "wb") as f:
+                f.write(data)
+        else:
+            fig.savefig(save_path)
         logger.info(f"Timeline visualization saved to {save_path}")
-    
+
     # Show if requested
     if show:
+        import matplotlib.pyplot as plt
         plt.show()
-    
-    return plt
\ No newline at end of file
+
+    return fig